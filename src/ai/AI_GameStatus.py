@@ -1,10 +1,17 @@
-from typing import Tuple, Optional, Union, List, Any, Dict
+import pickle
+import threading
+import timeit
+from typing import Tuple, Optional, Union, List, Any, Dict, Set, Callable
 
 from src.ai.AI_MapRepresentation import Map, AI_Player, AI_Opponent, AI_Trade
-from src.misc.game_constants import error, UnitType, BuildingType, MoveType, UnitCost, debug
+from src.misc.game_constants import error, UnitType, BuildingType, MoveType, UnitCost, debug, AI_SOFT_TIME_BUDGET, \
+    AI_HARD_TIME_BUDGET
 
 """This file (together with AI_map_representation) handles the interaction between game and AI/HI"""
 
+AI_MOVE_POLL_INTERVAL = 0.05       # in s, see AI_GameInterface.wait_for_move
+AI_TYPES = ("cultivated", "expansionist", "barbaric", "villager")      # see create_ai
+
 
 class AI_Move:
     """
@@ -56,7 +63,8 @@ class AI_GameStatus:
         """contains an object from type Map. This hold all information about the current map-view:
          buildings, armies, scouted tiles, scoutable tiles, buildable tiles etc.
          in easy-to-access lists"""
-        self.map: Optional[Map] = None
+        self.__map: Optional[Map] = None
+        self.__map_loader: Optional[Callable[[], Map]] = None       # see set_map_loader
         """information about the player, like current resouces, culture, poplation etc."""
         self.me: Optional[AI_Player] = None
         """the information which is available to the AI of their opponents"""
@@ -64,36 +72,125 @@ class AI_GameStatus:
         """list of active trades, these can be offers, claims or gifts"""
         self.trades: List[AI_Trade] = []
 
+    @property
+    def map(self) -> Optional[Map]:
+        if self.__map_loader is not None:
+            self.__map = self.__map_loader()
+            self.__map_loader = None
+        return self.__map
+
+    @map.setter
+    def map(self, ai_map: Optional[Map]):
+        self.__map = ai_map
+        self.__map_loader = None
+
+    def set_map_loader(self, loader: Callable[[], Map]):
+        """the map is created by the loader upon its first access (e.g. decoded from the wire format)"""
+        self.__map = None
+        self.__map_loader = loader
+
     def clear(self):
         pass
 
 
+def create_ai(id: int, ai_str: str, ai_name: str, other_players: [int], seed: Optional[int] = None):
+    """instantiates the AI specified by ai_str (as in the game xml file). Returns None for an unknown ai_str
+    seed: of the random generator of the AI (AI.rng)"""
+    from src.ai.ai_npc import AI_NPC
+    from src.ai.AI_Macedon import AI_Mazedonian
+    from src.ai.npc.ai_barbaric import Barbaric
+    from src.ai.npc.ai_villager import Villager
+
+    if ai_str == "cultivated":
+        ai = AI_Mazedonian(ai_name, id, other_players)
+    elif ai_str == "expansionist":
+        ai = AI_Mazedonian(ai_name, id, other_players)
+    elif ai_str == "barbaric":
+        ai = Barbaric(other_players, AI_NPC.Script.BARBARIC_HOSTILE)
+    elif ai_str == "villager":
+        ai = Villager(other_players, AI_NPC.Script.VILLAGER)
+    else:
+        return None
+    if seed is not None:
+        ai.rng.seed(seed)
+    return ai
+
+
 class AI_GameInterface:
-    def __init__(self):
+    """
+    Runs the moves of the AIs. Each move has a time budget:
+    - soft deadline (AI_SOFT_TIME_BUDGET): the AI can query the time it has left (AI.time_left) and wrap up
+    - hard deadline (AI_HARD_TIME_BUDGET): the game does not wait any longer. The move is abandoned (see
+      abandon_move) and the game applies a default move instead. A thread cannot be killed, thus the late move
+      is discarded once it completes. Until then, the AI is busy and its following requests are overdue right away.
+      Wall time: whether a move is played or replaced depends on the speed of the machine, and an abandoned move
+      still changes the state of its AI (e.g. AI.rng). Set hard_time_budget to None to wait for every move, such
+      that a seeded game is reproducible (see sim.py)
+    A move is requested by the game (request_move) and then computed by do_a_move, typically in a separate thread
+    """
+    def __init__(self, use_processes: bool = False):
+        """use_processes: each AI runs in a worker process (see ai_process.RemoteAI), otherwise in the game process"""
         from src.ai.ai_blueprint import AI
+        self.use_processes: bool = use_processes
         self.dict_of_ais: Dict[int, AI] = {}
         debug("AI Game interface has been initialized")
         self.__has_finished = False     # protected variable to avoid modifying it, which would lead to RC
         self.ref_to_move: Optional[AI_Move] = None
+        self.failure: Optional[Exception] = None        # raised by the AI during the current move
         self.time_begin = 0
         self.time_end = 0
+        self.soft_time_budget: float = AI_SOFT_TIME_BUDGET
+        self.hard_time_budget: Optional[float] = AI_HARD_TIME_BUDGET      # None: no hard deadline
+        self.__condition = threading.Condition()        # guards the state of the current request
+        self.__request_id: int = 0
+        self.__move_start: Optional[float] = None       # the AI has started to compute the current move
+        self.__blocked: bool = False                    # the AI is still busy with an abandoned move
+        self.__busy: Set[int] = set()                   # ids of the players whose AI is computing a move
 
-    def launch_AI(self, id: int, ai_str: str, ai_name: str, other_players: [int]):
-        from src.ai.ai_npc import AI_NPC
-        from src.ai.AI_Macedon import AI_Mazedonian
-        from src.ai.npc.ai_barbaric import Barbaric
-        from src.ai.npc.ai_villager import Villager
-
-        if ai_str == "cultivated":
-            self.dict_of_ais[id] = AI_Mazedonian(ai_name, id, other_players)
-        elif ai_str == "expansionist":
-            self.dict_of_ais[id] = AI_Mazedonian(ai_name, id, other_players)
-        elif ai_str == "barbaric":
-            self.dict_of_ais[id] = Barbaric(other_players, AI_NPC.Script.BARBARIC_HOSTILE)
-        elif ai_str == "villager":
-            self.dict_of_ais[id] = Villager(other_players, AI_NPC.Script.VILLAGER)
+    def launch_AI(self, id: int, ai_str: str, ai_name: str, other_players: [int], seed: Optional[int] = None):
+        """seed: of the random generator of the AI (AI.rng)"""
+        if ai_str not in AI_TYPES:
+            return                          # human player
+        if self.use_processes:
+            from src.ai.ai_process import RemoteAI
+            self.dict_of_ais[id] = RemoteAI(id, ai_str, ai_name, other_players, seed)
+        else:
+            self.dict_of_ais[id] = create_ai(id, ai_str, ai_name, other_players, seed)
         # debug("size of AI dict: " + str(len(self.dict_of_ais)))
 
+    def get_ai_states(self) -> Dict[int, bytes]:
+        """pickled AIs, per player id (see save games)"""
+        from src.ai.ai_process import RemoteAI
+        states: Dict[int, bytes] = {}
+        for pid, ai in self.dict_of_ais.items():
+            if isinstance(ai, RemoteAI):
+                states[pid] = ai.get_state()
+            else:
+                states[pid] = pickle.dumps(ai, protocol=pickle.HIGHEST_PROTOCOL)
+        return states
+
+    def set_ai_states(self, states: Dict[int, bytes]):
+        """counterpart of get_ai_states, the AIs have to be launched"""
+        from src.ai.ai_process import RemoteAI
+        for pid, state in states.items():
+            ai = self.dict_of_ais.get(pid)
+            if isinstance(ai, RemoteAI):
+                ai.set_state(state)
+            else:
+                self.dict_of_ais[pid] = pickle.loads(state)
+
+    def is_busy(self) -> bool:
+        """:return: True, if an AI is computing a move (possibly an abandoned one)"""
+        with self.__condition:
+            return len(self.__busy) > 0
+
+    def shutdown(self):
+        """stops the worker processes of the AIs (process backend)"""
+        from src.ai.ai_process import RemoteAI
+        for ai in self.dict_of_ais.values():
+            if isinstance(ai, RemoteAI):
+                ai.close()
+
     @staticmethod
     def create_ai_status(ai_stat: AI_GameStatus, turn_nr,
                          scout_cost, ai_map: Map, me: AI_Player, opponents: List[AI_Opponent],
@@ -108,20 +205,106 @@ class AI_GameInterface:
         ai_stat.cost_building_construction = building_costs
         ai_stat.cost_unit_recruitment = unit_cost
 
-    def do_a_move(self, ai_stat: AI_GameStatus, move: AI_Move, player_id):
-        """spawns a new thread which does the AI calculations to reduce load/stalls in update thread"""
-        self.__has_finished = False
-        self.ref_to_move = move     # <-- keep reference on move, once __has_finished is true, the object is complete
-        # self.time_begin = timeit.default_timer()
-        # ai_worker = threading.Thread(target=self.run, args=(ai_stat, move, player_id))
-        # ai_worker.start()
-        self.dict_of_ais[player_id].do_move(ai_stat, move)
-        # performance logging
-        from src.ai.performance import ScoreSpentResources
-        score = ScoreSpentResources.evaluate(ai_stat.map)
-        from src.ai.performance import PerformanceLogger
-        PerformanceLogger.log_performance_file(ai_stat.turn_nr, ai_stat.me.id, score)
-        self.__has_finished = True
+    def request_move(self, player_id: int) -> int:
+        """
+        call this (from the game loop) before the move is computed. It resets the state of the interface.
+        :return: id of the request, pass it on to do_a_move
+        """
+        with self.__condition:
+            self.__request_id = self.__request_id + 1
+            self.__has_finished = False
+            self.ref_to_move = None
+            self.failure = None
+            self.__move_start = None
+            self.__blocked = player_id in self.__busy
+            return self.__request_id
+
+    def do_a_move(self, ai_stat: AI_GameStatus, move: AI_Move, player_id, request_id: int):
+        """computes the move of the AI, typically called from a separate thread to avoid stalls in the update thread"""
+        with self.__condition:
+            if request_id != self.__request_id:
+                return                      # the request has been abandoned before the AI could start
+            self.ref_to_move = move         # <-- keep reference on move, once __has_finished is true, the object is complete
+            self.__move_start = timeit.default_timer()
+            self.__busy.add(player_id)
+        ai = self.dict_of_ais[player_id]
+        ai.soft_deadline = self.__move_start + self.soft_time_budget
+        failure: Optional[Exception] = None
+        t_begin = timeit.default_timer()
+        try:
+            ai.do_move(ai_stat, move)
+        except Exception as e:
+            failure = e                     # handed over to the game loop, see failure
+        t_end = timeit.default_timer()
+        with self.__condition:
+            self.__busy.discard(player_id)
+            if request_id != self.__request_id:
+                return                      # the move has been abandoned (hard deadline), the game went on
+        if failure is None:
+            # performance logging
+            from src.ai.performance import ScoreSpentResources
+            score = ScoreSpentResources.evaluate(ai_stat.map)
+            from src.ai.performance import PerformanceLogger
+            PerformanceLogger.log_performance_file(ai_stat.turn_nr, ai_stat.me.id, score)
+        with self.__condition:
+            if request_id == self.__request_id:
+                self.time_begin = t_begin
+                self.time_end = t_end
+                if failure is not None:
+                    self.failure = failure
+                    self.ref_to_move = None
+                self.__has_finished = True
+                self.__condition.notify_all()
+
+    def fail_move(self, failure: Exception, request_id: int):
+        """the move could not be requested from the AI (e.g. the game status could not be constructed). The failure
+        is handed over to the game loop as if the AI had raised it, see failure"""
+        with self.__condition:
+            if request_id != self.__request_id:
+                return                      # the request has been abandoned, the game went on
+            self.time_begin = self.time_end = timeit.default_timer()
+            self.failure = failure
+            self.ref_to_move = None
+            self.__has_finished = True
+            self.__condition.notify_all()
+
+    def is_overdue(self) -> bool:
+        """:return: True, if the current move is not complete and the hard deadline has passed"""
+        with self.__condition:
+            return self.__is_overdue()
+
+    def __is_overdue(self) -> bool:
+        if self.__has_finished:
+            return False
+        if self.__blocked:
+            return True
+        return self.__move_start is not None and self.hard_time_budget is not None and \
+            timeit.default_timer() - self.__move_start > self.hard_time_budget
+
+    def wait_for_move(self):
+        """blocks until the current move is complete or overdue"""
+        with self.__condition:
+            while not self.__has_finished and not self.__is_overdue():
+                if self.hard_time_budget is None:
+                    self.__condition.wait()             # notified once the move is complete
+                    continue
+                if self.__move_start is None:
+                    timeout = AI_MOVE_POLL_INTERVAL     # the game status is still being constructed
+                else:
+                    timeout = self.__move_start + self.hard_time_budget - timeit.default_timer()
+                self.__condition.wait(max(timeout, .0) + 1e-3)
+
+    def abandon_move(self) -> float:
+        """
+        gives up on the current move, it is discarded once the AI completes it
+        :return: the time the AI has spent on the move so far
+        """
+        with self.__condition:
+            self.__request_id = self.__request_id + 1
+            self.ref_to_move = None
+            if self.__move_start is None:
+                return .0
+            return timeit.default_timer() - self.__move_start
 
     def query_ai(self, query, arg, player_id) -> str:
         if query == "diplo":
@@ -138,4 +321,5 @@ class AI_GameInterface:
         return self.__has_finished
 
     def get_ai_execution_time(self) -> float:
+        """:return: wall time of the last AI move (do_move) in seconds"""
         return self.time_end - self.time_begin
@@ -1,13 +1,12 @@
-import random
 import timeit
 from dataclasses import dataclass
 from enum import Enum
 from typing import Set, List, Tuple, Union, Optional, Dict, Any, Callable
 
 from src.ai.AI_GameStatus import AI_GameStatus, AI_Move
-from src.ai.AI_MapRepresentation import Tile, AI_Army, AI_Building, AI_Trade
+from src.ai.AI_MapRepresentation import Tile, AI_Army, AI_Building, AI_Trade, TileSet
 from src.ai.ai_blueprint import AI
-from src.ai.toolkit import essentials, basic
+from src.ai.toolkit import essentials, basic, movement
 from src.ai.toolkit.basic import Weight, BuildOption, RecruitmentOption, WaitOption, Compass, ScoutingOption, Option, \
     CardinalDirection, UpgradeOption
 from src.misc.game_constants import DiploEventType, hint, BuildingType, error, debug, UnitType, Priority, MoveType, \
@@ -75,7 +74,7 @@ class AI_Mazedonian(AI):
         self.priolist_targets: List[AI_Mazedonian.AttackTarget] = []  # TODO rename to army movement
         # self.opponent_strength: Set[Tuple[int, int]] = set()  # stores the ID and the value
         self.opponent_strength: Dict[int, AI_Mazedonian.Strength] = {}
-        self.claimed_tiles: Set[Tile] = set()
+        self.claimed_tiles: TileSet = TileSet()
         self.is_loosing_food: bool = False
         self.inactive_huts: int = 0
         self.center_tile: Optional[Tile] = None
@@ -93,7 +92,7 @@ class AI_Mazedonian(AI):
 
         # values to move to the xml file: and dependent on personality
         self.properties: Dict[str, Any] = {}
-        from src.ai.scripts.macedon_hostile import on_setup, setup_weights, setup_movement_weights, setup_trade_weights
+        from src.ai.scripts.macedon_hostile import on_setup
         on_setup(self.properties)
 
         # self.safety_dist_to_enemy_army: int = 3
@@ -125,11 +124,27 @@ class AI_Mazedonian(AI):
 
         self.weights: List[Weight] = []
         self.m_weights: List[Weight] = []
-        self.trade_decisions: List[Callable[[AI_Trade, AI_GameStatus], None]] = setup_trade_weights(self)
-        for c, v in setup_weights(self):
-            self.weights.append(Weight(c, v))
-        for c, v in setup_movement_weights(self):
-            self.m_weights.append(Weight(c, v))
+        self.trade_decisions: List[Callable[[AI_Trade, AI_GameStatus], None]] = []
+        self._load_weights()
+
+    def _load_weights(self):
+        """the weights and trade decisions are closures, defined by the script"""
+        from src.ai.scripts.macedon_hostile import setup_weights, setup_movement_weights, setup_trade_weights
+        self.trade_decisions = setup_trade_weights(self)
+        self.weights = [Weight(c, v) for c, v in setup_weights(self)]
+        self.m_weights = [Weight(c, v) for c, v in setup_movement_weights(self)]
+
+    def __getstate__(self):
+        """the weights cannot be pickled, they are loaded from the script again (see save games)"""
+        state = self.__dict__.copy()
+        state['weights'] = []
+        state['m_weights'] = []
+        state['trade_decisions'] = []
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._load_weights()
 
     def do_move(self, ai_stat: AI_GameStatus, move: AI_Move):
         self._reset_dump()
@@ -205,14 +220,13 @@ class AI_Mazedonian(AI):
                         has_farm = True
                 if has_farm:
                     # walk to random field
-                    path = []
-                    idx = random.randint(0, len(ai_stat.map.own_farm_field_tiles) - 1)
+                    idx = self.rng.randint(0, len(ai_stat.map.own_farm_field_tiles) - 1)
                     # print(f"from: {ai_stat.map.army_list[0].base_tile.offset_coordinates} to {ai_stat.map.own_farm_field_tiles[idx].offset_coordinates}")
-                    path = essentials.a_star(ai_stat.map.army_list[0].base_tile,
-                                                  ai_stat.map.own_farm_field_tiles[idx],
-                                                  ai_stat.map.walkable_tiles)
-                    if len(path) > 1:
-                        move.move_army_to = path[1].offset_coordinates
+                    step, _ = movement.next_step_to_target(ai_stat.map.army_list[0].base_tile,
+                                                           ai_stat.map.own_farm_field_tiles[idx],
+                                                           ai_stat.map.walkable_domain, ai_stat.map)
+                    if step:
+                        move.move_army_to = step.offset_coordinates
                         move.doMoveArmy = True
                         target_str = "corn field"
 
@@ -224,10 +238,11 @@ class AI_Mazedonian(AI):
                     # attack
                     start_tile = ai_stat.map.army_list[0].base_tile
                     target_tile = self.priolist_targets[0].target.base_tile
-                    path = essentials.a_star(start_tile, target_tile, ai_stat.map.walkable_tiles)
-                    if len(path) > 1:
+                    step, _ = movement.next_step_to_target(start_tile, target_tile, ai_stat.map.walkable_domain,
+                                                           ai_stat.map)
+                    if step:
                         self.previous_attack_target = self.priolist_targets[0]
-                        move.move_army_to = path[1].offset_coordinates
+                        move.move_army_to = step.offset_coordinates
                         move.doMoveArmy = True
                         target = self.priolist_targets[0]
                         s = "army" if type(target.target) is AI_Army else "building"
@@ -257,15 +272,15 @@ class AI_Mazedonian(AI):
 
     def create_heat_maps(self, ai_stat: AI_GameStatus, move: AI_Move):
         # cond = lambda n: AI_Toolkit.is_obj_in_list(n, ai_stat.map.walkable_tiles)
-        heat_map = essentials.simple_heat_map(ai_stat.map.building_list, ai_stat.map.walkable_tiles,
-                                              lambda n: essentials.is_obj_in_list(n, ai_stat.map.walkable_tiles))
+        heat_map = essentials.simple_heat_map(ai_stat.map.building_list, ai_stat.map.walkable_domain, None,
+                                              memo=ai_stat.map.distance_fields)
         self.claimed_tiles.clear()
         c_dist = 2 if 'claiming_distance' not in self.properties else self.properties['claiming_distance']
         for d, s in heat_map:
             if d < c_dist:
                 self.claimed_tiles.add(s)
-        heat_map_2 = essentials.simple_heat_map(ai_stat.map.scoutable_tiles, ai_stat.map.discovered_tiles,
-                                                lambda n: True)
+        heat_map_2 = essentials.simple_heat_map(ai_stat.map.scoutable_tiles, ai_stat.map.discovered_domain, None,
+                                                memo=ai_stat.map.distance_fields)
 
         self.center_tile = ai_stat.map.building_list[0].base_tile
         if self.center_tile is None:
@@ -281,8 +296,8 @@ class AI_Mazedonian(AI):
                 self._dump("Center is located @ " + str(tile_max.offset_coordinates))
             self.center_tile = tile_max
         ## get heatmap for danger zone ->
-        heat_map_3 = essentials.simple_heat_map(ai_stat.map.opp_building_list, ai_stat.map.discovered_tiles,
-                                                lambda n: True)
+        heat_map_3 = essentials.simple_heat_map(ai_stat.map.opp_building_list, ai_stat.map.discovered_domain, None,
+                                                memo=ai_stat.map.distance_fields)
         for d, s in heat_map_3:
             if d <= 2:
                 self.danger_zone.add(s)
@@ -300,11 +315,11 @@ class AI_Mazedonian(AI):
 
         for e_b in ai_stat.map.opp_building_list:
             if e_b.visible:
-                if essentials.is_obj_in_list(e_b, list(self.claimed_tiles)):
+                if essentials.is_obj_in_list(e_b, self.claimed_tiles):
                     self.diplomacy.add_event(e_b.owner, e_b.offset_coordinates,
                                              DiploEventType.ENEMY_BUILDING_IN_CLAIMED_ZONE, -2, 3)
         for e_a in ai_stat.map.opp_army_list:
-            if essentials.is_obj_in_list(e_a, list(self.claimed_tiles)):
+            if essentials.is_obj_in_list(e_a, self.claimed_tiles):
                 self.diplomacy.add_event(e_a.owner, e_a.offset_coordinates,
                                          DiploEventType.ENEMY_ARMY_INVADING_CLAIMED_ZONE, -2, 3)
 
@@ -570,15 +585,15 @@ class AI_Mazedonian(AI):
                 tmp = False  # just for printing
                 possible_fields = []
                 score = 0
-                for n in essentials.get_neighbours_on_set(ai_t, ai_stat.map.buildable_tiles):
+                for n in essentials.get_neighbours_on_set(ai_t, ai_stat.map.buildable_domain):
                     if basic.num_resources_on_adjacent(n) == 0:
                         possible_fields.append(n)
-                    if essentials.is_obj_in_list(n, ai_stat.map.scoutable_tiles):
+                    if essentials.is_obj_in_list(n, ai_stat.map.scoutable_domain):
                         score += 1
                 score += len(possible_fields)
                 amount_of_fields = min(3, len(possible_fields))
-                sampled = random.sample(possible_fields, amount_of_fields)
-                score += len(essentials.get_neighbours_on_set(ai_t, ai_stat.map.scoutable_tiles)) / 2
+                sampled = self.rng.sample(possible_fields, amount_of_fields)
+                score += len(essentials.get_neighbours_on_set(ai_t, ai_stat.map.scoutable_domain)) / 2
                 # if build site is next to a resource --> reduce value by 1 for each resource field
                 score = score - basic.num_resources_on_adjacent(ai_t)
                 # make the score dependent on safety level of region
@@ -639,7 +654,7 @@ class AI_Mazedonian(AI):
             if DETAILED_DEBUG:
                 debug(f"possible candidates for a barracks: {len(candidates)}")
             if len(candidates) > 0:
-                idx = random.randint(0, len(candidates) - 1)
+                idx = self.rng.randint(0, len(candidates) - 1)
                 c = 0
                 for e in candidates:
                     if idx == c:
@@ -745,7 +760,9 @@ class AI_Mazedonian(AI):
             if score > best_score:
                 best_score = score
                 best_option = UpgradeOption(BuildingType.VILLA, hut.offset_coordinates, normalize(score))
-        return [best_option]
+        if best_option is not None:
+            options.append(best_option)
+        return options
 
     def evaluate_move_scouting(self, ai_stat: AI_GameStatus) -> List[ScoutingOption]:
         """scores the scouting options, currently by the distance to a own building
@@ -770,7 +787,7 @@ class AI_Mazedonian(AI):
             # 2. increase value by proximity to claimed tiles
             num_of_claimed_tiles = 0
             for t_at_dist_1 in dist1:
-                if essentials.is_obj_in_list(t_at_dist_1, list(self.claimed_tiles)):
+                if essentials.is_obj_in_list(t_at_dist_1, self.claimed_tiles):
                     num_of_claimed_tiles = num_of_claimed_tiles + 1
             value = value + (num_of_claimed_tiles * self.w_scouting_claimed)
             # 3. try to smooth out border
@@ -866,15 +883,15 @@ class AI_Mazedonian(AI):
     def __get_attack_target(self, ai_stat: AI_GameStatus):
         """get's the best attack target
         currently only buildings and armies of hostile players are considered to be attackable"""
-        targets: Set[Tuple[Union[AI_Building, AI_Army], bool]] = set()
+        targets: List[Tuple[Union[AI_Building, AI_Army], bool]] = []
         # priority_list: List[Tuple[int, Union[AI_Building, AI_Army]]]= []
         if len(ai_stat.map.army_list) == 0:  # in case we don't have an army
             return
         for e_a in ai_stat.map.opp_army_list:
-            targets.add((e_a, True))
+            targets.append((e_a, True))
         for e_b in ai_stat.map.opp_building_list:
             if e_b.visible:
-                targets.add((e_b, False))
+                targets.append((e_b, False))
 
         self._dump(f"Found {len(targets)} target(s) for our army")
         for target, is_army in targets:
@@ -917,8 +934,8 @@ class AI_Mazedonian(AI):
 
 
     def get_army_spawn_loc(self, ai_stat: AI_GameStatus) -> Tuple[int, int]:
-        nei: List[Tile] = essentials.get_neighbours_on_set(ai_stat.map.building_list[0].base_tile, ai_stat.map.walkable_tiles)
-        idx = random.randint(0, len(nei)-1)
+        nei: List[Tile] = essentials.get_neighbours_on_set(ai_stat.map.building_list[0].base_tile, ai_stat.map.walkable_domain)
+        idx = self.rng.randint(0, len(nei)-1)
         return nei[idx].offset_coordinates
 
     def __count_inactive_huts(self, ai_stat) -> int:
@@ -926,7 +943,7 @@ class AI_Mazedonian(AI):
         for b in ai_stat.map.building_list:
             if b.type == BuildingType.HUT:
                 has_res = False
-                for n in essentials.get_neighbours_on_set(b.base_tile, ai_stat.map.discovered_tiles):
+                for n in essentials.get_neighbours_on_set(b.base_tile, ai_stat.map.discovered_domain):
                     if n.has_resource():
                         has_res = True
                 if not has_res:
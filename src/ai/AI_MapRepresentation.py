@@ -1,14 +1,18 @@
 import traceback
-from typing import List, Tuple, Optional, Dict
+from collections import deque
+from typing import List, Tuple, Optional, Dict, Set, Iterable, Iterator, Any, FrozenSet
 
 from dataclasses import dataclass
 
 from src.game_accessoires import Resource, Army
 from src.hex_map import HexMap
 from src.misc.building import Building
+from src.misc.cube_coords import CUBE_DIRECTIONS, cube_to_offset
 from src.misc.game_constants import GroundType, error, UnitType, ResourceType, BuildingType, BuildingState, PlayerType, \
     TradeType, TradeCategory, TradeState
 
+NEIGHBOUR_ATTRIBUTES = ('tile_ne', 'tile_e', 'tile_se', 'tile_sw', 'tile_w', 'tile_nw')     # as CUBE_DIRECTIONS
+
 
 class Tile:
     """
@@ -38,6 +42,13 @@ class Tile:
 
         self.cube_coordinates = HexMap.offset_to_cube_coords(self.offset_coordinates)
 
+    def __getstate__(self):
+        """the links to the neighbours are not pickled (deep recursion), Map restores them (see Map.__setstate__)"""
+        state = self.__dict__.copy()
+        for n in NEIGHBOUR_ATTRIBUTES:
+            state[n] = None
+        return state
+
     # def __eq__(self, other):
     #     return self.offset_coordinates == other.offset_coordinates
 
@@ -72,6 +83,78 @@ class Tile:
         return self.tile_nw is not None
 
 
+class TileSet:
+    """
+    Set of tiles, hashed by their offset coordinates. Membership checks are O(1), in contrary to a list of tiles.
+    Any object which has offset coordinates (Tile, AI_Element, Hexagon) can be checked for membership.
+    Use it as search domain for the toolkit functions (see essentials.get_neighbours_on_set, is_obj_in_list),
+    the Map provides cached instances for the scoutable, walkable, buildable and discovered tiles.
+    """
+    def __init__(self, tiles: Iterable[Tile] = ()):
+        self.tiles: Dict[Tuple[int, int], Tile] = {t.offset_coordinates: t for t in tiles}
+        self.__key: Optional[FrozenSet[Tuple[int, int]]] = None
+
+    @property
+    def key(self) -> FrozenSet[Tuple[int, int]]:
+        """hashable representation (the coordinates), e.g. to memoise computations on this domain"""
+        if self.__key is None:
+            self.__key = frozenset(self.tiles)
+        return self.__key
+
+    def __contains__(self, obj: Any) -> bool:
+        return obj.offset_coordinates in self.tiles
+
+    def __iter__(self) -> Iterator[Tile]:
+        return iter(self.tiles.values())
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    def add(self, tile: Tile):
+        self.tiles[tile.offset_coordinates] = tile
+        self.__key = None
+
+    def clear(self):
+        self.tiles.clear()
+        self.__key = None
+
+    def contains_coordinates(self, offset_coordinates: Tuple[int, int]) -> bool:
+        return offset_coordinates in self.tiles
+
+
+class PathTree:
+    """
+    Shortest paths from every tile of a domain to one target, computed once by a reverse breadth first search
+    from the target. Afterwards, the next step and the distance towards the target are O(1) for any tile.
+    Next step and distance are the same as with a path of essentials.a_star (given equally short paths, the step
+    might differ). Get the trees via Map.get_path_tree, such that they are shared within a turn
+    """
+    def __init__(self, target: Tile, domain: TileSet):
+        self.target: Tile = target
+        self.__distance: Dict[Tuple[int, int], int] = {}
+        self.__next_step: Dict[Tuple[int, int], Tile] = {}
+        if target not in domain:
+            return                  # no path finding possible
+        self.__distance[target.offset_coordinates] = 0
+        frontier = deque([target])
+        while frontier:
+            t = frontier.popleft()
+            d = self.__distance[t.offset_coordinates] + 1
+            for n in (t.tile_ne, t.tile_e, t.tile_se, t.tile_sw, t.tile_w, t.tile_nw):
+                if n is not None and n.offset_coordinates not in self.__distance and n in domain:
+                    self.__distance[n.offset_coordinates] = d
+                    self.__next_step[n.offset_coordinates] = t
+                    frontier.append(n)
+
+    def distance(self, tile: Tile) -> int:
+        """:return: length of the shortest path from tile to the target, -1 if there is none"""
+        return self.__distance.get(tile.offset_coordinates, -1)
+
+    def next_step(self, tile: Tile) -> Optional[Tile]:
+        """:return: the next tile on a shortest path to the target, None if there is none (or tile is the target)"""
+        return self.__next_step.get(tile.offset_coordinates)
+
+
 @dataclass
 class AI_Player:
     id: int
@@ -204,28 +287,141 @@ class Map:
         self.walkable_tiles: List[Tile] = []
         self.own_farm_field_tiles: List[Tile] = []
         self.discovered_tiles: List[Tile] = []
+        # offset coordinates of the flagged tiles of the last snapshot, see update_tile_flags
+        self.__flagged: Dict[str, Set[Tuple[int, int]]] = {'scoutable': set(), 'walkable': set(),
+                                                           'buildable': set(), 'discovered': set()}
+        # TileSets of the lists above, together with the list they have been built from. Invalidated by set_*_tile
+        # and update_tile_flags, a list which has been replaced (e.g. see wire_format) is detected by its identity
+        self.__domains: Dict[str, Tuple[List[Tile], TileSet]] = {}
+        # distance fields of this snapshot, shared by all components of the AI. See essentials.distance_field
+        self.distance_fields: Dict[Any, Dict[Tuple[int, int], int]] = {}
+        # path trees of this snapshot, see get_path_tree
+        self.__path_trees: Dict[Tuple[Tuple[int, int], FrozenSet[Tuple[int, int]]], PathTree] = {}
+
+    @property
+    def scoutable_domain(self) -> TileSet:
+        return self.__get_domain('scoutable', self.scoutable_tiles)
+
+    @property
+    def buildable_domain(self) -> TileSet:
+        return self.__get_domain('buildable', self.buildable_tiles)
+
+    @property
+    def walkable_domain(self) -> TileSet:
+        return self.__get_domain('walkable', self.walkable_tiles)
+
+    @property
+    def discovered_domain(self) -> TileSet:
+        return self.__get_domain('discovered', self.discovered_tiles)
+
+    def __get_domain(self, key: str, tile_list: List[Tile]) -> TileSet:
+        """the TileSet is rebuilt if the list has been replaced or invalidated (see set_*_tile, update_tile_flags)"""
+        cached = self.__domains.get(key)
+        if cached is None or cached[0] is not tile_list:
+            cached = (tile_list, TileSet(tile_list))
+            self.__domains[key] = cached
+        return cached[1]
+
+    def __getstate__(self):
+        """the caches are not pickled, they are rebuilt on demand"""
+        state = self.__dict__.copy()
+        state['_Map__domains'] = {}
+        state['distance_fields'] = {}
+        state['_Map__path_trees'] = {}
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.connect_graph()
 
     def add_tile(self, offset_coordinates: Tuple[int, int], gt: GroundType):
         """after instantiation, fill the map. No tile with the same coordinates should be added twice"""
         self.map[offset_coordinates] = (Tile(offset_coordinates, gt))
 
     def connect_graph(self):
-        """call this after all tiles have been added (or to recreate the bonds)"""
-        for _, v in self.map.items():
-            for _, o_v in self.map.items():
-                other_cc = o_v.cube_coordinates
-                if HexMap.get_cc_northeast(other_cc) == v.cube_coordinates:
-                    v.tile_sw = o_v
-                if HexMap.get_cc_east(other_cc) == v.cube_coordinates:
-                    v.tile_w = o_v
-                if HexMap.get_cc_southeast(other_cc) == v.cube_coordinates:
-                    v.tile_nw = o_v
-                if HexMap.get_cc_southwest(other_cc) == v.cube_coordinates:
-                    v.tile_ne = o_v
-                if HexMap.get_cc_west(other_cc) == v.cube_coordinates:
-                    v.tile_e = o_v
-                if HexMap.get_cc_northwest(other_cc) == v.cube_coordinates:
-                    v.tile_se = o_v
+        """call this after all tiles have been added (or to recreate the bonds)
+        linear in the number of tiles: each neighbour is looked up by its cube coordinates"""
+        by_cube: Dict[Tuple[int, int, int], Tile] = {t.cube_coordinates: t for t in self.map.values()}
+        for v in self.map.values():
+            x, y, z = v.cube_coordinates
+            v.tile_ne, v.tile_e, v.tile_se, v.tile_sw, v.tile_w, v.tile_nw = \
+                [by_cube.get((x + dx, y + dy, z + dz)) for dx, dy, dz in CUBE_DIRECTIONS]
+
+    # ---------------- incremental snapshots: keep the map alive across turns and apply only the changes -----------
+
+    def update_tiles(self, tiles: Dict[Tuple[int, int], GroundType]):
+        """incremental counterpart of add_tile and connect_graph. Tiles which are not yet part of the map are added,
+        tiles which are no longer part of the view are removed. Only these and their neighbours are re-linked"""
+        dirty: Set[Tile] = set()
+        for oc in [oc for oc in self.map if oc not in tiles]:
+            removed = self.map.pop(oc)
+            dirty.update(filter(None, (removed.tile_ne, removed.tile_e, removed.tile_se,
+                                       removed.tile_sw, removed.tile_w, removed.tile_nw)))
+        added: List[Tile] = []
+        for oc, gt in tiles.items():
+            tile = self.map.get(oc)
+            if tile is None:
+                tile = Tile(oc, gt)
+                self.map[oc] = tile
+                added.append(tile)
+            elif tile.ground_type is not gt:
+                tile.ground_type = gt
+        for tile in added:
+            self.__link_tile(tile)
+            dirty.update(filter(None, (tile.tile_ne, tile.tile_e, tile.tile_se,
+                                       tile.tile_sw, tile.tile_w, tile.tile_nw)))
+        for tile in dirty:
+            if tile.offset_coordinates in self.map:
+                self.__link_tile(tile)
+
+    def __link_tile(self, v: Tile):
+        x, y, z = v.cube_coordinates
+        v.tile_ne, v.tile_e, v.tile_se, v.tile_sw, v.tile_w, v.tile_nw = \
+            [self.map.get(cube_to_offset((x + dx, y + dy, z + dz))) for dx, dy, dz in CUBE_DIRECTIONS]
+
+    def update_tile_flags(self, scoutable: Iterable[Tuple[int, int]], walkable: Iterable[Tuple[int, int]],
+                          buildable: Iterable[Tuple[int, int]], discovered: Iterable[Tuple[int, int]]):
+        """incremental counterpart of set_scoutable/walkable/buildable/discovered_tile. Only tiles whose flag changed
+        since the last snapshot are touched. The tile lists are replaced (never modified) if they changed and keep
+        the order of the given coordinates, as the set_..._tile calls would: the AIs draw random numbers while
+        iterating them, thus the order is part of the match"""
+        self.scoutable_tiles = self.__update_flag('scoutable', 'is_scoutable', scoutable, self.scoutable_tiles)
+        self.walkable_tiles = self.__update_flag('walkable', 'is_walkable', walkable, self.walkable_tiles)
+        self.buildable_tiles = self.__update_flag('buildable', 'is_buildable', buildable, self.buildable_tiles)
+        self.discovered_tiles = self.__update_flag('discovered', 'is_discovered', discovered, self.discovered_tiles)
+
+    def __update_flag(self, key: str, attr: str, coords: Iterable[Tuple[int, int]],
+                      tile_list: List[Tile]) -> List[Tile]:
+        coords = list(coords)
+        old = self.__flagged[key]
+        new = set(coords)
+        if new == old and [t.offset_coordinates for t in tile_list] == coords:
+            return tile_list
+        self.__domains.pop(key, None)
+        for oc in old - new:
+            if oc in self.map:
+                setattr(self.map[oc], attr, False)
+        for oc in new - old:
+            setattr(self.map[oc], attr, True)
+        self.__flagged[key] = new
+        return [self.map[oc] for oc in coords]
+
+    def clear_objects(self):
+        """removes all resources, armies and buildings, such that they can be added again for the next snapshot"""
+        for e in self.resource_list:
+            e.base_tile.resource = None
+        for e in self.army_list + self.opp_army_list:
+            e.base_tile.army = None
+        for e in self.building_list + self.opp_building_list:
+            e.base_tile.building = None
+        self.resource_list = []
+        self.army_list = []
+        self.opp_army_list = []
+        self.building_list = []
+        self.opp_building_list = []
+        self.own_farm_field_tiles = []
+        self.distance_fields = {}
+        self.__path_trees = {}
 
     def add_resource(self, offset_coordinates: Tuple[int, int], res: Resource):
         tile = self.__get_tile(offset_coordinates)
@@ -257,21 +453,25 @@ class Map:
         tile: Tile = self.__get_tile(offset_coordinates)
         self.scoutable_tiles.append(tile)
         tile.is_scoutable = True
+        self.__domains.pop('scoutable', None)
 
     def set_buildable_tile(self, offset_coordinates: Tuple[int, int]):
         tile: Tile = self.__get_tile(offset_coordinates)
         self.buildable_tiles.append(tile)
         tile.is_buildable = True
+        self.__domains.pop('buildable', None)
 
     def set_walkable_tile(self, offset_coordinates: Tuple[int, int]):
         tile: Tile = self.__get_tile(offset_coordinates)
         self.walkable_tiles.append(tile)
         tile.is_walkable = True
+        self.__domains.pop('walkable', None)
 
     def set_discovered_tile(self, offset_coordinates: Tuple[int, int]):
         tile: Tile = self.__get_tile(offset_coordinates)
         self.discovered_tiles.append(tile)
         tile.is_discovered = True
+        self.__domains.pop('discovered', None)
 
     def __add_army(self, offset_coordinates: Tuple[int, int], army: Army) -> AI_Army:
         tile = self.__get_tile(offset_coordinates)
@@ -295,14 +495,22 @@ class Map:
                     t = self.__get_tile(a.offset_coordinates)
                     ai_b.associated_tiles.append(t)
                     self.own_farm_field_tiles.append(t)
-        ai_b.visible = False
-        for t in self.discovered_tiles:
-            if t.offset_coordinates == ai_b.offset_coordinates:
-                ai_b.visible = True
-                break
+        ai_b.visible = tile.is_discovered
         tile.building = ai_b
         return ai_b
 
+    def get_path_tree(self, target: Tile, domain: TileSet) -> PathTree:
+        """
+        path service: shortest paths towards the target within the domain (e.g. walkable_domain).
+        Each tree is computed once per snapshot, all queries towards the same target share it
+        """
+        key = (target.offset_coordinates, domain.key)
+        tree = self.__path_trees.get(key)
+        if tree is None:
+            tree = PathTree(target, domain)
+            self.__path_trees[key] = tree
+        return tree
+
     def get_tile(self, offset_coordinates: Tuple[int, int]) -> Tile:
         return self.__get_tile(offset_coordinates)
 
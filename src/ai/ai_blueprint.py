@@ -1,5 +1,8 @@
 from __future__ import annotations
 
+import random
+import timeit
+
 from src.ai.AI_GameStatus import AI_GameStatus, AI_Move
 from src.misc.game_constants import DiploEventType, debug, hint, Definitions
 from src.misc.game_logic_misc import Logger
@@ -139,12 +142,21 @@ class AI:
         """this is used for development.
         instead of printing all AI info to the console, one can use the dump to display stats in-game"""
         self.__dump: str = ""
+        """set by the game before each move (see AI_GameInterface), the AI should wrap up its move after this time"""
+        self.soft_deadline: float = float('inf')
+        """source of all randomness of the AI, seeded by the game (see create_ai), such that matches are reproducible"""
+        self.rng: random.Random = random.Random()
         debug("AI (" + str(name) + ") is running")
 
     def do_move(self, ai_state: AI_GameStatus, move: AI_Move):
         """upon completion of this method, the AI should have decided on its move"""
         raise NotImplementedError("Please Implement this method")
 
+    def time_left(self) -> float:
+        """time in s until the soft deadline of the current move. Expensive searches should stop once it is <= 0.
+        If the AI does not complete its move before the hard deadline, the game plays a default move instead"""
+        return self.soft_deadline - timeit.default_timer()
+
     def get_state_as_str(self) -> str:
         """used by the UI to display some basic information which is displayed in-game. For complex output, use _dump"""
         pass
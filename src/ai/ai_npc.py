@@ -1,5 +1,4 @@
 import importlib
-import random
 from enum import Enum
 from typing import Set, Optional, Union, List, Any, Dict
 
@@ -49,20 +48,34 @@ class AI_NPC(AI):
         self.claimed_tiles: List[Tile] = []
 
         # Load the script
+        self.script = script
         script_loc = AI_NPC.Script.get_script_location(script)
         on_setup = getattr(importlib.import_module(script_loc), 'on_setup')
-        setup_weights = getattr(importlib.import_module(script_loc), 'setup_weights')
-        setup_movement_weights = getattr(importlib.import_module(script_loc), 'setup_movement_weights')
-
 
         self.properties: Dict[str, Any] = {}
         on_setup(self.properties)
         self.weights: List[Weight] = []
         self.m_weights: List[Weight] = []
-        for c, v in setup_weights(self):
-            self.weights.append(Weight(c, v))
-        for c, v in setup_movement_weights(self):
-            self.m_weights.append(Weight(c, v))
+        self._load_weights()
+
+    def _load_weights(self):
+        """the weights are closures, defined by the script"""
+        script_loc = AI_NPC.Script.get_script_location(self.script)
+        setup_weights = getattr(importlib.import_module(script_loc), 'setup_weights')
+        setup_movement_weights = getattr(importlib.import_module(script_loc), 'setup_movement_weights')
+        self.weights = [Weight(c, v) for c, v in setup_weights(self)]
+        self.m_weights = [Weight(c, v) for c, v in setup_movement_weights(self)]
+
+    def __getstate__(self):
+        """the weights cannot be pickled, they are loaded from the script again (see save games)"""
+        state = self.__dict__.copy()
+        state['weights'] = []
+        state['m_weights'] = []
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._load_weights()
 
     def do_move(self, ai_stat: AI_GameStatus, move: AI_Move):
         self._reset_dump()
@@ -184,8 +197,8 @@ class AI_NPC(AI):
         self._dump(s)
 
     def calculate_heatmaps(self, ai_stat: AI_GameStatus):
-        heat_map = essentials.simple_heat_map(ai_stat.map.building_list, ai_stat.map.walkable_tiles,
-                                              lambda n: essentials.is_obj_in_list(n, ai_stat.map.walkable_tiles))
+        heat_map = essentials.simple_heat_map(ai_stat.map.building_list, ai_stat.map.walkable_domain, None,
+                                              memo=ai_stat.map.distance_fields)
         for d, s in heat_map:
             if d <= self.properties['range_claimed_tiles']:
                 self.claimed_tiles.append(s)
@@ -197,7 +210,7 @@ class AI_NPC(AI):
                 if pre_t is None:     # no prerequisite, thus we can build and not upgrade
                     if ai_stat.me.resources >= ai_stat.cost_building_construction[bui_t]:
                         # find a random building location
-                        idx = random.randint(0, len(self.claimed_tiles) - 1)
+                        idx = self.rng.randint(0, len(self.claimed_tiles) - 1)
                         site = self.claimed_tiles[idx].offset_coordinates
                         return BuildOption(bui_t, site, [], Priority.P_MEDIUM)
         return None
@@ -213,7 +226,7 @@ class AI_NPC(AI):
 
         if len(list_of_upgradable_buildings) == 0:
             return None          # no building available that the AI can upgrade
-        idx = random.randint(0, len(list_of_upgradable_buildings) - 1)
+        idx = self.rng.randint(0, len(list_of_upgradable_buildings) - 1)
         site = list_of_upgradable_buildings[idx][0].offset_coordinates
         btype = list_of_upgradable_buildings[idx][1]
         return UpgradeOption(btype, site, Priority.P_MEDIUM)
@@ -221,10 +234,10 @@ class AI_NPC(AI):
     def evaluate_move_recruit_unit(self, ai_stat: AI_GameStatus) -> Union[None, RaiseArmyOption, RecruitmentOption]:
         if len(ai_stat.map.army_list) == 0:
             for b in ai_stat.map.building_list:
-                nei = essentials.get_neighbours_on_set(b, ai_stat.map.walkable_tiles)  # buildable -> to avoid opp armies
+                nei = essentials.get_neighbours_on_set(b, ai_stat.map.walkable_domain)  # buildable -> to avoid opp armies
                 if len(nei) == 0:
                     continue
-                x = random.sample(nei, 1)[0]
+                x = self.rng.choice(nei)
                 return RaiseArmyOption(x.offset_coordinates, Priority.P_MEDIUM)
         for t_u in self.properties['units']:
             if ai_stat.me.population + ai_stat.cost_unit_recruitment[t_u].population <= ai_stat.me.population_limit:
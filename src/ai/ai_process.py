@@ -0,0 +1,147 @@
+from __future__ import annotations
+
+import multiprocessing
+import pickle
+import timeit
+import traceback
+from multiprocessing.connection import Connection
+from typing import Optional, List, Tuple
+
+from src.ai.AI_GameStatus import AI_GameStatus, AI_Move
+from src.ai.ai_blueprint import AI, AI_Diplo
+from src.ai.wire_format import encode_status, decode_status, encode_move, decode_move
+from src.misc.game_constants import Definitions, debug, error, AI_PROCESS_START_METHOD
+from src.misc.game_logic_misc import Logger
+
+"""Execution backend which hosts each AI in a long-lived worker process (see AI_GameInterface)"""
+
+MSG_MOVE = "move"
+MSG_STOP = "stop"
+MSG_GET_STATE = "get_state"
+MSG_SET_STATE = "set_state"
+AI_PROCESS_JOIN_TIMEOUT = 1.0      # in s, see RemoteAI.close
+
+
+class AI_ProcessError(Exception):
+    """the AI has raised an exception in its worker process, the message contains the remote traceback"""
+    pass
+
+
+class MoveReply:
+    """sent back by the worker after each move: the move itself and the state the game queries from the AI"""
+    def __init__(self):
+        self.move: Optional[bytes] = None           # AI_Move in the wire format
+        self.dump: str = ""
+        self.state: str = ""
+        self.diplomacy: Optional[AI_Diplo] = None
+        self.logs: List[Logger.Log] = []           # logged by the AI in the worker, forwarded to the UI
+        self.failure: Optional[str] = None          # formatted traceback, if the AI has raised an exception
+
+
+def _serve(conn: Connection, ai_str: str, ai_name: str, player_id: int, other_players: List[int],
+           seed: Optional[int], flags: Tuple[bool, bool]):
+    """main loop of the worker process. The AI lives as long as the process, thus it keeps its state across turns"""
+    Definitions.DEBUG_MODE, Definitions.SHOW_AI_CTRL = flags
+    from src.ai.AI_GameStatus import create_ai
+    ai = create_ai(player_id, ai_str, ai_name, other_players, seed)
+    while True:
+        try:
+            msg = conn.recv()
+        except EOFError:
+            return                          # the game has terminated
+        if msg[0] == MSG_STOP:
+            return
+        if msg[0] == MSG_GET_STATE:
+            conn.send(pickle.dumps(ai, protocol=pickle.HIGHEST_PROTOCOL))
+            continue
+        if msg[0] == MSG_SET_STATE:
+            ai = pickle.loads(msg[1])
+            conn.send(_mirror(ai, MoveReply()))
+            continue
+        _, status_data, time_left = msg
+        reply = MoveReply()
+        move = AI_Move()
+        ai.soft_deadline = timeit.default_timer() + time_left
+        try:
+            ai.do_move(decode_status(status_data), move)
+            reply.move = encode_move(move)
+        except Exception:
+            reply.failure = traceback.format_exc()
+        conn.send(_mirror(ai, reply))
+
+
+def _mirror(ai: AI, reply: MoveReply) -> MoveReply:
+    """adds the state of the AI, which the game queries, to the reply"""
+    reply.dump = ai.get_dump()
+    reply.state = ai.get_state_as_str()
+    reply.diplomacy = ai.diplomacy
+    while not Logger.logs.empty():
+        reply.logs.append(Logger.logs.get())
+    return reply
+
+
+class RemoteAI(AI):
+    """
+    Stands in for an AI which runs in a separate process. The game status is sent to the worker in the wire format
+    (see wire_format.py), the worker replies with the move. Thus, the AI no longer competes with the render/update thread for the GIL.
+    The dump, state and diplomacy of the AI are mirrored after each move, such that the UI can query them as usual
+    """
+    def __init__(self, player_id: int, ai_str: str, ai_name: str, other_players: List[int],
+                 seed: Optional[int] = None):
+        super().__init__(ai_name, other_players)
+        ctx = multiprocessing.get_context(AI_PROCESS_START_METHOD)
+        self.__conn, child_conn = ctx.Pipe()
+        self.__process = ctx.Process(target=_serve, name=f"ai-{ai_name}",
+                                     args=(child_conn, ai_str, ai_name, player_id, other_players, seed,
+                                           (Definitions.DEBUG_MODE, Definitions.SHOW_AI_CTRL)),
+                                     daemon=True)        # the worker must not outlive the game
+        self.__process.start()
+        child_conn.close()
+        self.__dump: str = ""
+        self.__state: str = ""
+        debug(f"AI ({ai_name}) is running in process {self.__process.pid}")
+
+    def do_move(self, ai_state: AI_GameStatus, move: AI_Move):
+        """blocks until the worker has replied, the GIL is released in the meantime"""
+        self.__conn.send((MSG_MOVE, encode_status(ai_state), self.time_left()))
+        reply: MoveReply = self.__conn.recv()
+        self.__apply_mirror(reply)
+        if reply.failure is not None:
+            raise AI_ProcessError(f"AI {self.name} failed in its worker process:\n{reply.failure}")
+        move.__dict__.update(decode_move(reply.move).__dict__)
+
+    def __apply_mirror(self, reply: MoveReply):
+        self.__dump = reply.dump
+        self.__state = reply.state
+        if reply.diplomacy is not None:
+            self.diplomacy = reply.diplomacy
+        for log in reply.logs:
+            Logger.logs.put(log)
+
+    def get_state(self) -> bytes:
+        """:return: the pickled AI of the worker (see save games)"""
+        self.__conn.send((MSG_GET_STATE,))
+        return self.__conn.recv()
+
+    def set_state(self, state: bytes):
+        """replaces the AI of the worker by the pickled AI"""
+        self.__conn.send((MSG_SET_STATE, state))
+        self.__apply_mirror(self.__conn.recv())
+
+    def get_state_as_str(self) -> str:
+        return self.__state
+
+    def get_dump(self):
+        return self.__dump
+
+    def close(self):
+        """stops the worker process. A worker which is still busy (with an abandoned move) is terminated"""
+        try:
+            self.__conn.send((MSG_STOP,))
+        except (OSError, ValueError):
+            pass
+        self.__process.join(AI_PROCESS_JOIN_TIMEOUT)
+        if self.__process.is_alive():
+            error(f"AI {self.name} does not respond, terminating its worker process")
+            self.__process.terminate()
+        self.__conn.close()
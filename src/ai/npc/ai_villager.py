@@ -83,14 +83,14 @@ class Villager(AI_NPC):
             domain = [x for x in ai_stat.map.walkable_tiles if not x.has_building() and not x.has_army()]
             domain.append(army_tile)
             if not self.patrol_target:
-                self.patrol_target = random.sample(domain, 1)[0].offset_coordinates
+                self.patrol_target = self.rng.choice(domain).offset_coordinates
             pt = get_tile_by_xy(self.patrol_target, ai_stat.map.discovered_tiles)
             if pt not in domain:
                 self._dump("relocating patrol target, it appears to be blocked")
-                pt = random.sample(domain, 1)[0]
+                pt = self.rng.choice(domain)
             if get_distance(pt, army_tile) > 0:
                 self._dump(f"patrol tile: {pt.offset_coordinates}")
-                next_step, dist = next_step_to_target(army_tile, pt, domain)
+                next_step, dist = next_step_to_target(army_tile, pt, domain, ai_stat.map)
                 if next_step:
                     movements.append(ArmyMovementOption(pt, Priority.P_MEDIUM, next_step.offset_coordinates))
             else:
@@ -101,13 +101,14 @@ class Villager(AI_NPC):
             hostile_armies = [x for x in ai_stat.map.opp_army_list if x.owner in self.hostile_player]
             for h_a in hostile_armies:
                 domain_no_buildings = [x for x in ai_stat.map.walkable_tiles if not x.has_building()]
-                next_step, dist = protective_movement(army_tile, h_a.base_tile, village_tile, domain_no_buildings)
+                next_step, dist = protective_movement(army_tile, h_a.base_tile, village_tile, domain_no_buildings,
+                                                      ai_stat.map)
                 if next_step:
                     movements.append(ArmyMovementOption(self.patrol_target, Priority.P_MEDIUM,
                                                         next_step.offset_coordinates))
             if len(hostile_armies) == 0:
-                target = random.sample(get_neighbours_on_set(village_tile, ai_stat.map.walkable_tiles), 1)[0]
-                next_step, dist = next_step_to_target(army_tile, target, ai_stat.map.walkable_tiles)
+                target = self.rng.choice(get_neighbours_on_set(village_tile, ai_stat.map.walkable_domain))
+                next_step, dist = next_step_to_target(army_tile, target, ai_stat.map.walkable_domain, ai_stat.map)
                 if next_step:
                     movements.append(ArmyMovementOption(self.patrol_target, Priority.P_MEDIUM,
                                                         next_step.offset_coordinates))
@@ -115,8 +116,9 @@ class Villager(AI_NPC):
         elif self.state is AI_NPC.AI_State.AGGRESSIVE:
             hostile_armies = [x for x in ai_stat.map.opp_army_list if x.owner in self.hostile_player]
             hostile_buildings = [x for x in ai_stat.map.opp_building_list if x.owner in self.hostile_player]
-            for h_target in list(set().union(hostile_armies, hostile_buildings)):
-                next_step, dist = next_step_to_target(army_tile, h_target.base_tile, ai_stat.map.walkable_tiles)
+            for h_target in hostile_armies + hostile_buildings:
+                next_step, dist = next_step_to_target(army_tile, h_target.base_tile, ai_stat.map.walkable_domain,
+                                                     ai_stat.map)
                 if next_step:
                     movements.append(ArmyMovementOption(h_target, Priority.P_MEDIUM, next_step.offset_coordinates))
         return movements
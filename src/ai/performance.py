@@ -43,11 +43,19 @@ class PerfomanceLog:
     score: int
 
 
+@dataclass
+class OverrunLog:
+    """the AI exceeded its hard time budget in this turn"""
+    turn_nr: int
+    duration: float
+
+
 class PerformanceLogger:
     """can print the performance to a csv file """
 
     data: Dict[int, List[PerfomanceLog]] = {}
     pid_c: List[Tuple[int, str]] = []
+    overruns: Dict[int, List[OverrunLog]] = {}
 
     @staticmethod
     def setup(player_ids_and_colours: List[Tuple[int, str]]):
@@ -59,6 +67,14 @@ class PerformanceLogger:
     def log_performance_file(turn_nr: int, player_id: int, score: int):
         PerformanceLogger.data[player_id].append(PerfomanceLog(turn_nr, score))
 
+    @staticmethod
+    def log_overrun(turn_nr: int, player_id: int, duration: float):
+        """the move was discarded, thus the score of the last turn is repeated to keep the data aligned"""
+        PerformanceLogger.overruns.setdefault(player_id, []).append(OverrunLog(turn_nr, duration))
+        logs = PerformanceLogger.data.get(player_id)
+        if logs is not None:
+            logs.append(PerfomanceLog(turn_nr, logs[-1].score if len(logs) > 0 else 0))
+
     @staticmethod
     def show():
         y = []
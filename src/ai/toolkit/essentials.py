@@ -1,21 +1,81 @@
 from __future__ import annotations
 
 import copy
-import queue
+import heapq
+from collections import deque
 from dataclasses import dataclass
-from typing import List, Union, Tuple, Callable, Set, Optional
+from typing import List, Union, Tuple, Callable, Set, Optional, Dict, Iterable, Any
 
-from src.ai.AI_MapRepresentation import Tile, AI_Element
+from src.ai.AI_MapRepresentation import Tile, AI_Element, TileSet
 from src.hex_map import Hexagon
+from src.misc import cube_coords
 from src.misc.game_constants import debug
 
 # ------------------------ Essential TOOLKIT FUNCTIONS: ------------------------
 
 AI_OBJ = Union[AI_Element, Tile]
+DOMAIN = Union[List[Tile], Set[Tile], TileSet]
 
 
-def simple_heat_map(initial_set: List[AI_OBJ], working_set: List[AI_OBJ],
-                    condition: Callable[[AI_OBJ], bool]) -> List[Tuple[int, AI_OBJ]]:
+def to_domain(domain: DOMAIN) -> TileSet:
+    """
+    returns the domain as TileSet (O(1) membership checks). If it is one already, it is returned as it is.
+    Convert a list once, before using it as domain in a loop (or use the cached domains of the Map, e.g.
+    ai_stat.map.walkable_domain)
+    """
+    if type(domain) is TileSet:
+        return domain
+    return TileSet(domain)
+
+
+def distance_field(sources: Iterable[AI_OBJ], domain: DOMAIN, condition: Optional[Callable[[Tile], bool]] = None,
+                   condition_key: Optional[str] = None,
+                   memo: Optional[Dict[Any, Dict[Tuple[int, int], int]]] = None) -> Dict[Tuple[int, int], int]:
+    """
+    multi-source breadth first search: distance of each tile in the domain to the closest source.
+    The sources have distance 0 and are part of the field. Tiles which are not reachable are not part of it.
+    The field is ordered by distance (order in which the tiles have been reached)
+
+    The field can be memoised, such that several components of an AI share one computation per turn. Pass the
+    memo of the map (ai_stat.map.distance_fields, reset with every snapshot). As lambda functions cannot be
+    compared, a field with a condition is only memoised if a condition_key, which identifies the condition, is given
+
+    :param sources: objects (tiles, buildings, armies, ...) from where to start the search
+    :param domain: only tiles in the domain are considered for the search
+    :param condition: optional, additional condition a tile has to satisfy to be included into the search
+    :param condition_key: identifies the condition for the memoisation
+    :param memo: optional, cache of fields
+    :return: distance field: offset coordinates -> distance (do not modify it, it may be shared)
+    """
+    domain = to_domain(domain)
+    sources = list(sources)
+    key = None
+    if memo is not None and (condition is None or condition_key is not None):
+        key = (frozenset(s.offset_coordinates for s in sources), domain.key, condition_key)
+        if key in memo:
+            return memo[key]
+
+    field: Dict[Tuple[int, int], int] = {}
+    frontier = deque()
+    for s in sources:
+        if s.offset_coordinates not in field:
+            field[s.offset_coordinates] = 0
+            frontier.append((0, s))
+    while frontier:
+        d, s = frontier.popleft()
+        for n in get_neighbours(s):
+            if n.offset_coordinates not in field and n in domain and (condition is None or condition(n)):
+                field[n.offset_coordinates] = d + 1
+                frontier.append((d + 1, n))
+
+    if key is not None:
+        memo[key] = field
+    return field
+
+
+def simple_heat_map(initial_set: List[AI_OBJ], working_set: DOMAIN,
+                    condition: Optional[Callable[[AI_OBJ], bool]], condition_key: Optional[str] = None,
+                    memo: Optional[Dict[Any, Dict[Tuple[int, int], int]]] = None) -> List[Tuple[int, AI_OBJ]]:
     """
     create simple heat map.
     Essentially, this performs a breadth first search, starting from a set, instead of a single point.
@@ -26,33 +86,28 @@ def simple_heat_map(initial_set: List[AI_OBJ], working_set: List[AI_OBJ],
 
     The lambda function allows for an additional selection on which tiles get included into the search.
     For instance, one might want to exclude all tiles, which have a resource
+    The heat map is derived from distance_field, see there for the memoisation (condition_key, memo)
+    Only the objects of the initial set are excluded: if these are buildings or armies, their tiles are part of the
+    heat map (reached from a neighbouring tile), tiles of the initial set are not
 
     :param initial_set: list from where to start the search
     :param working_set: only neighbors, which are in this list will be considered for the search
-    :param condition: additional condition, see above
+    :param condition: additional condition, see above (None: no condition)
+    :param condition_key: identifies the condition, see distance_field
+    :param memo: cache of distance fields, see distance_field
     :return: heat map, a tuple containing an integer value which is the distance to the closest object in initial list plus the object itself
     """
-
-    heat_map: List[Tuple[int, AI_OBJ]] = []
-    tmp = queue.Queue()
-    discovered = set()
-    for i in initial_set:
-        tmp.put((-1, i))
-    while not tmp.empty():
-        d, s = tmp.get()
-        if s in discovered:
-            continue
-        discovered.add(s)
-        if d >= 0:
-            heat_map.append((d, s))
-        nei = get_neighbours_on_set(s, working_set)
-        for n in nei:
-            if n not in discovered and condition(n):
-                tmp.put((d + 1, n))
-    return heat_map
+    working_set = to_domain(working_set)
+    excluded = {i.offset_coordinates for i in initial_set if type(i) is Tile}
+    # tiles next to the initial set have a value of 0 in the heat map. They are the sources of the field, such that
+    # the tiles of buildings and armies of the initial set are searched like any other tile
+    ring = [n for i in initial_set for n in get_neighbours(i)
+            if n.offset_coordinates not in excluded and n in working_set and (condition is None or condition(n))]
+    field = distance_field(ring, working_set, condition, condition_key, memo)
+    return [(d, working_set.tiles[oc]) for oc, d in field.items() if oc not in excluded]
 
 
-def bfs(start: Tile, target: Tile, domain: List[Tile]) -> List[Tile]:
+def bfs(start: Tile, target: Tile, domain: DOMAIN) -> List[Tile]:
     """
 
     :param start:
@@ -61,16 +116,17 @@ def bfs(start: Tile, target: Tile, domain: List[Tile]) -> List[Tile]:
     :return:
     """
     path: List[Tile] = []
-    tmp = queue.Queue()
-    tmp.put((0, start))
+    tmp = deque()
+    tmp.append((0, start))
+    domain = to_domain(domain)
     discovered = set()
     path_endpoint = None
     for d in domain:
         d.pre = None
         d.dist = -1
 
-    while not tmp.empty():
-        d, s = tmp.get()
+    while tmp:
+        d, s = tmp.popleft()
         if s in discovered:
             continue
         discovered.add(s)
@@ -82,7 +138,7 @@ def bfs(start: Tile, target: Tile, domain: List[Tile]) -> List[Tile]:
             if n not in discovered:
                 n.dist = d + 1
                 n.pre = s
-                tmp.put((d + 1, n))
+                tmp.append((d + 1, n))
 
     if path_endpoint:
         cur = path_endpoint
@@ -109,66 +165,61 @@ class AStarNode:
         return self.base_tile.offset_coordinates == other.base_tile.offset_coordinates
 
 
-def a_star(start: Tile, target: Tile, domain: List[Tile]) -> List[Tile]:
+def a_star(start: Tile, target: Tile, domain: DOMAIN) -> List[Tile]:
     """
     A* path finding routine, in sparse hexagonal maps a relatively fast way of finding the shortest path
     from start to target
     As heuristic, I use the distance between two nodes
+    The open list is a binary heap, ties in f are resolved in insertion order (first in, first out).
+    Each tile is expanded at most once (closed set), which is fine since the heuristic is consistent.
 
     :param start: start tile
     :param target: target tile
     :param domain: search domain which as to be explored. This has to be a connected graph. Also, start and finish
     should be part of the domain
-    :return: a path, including the start and finish tile
+    :return: a path, including the start and finish tile. [start] if no path can be found
     """
+    domain = to_domain(domain)
     if target not in domain or start not in domain:
         print("no pathfinding possible")
         return [start]
+    target_coords = target.offset_coordinates
 
     start_node = AStarNode(start)
-    end_node = AStarNode(target)
-
-    open_list = []
-    closed_list = []
-
-    open_list.append(start_node)
-    while len(open_list) > 0:
-        current_node = open_list[0]
-        current_index = 0
-        for index, item in enumerate(open_list):
-            if item.f < current_node.f:
-                current_node = item
-                current_index = index
-
-        open_list.pop(current_index)
-        closed_list.append(current_node)
-
-        if current_node == end_node:
+    open_heap: List[Tuple[int, int, AStarNode]] = [(0, 0, start_node)]     # (f, insertion order, node)
+    best_g: Dict[Tuple[int, int], int] = {start.offset_coordinates: 0}
+    closed: Set[Tuple[int, int]] = set()
+    counter = 0
+    while len(open_heap) > 0:
+        current_node = heapq.heappop(open_heap)[2]
+        current_coords = current_node.base_tile.offset_coordinates
+        if current_coords in closed:
+            continue                # outdated entry, the tile has been reached on a shorter path already
+        closed.add(current_coords)
+
+        if current_coords == target_coords:
             path = []
             current = current_node
             while current is not None:
                 path.append(current.base_tile)
                 current = current.parent
-            return path[::-1]   # is this the same as [::-1] <-> reverse?
-
-        children = []
-        for child in get_neighbours_on_set(current_node, domain):
-            children.append(AStarNode(child, parent=current_node))
-
-        for child in children:
-            for c in closed_list:
-                if child == c:
-                    continue
-
-            child.g = current_node.g + 1
-            child.h = get_distance(end_node.base_tile, child.base_tile)
+            return path[::-1]
+
+        g = current_node.g + 1
+        for child_tile in get_neighbours(current_node.base_tile):
+            child_coords = child_tile.offset_coordinates
+            if not domain.contains_coordinates(child_coords) or child_coords in closed:
+                continue
+            if g >= best_g.get(child_coords, g + 1):
+                continue            # already in the open list with an equal or shorter path
+            best_g[child_coords] = g
+            child = AStarNode(child_tile, parent=current_node)
+            child.g = g
+            child.h = get_distance(target, child_tile)
             child.f = child.g + child.h
-
-            for open_node in open_list:
-                if child == open_node and child.g > open_node.g:
-                    continue
-
-            open_list.append(child)
+            counter = counter + 1
+            heapq.heappush(open_heap, (child.f, counter, child))
+    return [start]              # target is not reachable within the domain
 
 
 def dijkstra_pq(start: Tile, target: Tile, domain: List[Tile]) -> List[Tile]:
@@ -256,20 +307,16 @@ def get_tile_by_xy(coords, discovered_tiles: []):
     return None
 
 
-def get_neighbours_on_set(tile: Union[AI_OBJ, AStarNode], working_set: List[Tile]) -> List[Tile]:
+def get_neighbours_on_set(tile: Union[AI_OBJ, AStarNode], working_set: DOMAIN) -> List[Tile]:
     """
+    (!) if called in a loop, pass a TileSet as working set (see to_domain), lists are converted on each call
 
     :param tile:
     :param working_set: the domain, in which the neighbors are searched
     :return: a list of all neighbors of the tile, which are also in the working list
     """
-    # return [x for x in get_neighbours(tile) if x in working_set]
-    ret = []
-    for x in get_neighbours(tile):
-        for w in working_set:
-            if x.offset_coordinates == w.offset_coordinates:
-                ret.append(x)
-    return ret
+    working_set = to_domain(working_set)
+    return [x for x in get_neighbours(tile) if x in working_set]
 
 
 def get_neighbours(e: Union[AI_OBJ, AStarNode]) -> List[Tile]:
@@ -291,9 +338,7 @@ def get_neighbours(e: Union[AI_OBJ, AStarNode]) -> List[Tile]:
 
 
 def get_distance(a: AI_OBJ, b: AI_OBJ) -> int:
-    cc1 = offset_to_cube_xy(a.offset_coordinates[0], a.offset_coordinates[1])
-    cc2 = offset_to_cube_xy(b.offset_coordinates[0], b.offset_coordinates[1])
-    return cube_distance(cc1, cc2)
+    return cube_coords.offset_distance(a.offset_coordinates, b.offset_coordinates)
 
 
 # def getListDistanceOne(t1, li):     # get neighbours
@@ -308,10 +353,7 @@ def getDistance(off1: Tuple[int, int], off2: Tuple[int, int]) -> int:
     # dy = float(abs(t1.y_grid - t2.y_grid))
     # dx = float(abs(t1.x_grid - t2.x_grid))
     # return int(dy + max(math.ceil(dx - dy / float(2)), float(0)))
-    cube_coords_t1 = offset_to_cube_xy(off1[0], off1[1])
-    cube_coords_t2 = offset_to_cube_xy(off2[0], off2[1])
-    dist = cube_distance(cube_coords_t1, cube_coords_t2)
-    return dist
+    return cube_coords.offset_distance(off1, off2)
 
 
 # def getDistance_xy(a:(int, int), b:(int, int)):
@@ -326,10 +368,7 @@ def getDistance(off1: Tuple[int, int], off2: Tuple[int, int]) -> int:
 #    return row, col
 
 def offset_to_cube_xy(x, y):
-    c_x = x - (y - (y & 1)) / 2
-    c_z = y
-    c_y = -c_x - c_z
-    return c_x, c_y, c_z
+    return cube_coords.offset_to_cube(x, y)
 
 
 # def get_resource_on_tile_xy(offset_c: (int, int), res_list):
@@ -340,26 +379,25 @@ def offset_to_cube_xy(x, y):
 
 
 def offset_to_cube_coord(hex):
-    x = hex.offset_coordinates[0] - (hex.offset_coordinates[1] - (hex.offset_coordinates[1] & 1)) / 2
-    z = hex.offset_coordinates[1]
-    y = -x - z
-    return x, y, z
+    return cube_coords.offset_to_cube(hex.offset_coordinates[0], hex.offset_coordinates[1])
 
 
 def cube_distance(a, b):
-    return (abs(a[0] - b[0]) + abs(a[1] - b[1]) + abs(a[2] - b[2])) / 2
+    return cube_coords.cube_distance(a, b)
 
 
-def is_obj_in_list(obj: Union[AI_OBJ, Hexagon], domain: List[Union[AI_OBJ, Hexagon]]) -> bool:
+def is_obj_in_list(obj: Union[AI_OBJ, Hexagon], domain: Union[List[Union[AI_OBJ, Hexagon]], TileSet]) -> bool:
     """
     check whether a the offset coordinates of an object match the ones of an element in the list
     comparison is done via the coordinates of the element
+    If the domain is a TileSet, this is O(1), otherwise linear in the length of the list
 
     :param obj: any object, which has offset_coordinates AI_Object or Hexagon
-    :param domain: comparison list
+    :param domain: comparison list or TileSet
     :return: True, if the object is in the list, else False
     """
-
+    if type(domain) is TileSet:
+        return obj in domain
     for e in domain:
         if e.offset_coordinates == obj.offset_coordinates:
             return True
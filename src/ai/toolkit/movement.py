@@ -1,20 +1,37 @@
-from typing import Optional, List, Tuple
+from typing import Optional, Tuple
 
-from src.ai.AI_MapRepresentation import Tile
+from src.ai.AI_MapRepresentation import Tile, Map, PathTree
 from src.ai.toolkit import essentials
 from src.misc.game_constants import error
 
 
 # ------------------------ Movement TOOLKIT FUNCTIONS: ------------------------
+# If the map is passed (ai_map), the shortest paths are taken from its path service (Map.get_path_tree), which
+# computes them once per turn and target. Otherwise, a path tree is computed for the call
 
 
-def next_step_to_target(current_tile: Tile, target_tile: Tile, domain: List[Tile]) -> Tuple[Optional[Tile], int]:
+def get_path_tree(target_tile: Tile, domain: essentials.DOMAIN, ai_map: Optional[Map] = None) -> PathTree:
+    """
+    :param target_tile: target
+    :param domain: the search domain, typically a subset of the walkable tiles
+    :param ai_map: optional, the map whose path service should be used
+    :return: shortest paths from any tile of the domain to the target
+    """
+    domain = essentials.to_domain(domain)
+    if ai_map is not None:
+        return ai_map.get_path_tree(target_tile, domain)
+    return PathTree(target_tile, domain)
+
+
+def next_step_to_target(current_tile: Tile, target_tile: Tile, domain: essentials.DOMAIN,
+                        ai_map: Optional[Map] = None) -> Tuple[Optional[Tile], int]:
     """
     basic movement, returns next step, not the complete path
 
     :param current_tile: current tile of the walkable entity
     :param target_tile: target
     :param domain: the search domain, typically a subset of the walkable tiles
+    :param ai_map: optional, see above
     :return: None, if no path is found, otherwise the next tile (step) where the army can move and the distance of the path
     """
     if not current_tile:
@@ -23,13 +40,15 @@ def next_step_to_target(current_tile: Tile, target_tile: Tile, domain: List[Tile
     if not target_tile:
         error("target tile is None")
         return None, -1
-    path = essentials.a_star(current_tile, target_tile, domain)
-    if len(path) <= 1:  # no path found
+    tree = get_path_tree(target_tile, domain, ai_map)
+    step = tree.next_step(current_tile)
+    if step is None:  # no path found
         return None, -1
-    return path[1], len(path) - 1          # return next step and distance of the path
+    return step, tree.distance(current_tile)          # return next step and distance of the path
 
 
-def evasive_movement(current_tile: Tile, target_tile: Tile, domain: List[Tile]) -> Tuple[Optional[Tile], int]:
+def evasive_movement(current_tile: Tile, target_tile: Tile, domain: essentials.DOMAIN,
+                     ai_map: Optional[Map] = None) -> Tuple[Optional[Tile], int]:
     """
     This movement calculates the next step which maximizes the distance to the target_tile
     Use with method to avoid collision between the entity placed on the current_tile, with a potentially
@@ -38,6 +57,7 @@ def evasive_movement(current_tile: Tile, target_tile: Tile, domain: List[Tile])
     :param current_tile: tile of the evading entity
     :param target_tile: tile of the hostile entity
     :param domain: the search domain, typically a subset of the walkable tiles
+    :param ai_map: optional, see above
     :return: None, if no path is found, otherwise the next step and the distance of the resulting distance to target
     """
     if not current_tile:
@@ -46,10 +66,12 @@ def evasive_movement(current_tile: Tile, target_tile: Tile, domain: List[Tile])
     if not target_tile:
         error("target tile is None")
         return None, -1
+    domain = essentials.to_domain(domain)
+    tree = get_path_tree(target_tile, domain, ai_map)
     longest_path: Tuple[int, Optional[Tile]] = (-1, None)
     for nei in essentials.get_neighbours_on_set(current_tile, domain):
-        step, dist = next_step_to_target(nei, target_tile, domain)
-        if step:
+        if tree.next_step(nei):
+            dist = tree.distance(nei)
             if dist > longest_path[0]:
                 longest_path = (dist, nei)
 
@@ -57,7 +79,7 @@ def evasive_movement(current_tile: Tile, target_tile: Tile, domain: List[Tile])
 
 
 def protective_movement(current_tile: Tile, target_tile: Tile, protected_tile: Tile,
-                        domain: List[Tile]) -> Tuple[Optional[Tile], int]:
+                        domain: essentials.DOMAIN, ai_map: Optional[Map] = None) -> Tuple[Optional[Tile], int]:
     """
     If an army/obj chooses to use protective movement, it will stay close to the entity it is protecting
     It will position itself such that it intercepts the incoming hostile entity on the target tile if possible
@@ -66,18 +88,21 @@ def protective_movement(current_tile: Tile, target_tile: Tile, protected_tile: T
     :param target_tile: tile of the hostile entity
     :param protected_tile: tile of the entity which is to be protected
     :param domain: the search domain, typically a subset of the walkable tiles
+    :param ai_map: optional, see above
     :return: None if there is a problem or no path is found, otherwise the next step and the size of the path
     """
     if not (current_tile and target_tile and protected_tile):
         error("a tile is None")
         return None, -1
+    domain = essentials.to_domain(domain)
+    tree = get_path_tree(target_tile, domain, ai_map)
     shortest_path: Tuple[int, Optional[Tile]] = (1000, None)
     for nei in essentials.get_neighbours_on_set(protected_tile, domain):
-        step, dist = next_step_to_target(nei, target_tile, domain)
-        if step:
+        if tree.next_step(nei):
+            dist = tree.distance(nei)
             if dist < shortest_path[0]:
                 shortest_path = (dist, nei)
-    return next_step_to_target(current_tile, shortest_path[1], domain)
+    return next_step_to_target(current_tile, shortest_path[1], domain, ai_map)
 
 
 
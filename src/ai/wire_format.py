@@ -0,0 +1,365 @@
+import struct
+import sys
+from array import array
+from functools import partial
+from typing import List, Optional, Tuple, Dict, Type, Any, Union
+from enum import Enum
+
+from src.ai.AI_GameStatus import AI_GameStatus, AI_Move
+from src.ai.AI_MapRepresentation import Map, Tile, AI_Resource, AI_Army, AI_Building, AI_Player, AI_Opponent, AI_Trade
+from src.misc.game_constants import GroundType, ResourceType, BuildingType, BuildingState, PlayerType, UnitType, \
+    UnitCost, TradeType, TradeCategory, TradeState, MoveType
+
+"""
+Compact, versioned binary encoding of AI_GameStatus and AI_Move, e.g. to ship them to an AI worker process.
+The map is encoded as flat arrays (coordinates, ground types and flags of the tiles, tile indices of the lists and
+records of the objects) instead of the linked Tile graph. On the receiving side, the linked Map is rebuilt lazily
+upon the first access of AI_GameStatus.map. The encoding is exact: encode(decode(data)) == data
+
+layout (little endian):
+    header:     magic (3s), version (B), kind (B)
+    scalars:    numbers are tagged, 'q' (int64) or 'd' (float64). Strings are utf-8 with their length (I)
+                arrays of numbers are float64 if one of the numbers is a float
+    enums:      value (i), NONE for None
+    arrays:     length (I), typecode (c), items
+    map:        tiles (x, y, ground, flags), tile lists (indices), resources, armies and buildings (columns)
+"""
+
+WIRE_MAGIC = b"FAI"
+WIRE_VERSION = 1
+KIND_STATUS = 1
+KIND_MOVE = 2
+KIND_MAP = 3                        # nested in the status
+NONE = -2 ** 31                     # encoding of an enum (or tag) which is None
+
+FLAG_SCOUTABLE = 1
+FLAG_WALKABLE = 2
+FLAG_BUILDABLE = 4
+FLAG_DISCOVERED = 8
+
+TYPE_NONE = 0                       # AI_Move.type is either None, a BuildingType or a UnitType
+TYPE_BUILDING = 1
+TYPE_UNIT = 2
+
+_HEADER = struct.Struct("<3sBB")
+_ARRAY_HEADER = struct.Struct("<Ic")
+_SWAP = sys.byteorder != "little"
+
+
+class WireFormatError(Exception):
+    """the data is not a valid encoding (wrong magic, version or kind, truncated)"""
+    pass
+
+
+class _Writer:
+    def __init__(self, kind: int):
+        self.buf = bytearray(_HEADER.pack(WIRE_MAGIC, WIRE_VERSION, kind))
+
+    def pack(self, fmt: str, *values):
+        self.buf += struct.pack("<" + fmt, *values)
+
+    def number(self, v: Union[int, float]):
+        if isinstance(v, float):
+            self.buf += struct.pack("<cd", b'd', v)
+        else:
+            self.buf += struct.pack("<cq", b'q', v)
+
+    def string(self, s: str):
+        b = s.encode("utf-8")
+        self.buf += struct.pack("<I", len(b))
+        self.buf += b
+
+    def enum(self, e: Optional[Enum]):
+        self.buf += struct.pack("<i", NONE if e is None else e.value)
+
+    def array(self, typecode: str, values):
+        a = array(typecode, values)
+        if _SWAP:
+            a.byteswap()
+        self.buf += _ARRAY_HEADER.pack(len(a), typecode.encode())
+        self.buf += a.tobytes()
+
+    def numbers(self, values: List[Union[int, float]]):
+        """integers as int64, unless one of the values is a float"""
+        self.array('d' if any(isinstance(v, float) for v in values) else 'q', values)
+
+
+class _Reader:
+    def __init__(self, data: bytes, kind: int):
+        self.data = memoryview(data)
+        if len(data) < _HEADER.size:
+            raise WireFormatError("truncated header")
+        magic, version, k = _HEADER.unpack_from(self.data, 0)
+        if magic != WIRE_MAGIC:
+            raise WireFormatError(f"wrong magic {magic}")
+        if version != WIRE_VERSION:
+            raise WireFormatError(f"unsupported version {version}, expected {WIRE_VERSION}")
+        if k != kind:
+            raise WireFormatError(f"unexpected kind {k}, expected {kind}")
+        self.pos = _HEADER.size
+
+    def unpack(self, fmt: str) -> Tuple:
+        s = struct.Struct("<" + fmt)
+        try:
+            values = s.unpack_from(self.data, self.pos)
+        except struct.error as e:
+            raise WireFormatError(str(e))
+        self.pos = self.pos + s.size
+        return values
+
+    def number(self) -> Union[int, float]:
+        tag = self.unpack("c")[0]
+        return self.unpack(tag.decode())[0]
+
+    def string(self) -> str:
+        n = self.unpack("I")[0]
+        s = bytes(self.data[self.pos:self.pos + n]).decode("utf-8")
+        self.pos = self.pos + n
+        return s
+
+    def enum(self, enum_type: Type[Enum]) -> Optional[Any]:
+        v = self.unpack("i")[0]
+        return None if v == NONE else enum_type(v)
+
+    def array(self) -> array:
+        n, typecode = self.unpack("Ic")
+        a = array(typecode.decode())
+        end = self.pos + n * a.itemsize
+        if end > len(self.data):
+            raise WireFormatError("truncated array")
+        a.frombytes(self.data[self.pos:end])
+        if _SWAP:
+            a.byteswap()
+        self.pos = end
+        return a
+
+    def bytes(self) -> bytes:
+        n = self.unpack("I")[0]
+        b = bytes(self.data[self.pos:self.pos + n])
+        self.pos = self.pos + n
+        return b
+
+
+def _enum_values(values: List[Optional[Enum]]) -> List[int]:
+    return [NONE if e is None else e.value for e in values]
+
+
+def _enum_lookup(enum_type: Type[Enum]) -> Dict[int, Optional[Enum]]:
+    lookup: Dict[int, Optional[Enum]] = {e.value: e for e in enum_type}
+    lookup[NONE] = None
+    return lookup
+
+
+# ------------------------------------------------------ map ----------------------------------------------------------
+
+def encode_map(ai_map: Map) -> bytes:
+    w = _Writer(KIND_MAP)
+    tiles = list(ai_map.map.values())
+    index: Dict[int, int] = {id(t): i for i, t in enumerate(tiles)}
+    idx = 'H' if len(tiles) <= 0xFFFF else 'I'
+    w.array('h', [t.offset_coordinates[0] for t in tiles])
+    w.array('h', [t.offset_coordinates[1] for t in tiles])
+    w.array('i', _enum_values([t.ground_type for t in tiles]))
+    w.array('B', [(FLAG_SCOUTABLE if t.is_scoutable else 0) | (FLAG_WALKABLE if t.is_walkable else 0) |
+                  (FLAG_BUILDABLE if t.is_buildable else 0) | (FLAG_DISCOVERED if t.is_discovered else 0)
+                  for t in tiles])
+    for tile_list in (ai_map.scoutable_tiles, ai_map.buildable_tiles, ai_map.walkable_tiles,
+                      ai_map.own_farm_field_tiles, ai_map.discovered_tiles):
+        w.array(idx, [index[id(t)] for t in tile_list])
+    # resources
+    w.array(idx, [index[id(r.base_tile)] for r in ai_map.resource_list])
+    w.array('i', _enum_values([r.type for r in ai_map.resource_list]))
+    w.numbers([r.amount for r in ai_map.resource_list])
+    # armies
+    for army_list in (ai_map.army_list, ai_map.opp_army_list):
+        w.array(idx, [index[id(a.base_tile)] for a in army_list])
+        w.array('q', [v for a in army_list
+                      for v in (a.owner, a.population, a.knights, a.mercenaries, a.barbaric_soldiers)])
+    # buildings
+    for building_list in (ai_map.building_list, ai_map.opp_building_list):
+        w.array(idx, [index[id(b.base_tile)] for b in building_list])
+        w.array('i', _enum_values([b.type for b in building_list]))
+        w.array('i', _enum_values([b.state for b in building_list]))
+        w.array('q', [b.owner for b in building_list])
+        w.array('B', [b.visible for b in building_list])
+        w.array(idx, [len(b.associated_tiles) for b in building_list])
+        w.array(idx, [index[id(t)] for b in building_list for t in b.associated_tiles])
+    return bytes(w.buf)
+
+
+def decode_map(data: bytes) -> Map:
+    r = _Reader(data, KIND_MAP)
+    xs, ys, grounds, flags = r.array(), r.array(), r.array(), r.array()
+    ground_types = _enum_lookup(GroundType)
+    ai_map = Map()
+    tiles: List[Tile] = []
+    for x, y, g, f in zip(xs, ys, grounds, flags):
+        t = Tile((x, y), ground_types[g])
+        t.is_scoutable = bool(f & FLAG_SCOUTABLE)
+        t.is_walkable = bool(f & FLAG_WALKABLE)
+        t.is_buildable = bool(f & FLAG_BUILDABLE)
+        t.is_discovered = bool(f & FLAG_DISCOVERED)
+        ai_map.map[t.offset_coordinates] = t
+        tiles.append(t)
+    ai_map.scoutable_tiles = [tiles[i] for i in r.array()]
+    ai_map.buildable_tiles = [tiles[i] for i in r.array()]
+    ai_map.walkable_tiles = [tiles[i] for i in r.array()]
+    ai_map.own_farm_field_tiles = [tiles[i] for i in r.array()]
+    ai_map.discovered_tiles = [tiles[i] for i in r.array()]
+    ai_map.connect_graph()
+    # resources
+    resource_types = _enum_lookup(ResourceType)
+    for i, rt, amount in zip(r.array(), r.array(), r.array()):
+        res = AI_Resource(tiles[i])
+        res.type = resource_types[rt]
+        res.amount = amount
+        res.base_tile.resource = res
+        ai_map.resource_list.append(res)
+    # armies
+    for army_list in (ai_map.army_list, ai_map.opp_army_list):
+        positions, values = r.array(), r.array()
+        for n, i in enumerate(positions):
+            a = AI_Army(tiles[i])
+            a.owner, a.population, a.knights, a.mercenaries, a.barbaric_soldiers = values[5 * n:5 * n + 5]
+            a.base_tile.army = a
+            army_list.append(a)
+    # buildings
+    building_types = _enum_lookup(BuildingType)
+    building_states = _enum_lookup(BuildingState)
+    for building_list in (ai_map.building_list, ai_map.opp_building_list):
+        positions, types, states, owners, visible, num_associated, associated = \
+            r.array(), r.array(), r.array(), r.array(), r.array(), r.array(), r.array()
+        k = 0
+        for n, i in enumerate(positions):
+            b = AI_Building(tiles[i])
+            b.type = building_types[types[n]]
+            b.state = building_states[states[n]]
+            b.owner = owners[n]
+            b.visible = bool(visible[n])
+            b.associated_tiles = [tiles[j] for j in associated[k:k + num_associated[n]]]
+            k = k + num_associated[n]
+            b.base_tile.building = b
+            building_list.append(b)
+    return ai_map
+
+
+# ------------------------------------------------------ status -------------------------------------------------------
+
+def _encode_trade(w: _Writer, t: AI_Trade):
+    w.number(t.owner_id)
+    w.enum(t.type)
+    for part in (t.offer, t.demand):
+        w.pack("?", part is not None)
+        if part is not None:
+            w.enum(part[0])
+            w.number(part[1])
+    w.enum(t.state)
+    w.number(t.target_id)
+
+
+def _decode_trade(r: _Reader) -> AI_Trade:
+    owner_id = r.number()
+    trade_type = r.enum(TradeType)
+    parts = []
+    for _ in range(2):
+        parts.append((r.enum(TradeCategory), r.number()) if r.unpack("?")[0] else None)
+    state = r.enum(TradeState)
+    return AI_Trade(owner_id, trade_type, parts[0], parts[1], state, r.number())
+
+
+def encode_status(ai_stat: AI_GameStatus) -> bytes:
+    w = _Writer(KIND_STATUS)
+    w.number(ai_stat.turn_nr)
+    w.number(ai_stat.costScout)
+    me = ai_stat.me
+    w.number(me.id)
+    w.string(me.name)
+    w.enum(me.type)
+    for v in (me.resources, me.culture, me.food, me.population, me.population_limit):
+        w.number(v)
+    w.pack("I", len(ai_stat.opponents))
+    for o in ai_stat.opponents:
+        w.number(o.id)
+        w.string(o.name)
+        w.enum(o.type)
+        w.pack("??", o.has_attacked, o.has_lost)
+    w.pack("I", len(ai_stat.trades))
+    for t in ai_stat.trades:
+        _encode_trade(w, t)
+    w.array('i', _enum_values(list(ai_stat.cost_building_construction.keys())))
+    w.numbers(list(ai_stat.cost_building_construction.values()))
+    w.array('i', _enum_values(list(ai_stat.cost_unit_recruitment.keys())))
+    w.numbers([v for c in ai_stat.cost_unit_recruitment.values() for v in (c.resources, c.culture, c.population)])
+    map_data = encode_map(ai_stat.map)
+    w.pack("I", len(map_data))
+    w.buf += map_data
+    return bytes(w.buf)
+
+
+def decode_status(data: bytes) -> AI_GameStatus:
+    """the map is decoded upon the first access of ai_stat.map"""
+    r = _Reader(data, KIND_STATUS)
+    ai_stat = AI_GameStatus()
+    ai_stat.turn_nr = r.number()
+    ai_stat.costScout = r.number()
+    me_id, me_name, me_type = r.number(), r.string(), r.enum(PlayerType)
+    ai_stat.me = AI_Player(me_id, me_name, me_type, *[r.number() for _ in range(5)])
+    ai_stat.opponents = []
+    for _ in range(r.unpack("I")[0]):
+        o = AI_Opponent(r.number(), r.string(), r.enum(PlayerType))
+        o.has_attacked, o.has_lost = r.unpack("??")
+        ai_stat.opponents.append(o)
+    ai_stat.trades = [_decode_trade(r) for _ in range(r.unpack("I")[0])]
+    building_types = _enum_lookup(BuildingType)
+    ai_stat.cost_building_construction = {building_types[k]: v for k, v in zip(r.array(), r.array())}
+    unit_types = _enum_lookup(UnitType)
+    keys, costs = r.array(), r.array()
+    ai_stat.cost_unit_recruitment = {unit_types[k]: UnitCost(*costs[3 * n:3 * n + 3]) for n, k in enumerate(keys)}
+    ai_stat.set_map_loader(partial(decode_map, r.bytes()))
+    return ai_stat
+
+
+# ------------------------------------------------------ move ---------------------------------------------------------
+
+def encode_move(move: AI_Move) -> bytes:
+    w = _Writer(KIND_MOVE)
+    w.enum(move.move_type)
+    w.pack("?", move.doMoveArmy)
+    w.pack("ii", *move.move_army_to)
+    w.pack("ii", *move.loc)
+    if isinstance(move.type, BuildingType):
+        w.pack("B", TYPE_BUILDING)
+    elif isinstance(move.type, UnitType):
+        w.pack("B", TYPE_UNIT)
+    else:
+        w.pack("B", TYPE_NONE)
+    w.enum(move.type)
+    w.array('i', [v for loc in move.info for v in loc])        # offset coordinates of the associated tiles
+    w.pack("I", len(move.trades))
+    for t in move.trades:
+        _encode_trade(w, t)
+    w.string(move.str_rep_of_action)
+    w.array('i', [v for loc, _ in move.info_at_tile for v in loc])
+    for _, s in move.info_at_tile:
+        w.string(s)
+    w.pack("?", move.from_human_interaction)
+    return bytes(w.buf)
+
+
+def decode_move(data: bytes) -> AI_Move:
+    r = _Reader(data, KIND_MOVE)
+    move = AI_Move()
+    move.move_type = r.enum(MoveType)
+    move.doMoveArmy = r.unpack("?")[0]
+    move.move_army_to = r.unpack("ii")
+    move.loc = r.unpack("ii")
+    type_tag = r.unpack("B")[0]
+    move.type = r.enum(UnitType if type_tag == TYPE_UNIT else BuildingType)    # None if the tag is TYPE_NONE
+    coords = r.array()
+    move.info = [(coords[i], coords[i + 1]) for i in range(0, len(coords), 2)]
+    move.trades = [_decode_trade(r) for _ in range(r.unpack("I")[0])]
+    move.str_rep_of_action = r.string()
+    coords = r.array()
+    move.info_at_tile = [((coords[i], coords[i + 1]), r.string()) for i in range(0, len(coords), 2)]
+    move.from_human_interaction = r.unpack("?")[0]
+    return move
@@ -0,0 +1,133 @@
+"""
+Micro-benchmark of essentials.a_star against the former implementation (linear scan of the open list, no
+effective closed list). Also checks that both return the same paths.
+
+usage (from the repository root):
+    python -m src.benchmarks.bench_a_star [num_queries]
+"""
+import random
+import sys
+import timeit
+from typing import List, Tuple, Optional
+
+import pyglet
+pyglet.options['shadow_window'] = False     # arcade (imported by the map representation) must not open a GL context
+
+from src.ai.AI_MapRepresentation import Map, Tile
+from src.ai.toolkit import essentials
+from src.ai.toolkit.essentials import AStarNode, get_neighbours, get_distance
+from src.misc.game_constants import GroundType
+
+MAP_SIZES = ((20, 25), (40, 40))
+OBSTACLE_RATIO = 0.15
+MAX_TARGET_DISTANCE = 8     # the reference does not close visited nodes, its cost explodes on long detours
+MAX_REFERENCE_EXPANSIONS = 2000     # the reference gives up on a query after this many nodes, the query is skipped
+
+
+def get_neighbours_on_set_reference(tile, working_set: List[Tile]) -> List[Tile]:
+    ret = []
+    for x in get_neighbours(tile):
+        for w in working_set:
+            if x.offset_coordinates == w.offset_coordinates:
+                ret.append(x)
+    return ret
+
+
+def a_star_reference(start: Tile, target: Tile, domain: List[Tile],
+                     max_expansions: int = MAX_REFERENCE_EXPANSIONS) -> Optional[List[Tile]]:
+    """the previous implementation, only terminates if the target is reachable.
+    Returns None after max_expansions nodes (not part of the previous implementation)"""
+    if target not in domain or start not in domain:
+        return [start]
+    start_node = AStarNode(start)
+    end_node = AStarNode(target)
+    open_list = [start_node]
+    closed_list = []
+    while len(open_list) > 0 and len(closed_list) < max_expansions:
+        current_node = open_list[0]
+        current_index = 0
+        for index, item in enumerate(open_list):
+            if item.f < current_node.f:
+                current_node = item
+                current_index = index
+        open_list.pop(current_index)
+        closed_list.append(current_node)
+        if current_node == end_node:
+            path = []
+            current = current_node
+            while current is not None:
+                path.append(current.base_tile)
+                current = current.parent
+            return path[::-1]
+        children = []
+        for child in get_neighbours_on_set_reference(current_node, domain):
+            children.append(AStarNode(child, parent=current_node))
+        for child in children:
+            child.g = current_node.g + 1
+            child.h = get_distance(end_node.base_tile, child.base_tile)
+            child.f = child.g + child.h
+            open_list.append(child)
+    return None
+
+
+def create_domain(dim: Tuple[int, int], rnd: random.Random) -> List[Tile]:
+    m = Map()
+    for y in range(dim[1]):
+        for x in range(dim[0]):
+            m.add_tile((x, y), GroundType.GRASS)
+    m.connect_graph()
+    return [t for t in m.map.values() if rnd.random() > OBSTACLE_RATIO]
+
+
+def reachable_pairs(domain: List[Tile], num: int, rnd: random.Random) -> List[Tuple[Tile, Tile]]:
+    """random start/target pairs, which are connected within the domain and not too far apart"""
+    pairs = []
+    while len(pairs) < num:
+        start = rnd.choice(domain)
+        component = {start}
+        frontier = [start]
+        while frontier:
+            t = frontier.pop()
+            for n in essentials.get_neighbours_on_set(t, domain):
+                if n not in component:
+                    component.add(n)
+                    frontier.append(n)
+        targets = [t for t in component if 0 < get_distance(start, t) <= MAX_TARGET_DISTANCE]
+        if len(targets) > 0:
+            pairs.append((start, rnd.choice(targets)))
+    return pairs
+
+
+def main(num_queries: int):
+    rnd = random.Random(0)
+    print(f"{'map':>8} {'queries':>8} {'heap [ms/query]':>16} {'reference [ms/query]':>21} {'speedup':>8}")
+    for dim in MAP_SIZES:
+        domain = create_domain(dim, rnd)
+        queries = reachable_pairs(domain, num_queries, rnd)
+        pairs = []
+        ref_paths = []
+        t_ref = .0
+        for s, t in queries:
+            t_begin = timeit.default_timer()
+            path = a_star_reference(s, t, domain)
+            t_end = timeit.default_timer()
+            if path is not None:                # the pairs are connected, None means the reference gave up
+                pairs.append((s, t))
+                ref_paths.append(path)
+                t_ref += t_end - t_begin
+        if len(pairs) < len(queries):
+            print(f"skipped {len(queries) - len(pairs)} of {len(queries)} queries, the reference exceeded "
+                  f"{MAX_REFERENCE_EXPANSIONS} node expansions")
+        if len(pairs) == 0:
+            continue
+        paths = []
+        t_new = timeit.timeit(lambda: paths.extend(essentials.a_star(s, t, domain) for s, t in pairs), number=1)
+        mismatches = sum(1 for a, b in zip(paths, ref_paths) if a != b)
+        if mismatches > 0:
+            print(f"MISMATCH: {mismatches} of {len(pairs)} paths differ")
+        print(f"{dim[0]:>3}x{dim[1]:<4} {len(pairs):>8} {t_new / len(pairs) * 1000:>16.3f} "
+              f"{t_ref / len(pairs) * 1000:>21.3f} {t_ref / t_new:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
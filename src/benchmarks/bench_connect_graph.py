@@ -0,0 +1,77 @@
+"""
+Benchmark of Map.connect_graph (AI map representation) against the former quadratic implementation.
+
+usage (from the repository root):
+    python -m src.benchmarks.bench_connect_graph [--full]
+
+The quadratic reference is skipped for 10000 tiles unless --full is given (it takes several minutes).
+"""
+import math
+import sys
+import timeit
+from typing import Tuple, List
+
+import pyglet
+pyglet.options['shadow_window'] = False     # arcade (imported by the map representation) must not open a GL context
+
+from src.ai.AI_MapRepresentation import Map
+from src.hex_map import HexMap
+from src.misc.game_constants import GroundType
+
+SIZES = (500, 2000, 10000)
+REFERENCE_LIMIT = 2000
+
+
+def create_map(num_tiles: int) -> Map:
+    """a square-ish patch of discovered tiles"""
+    m = Map()
+    width = math.ceil(math.sqrt(num_tiles))
+    for i in range(num_tiles):
+        m.add_tile((i % width, i // width), GroundType.GRASS)
+    return m
+
+
+def connect_graph_quadratic(m: Map):
+    """the previous implementation, compares every pair of tiles"""
+    for _, v in m.map.items():
+        for _, o_v in m.map.items():
+            other_cc = o_v.cube_coordinates
+            if HexMap.get_cc_northeast(other_cc) == v.cube_coordinates:
+                v.tile_sw = o_v
+            if HexMap.get_cc_east(other_cc) == v.cube_coordinates:
+                v.tile_w = o_v
+            if HexMap.get_cc_southeast(other_cc) == v.cube_coordinates:
+                v.tile_nw = o_v
+            if HexMap.get_cc_southwest(other_cc) == v.cube_coordinates:
+                v.tile_ne = o_v
+            if HexMap.get_cc_west(other_cc) == v.cube_coordinates:
+                v.tile_e = o_v
+            if HexMap.get_cc_northwest(other_cc) == v.cube_coordinates:
+                v.tile_se = o_v
+
+
+def links(m: Map) -> List[Tuple]:
+    def oc(t):
+        return t.offset_coordinates if t else None
+    return [(oc(t.tile_ne), oc(t.tile_e), oc(t.tile_se), oc(t.tile_sw), oc(t.tile_w), oc(t.tile_nw))
+            for t in m.map.values()]
+
+
+def main(full: bool):
+    print(f"{'tiles':>8} {'linear [s]':>12} {'quadratic [s]':>14} {'speedup':>10}")
+    for n in SIZES:
+        m = create_map(n)
+        t_lin = timeit.timeit(m.connect_graph, number=1)
+        new_links = links(m)
+        if n <= REFERENCE_LIMIT or full:
+            m_ref = create_map(n)
+            t_quad = timeit.timeit(lambda: connect_graph_quadratic(m_ref), number=1)
+            if links(m_ref) != new_links:
+                print(f"MISMATCH in the neighbour links for {n} tiles")
+            print(f"{n:>8} {t_lin:>12.5f} {t_quad:>14.5f} {t_quad / t_lin:>9.0f}x")
+        else:
+            print(f"{n:>8} {t_lin:>12.5f} {'skipped':>14} {'-':>10}")
+
+
+if __name__ == "__main__":
+    main("--full" in sys.argv)
@@ -0,0 +1,111 @@
+"""
+Regression check: essentials.simple_heat_map (derived from the memoised distance fields) must return the same heat
+maps as the former queue based implementation, including the order of the entries. Plays headless games and compares
+both on the map of every game status which is constructed, for the heat maps the AIs compute (own buildings on the
+walkable tiles, scoutable tiles and enemy buildings on the discovered tiles) and for the armies.
+
+usage (from the repository root):
+    python -m src.benchmarks.check_heat_map [scenario] [num_games] [max_turns]
+"""
+import contextlib
+import io
+import queue
+import sys
+import timeit
+from os import path
+from typing import Callable, List, Tuple, Dict, Any
+
+import pyglet
+pyglet.options['shadow_window'] = False
+
+sys.path.append(path.join(path.dirname(path.dirname(path.abspath(__file__)))))     # npc scripts: 'ai.scripts.*'
+
+from src.ai.AI_GameStatus import AI_GameStatus
+from src.ai.AI_MapRepresentation import Map
+from src.ai.toolkit import essentials
+from src.ai.toolkit.essentials import get_neighbours
+from src.game_logic import GameLogic
+from src.misc.game_constants import Definitions
+from src.player import Player
+
+
+def simple_heat_map_reference(initial_set, working_set, condition: Callable) -> List[Tuple[int, Any]]:
+    """the previous implementation (queue.Queue, neighbours searched in the working list)"""
+    heat_map = []
+    tmp = queue.Queue()
+    discovered = set()
+    for i in initial_set:
+        tmp.put((-1, i))
+    while not tmp.empty():
+        d, s = tmp.get()
+        if s in discovered:
+            continue
+        discovered.add(s)
+        if d >= 0:
+            heat_map.append((d, s))
+        nei = [x for x in get_neighbours(s) for w in working_set if x.offset_coordinates == w.offset_coordinates]
+        for n in nei:
+            if n not in discovered and condition(n):
+                tmp.put((d + 1, n))
+    return heat_map
+
+
+def get_heat_map_args(ai_map: Map) -> Dict[str, Tuple]:
+    """initial set, domain (as list) and domain (as TileSet) of the heat maps"""
+    return {'own buildings': (ai_map.building_list, ai_map.walkable_tiles, ai_map.walkable_domain),
+            'scoutable tiles': (ai_map.scoutable_tiles, ai_map.discovered_tiles, ai_map.discovered_domain),
+            'enemy buildings': (ai_map.opp_building_list, ai_map.discovered_tiles, ai_map.discovered_domain),
+            'own armies': (ai_map.army_list, ai_map.discovered_tiles, ai_map.discovered_domain),
+            'enemy armies': (ai_map.opp_army_list, ai_map.walkable_tiles, ai_map.walkable_domain)}
+
+
+class CheckedGameLogic(GameLogic):
+    def __init__(self, game_xml_file: str, seed: int):
+        super().__init__(game_xml_file, None, headless=True, seed=seed)
+        self.num_checks = 0
+        self.mismatches = []
+        self.time_field = 0.0
+        self.time_reference = 0.0
+
+    def construct_game_status(self, player: Player, ai_game_status: AI_GameStatus):
+        super().construct_game_status(player, ai_game_status)
+        memo = {}
+        for name, (initial_set, tile_list, domain) in get_heat_map_args(ai_game_status.map).items():
+            t1 = timeit.default_timer()
+            expected = simple_heat_map_reference(initial_set, tile_list, lambda n: True)
+            t2 = timeit.default_timer()
+            actual = essentials.simple_heat_map(initial_set, domain, None, memo=memo)
+            t3 = timeit.default_timer()
+            memoised = essentials.simple_heat_map(initial_set, domain, None, memo=memo)
+            self.time_reference += t2 - t1
+            self.time_field += t3 - t2
+            expected = [(d, t.offset_coordinates) for d, t in expected]
+            for variant, heat_map in (("heat map", actual), ("memoised heat map", memoised)):
+                if [(d, t.offset_coordinates) for d, t in heat_map] != expected:
+                    self.mismatches.append((self.turn_nr, player.name, f"{variant} of the {name}"))
+            self.num_checks = self.num_checks + 1
+
+
+def main():
+    scenario = sys.argv[1] if len(sys.argv) > 1 else "resources/game_ai_vs_npc.xml"
+    num_games = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    max_turns = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    Definitions.SHOW_AI_CTRL = False
+    Definitions.DEBUG_MODE = False
+    failed = False
+    for seed in range(num_games):
+        gl = CheckedGameLogic(scenario, seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            gl.setup()
+            gl.play_headless(max_turns)
+        print(f"game {seed}: {gl.num_checks} heat maps checked, {len(gl.mismatches)} mismatches, "
+              f"distance field: {gl.time_field * 1000:.1f} ms, reference: {gl.time_reference * 1000:.1f} ms")
+        for m in gl.mismatches[:10]:
+            print(f"  turn {m[0]}, player {m[1]}: {m[2]} differs")
+        failed = failed or len(gl.mismatches) > 0
+    print("FAILED" if failed else "OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Regression check: the incremental game status (INCREMENTAL_AI_STATUS, the map of the AI is kept alive across turns)
+must equal the game status which is built from scratch, including the order of the tile and object lists (the AIs
+draw random numbers while iterating them). Plays headless games with the incremental status and builds the full
+status next to it at every game status which is constructed. Also plays each game with both variants and compares
+the results, which are the same if the match is reproduced from its seed.
+
+usage (from the repository root):
+    python -m src.benchmarks.check_incremental_status [scenario] [num_games] [max_turns]
+"""
+import contextlib
+import io
+import sys
+from os import path
+from typing import Tuple, Optional
+
+import pyglet
+pyglet.options['shadow_window'] = False
+
+sys.path.append(path.join(path.dirname(path.dirname(path.abspath(__file__)))))     # npc scripts: 'ai.scripts.*'
+
+from src.ai.AI_GameStatus import AI_GameStatus
+from src.ai.performance import PerformanceLogger
+from src.benchmarks.check_wire_format import compare_status
+from src.game_logic import GameLogic
+from src.misc.game_constants import Definitions
+from src.player import Player
+
+
+class CheckedGameLogic(GameLogic):
+    def __init__(self, game_xml_file: str, seed: int):
+        super().__init__(game_xml_file, None, headless=True, seed=seed)
+        self.incremental_ai_status = True
+        self.num_checks = 0
+        self.mismatches = []
+
+    def construct_game_status(self, player: Player, ai_game_status: AI_GameStatus):
+        attacked = set(player.attacked_set)             # cleared by construct_game_status
+        full = AI_GameStatus()
+        self.incremental_ai_status = False
+        super().construct_game_status(player, full)
+        self.incremental_ai_status = True
+        player.attacked_set.update(attacked)
+        super().construct_game_status(player, ai_game_status)
+        for d in compare_status(full, ai_game_status, tile_order=False):
+            self.mismatches.append((self.turn_nr, player.name, d))
+        self.num_checks = self.num_checks + 1
+
+
+def play(scenario: str, seed: int, max_turns: int, incremental: bool) -> Tuple[Optional[str], int, Tuple]:
+    PerformanceLogger.data.clear()
+    PerformanceLogger.pid_c.clear()
+    gl = GameLogic(scenario, None, headless=True, seed=seed)
+    gl.incremental_ai_status = incremental
+    with contextlib.redirect_stdout(io.StringIO()):
+        gl.setup()
+        gl.play_headless(max_turns)
+    scores = tuple(PerformanceLogger.data[p.id][-1].score for p in gl.player_list if PerformanceLogger.data.get(p.id))
+    return gl.winner.name if gl.winner else None, gl.turn_nr, scores
+
+
+def main():
+    scenario = sys.argv[1] if len(sys.argv) > 1 else "resources/game_ai_vs_npc.xml"
+    num_games = int(sys.argv[2]) if len(sys.argv) > 2 else 4
+    max_turns = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    Definitions.SHOW_AI_CTRL = False
+    Definitions.DEBUG_MODE = False
+    failed = False
+    for seed in range(num_games):
+        gl = CheckedGameLogic(scenario, seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            gl.setup()
+            gl.play_headless(max_turns)
+        print(f"game {seed}: {gl.num_checks} game states checked, {len(gl.mismatches)} mismatches")
+        for m in gl.mismatches[:10]:
+            print(f"  turn {m[0]}, player {m[1]}: {m[2]} differs")
+        incremental, full = play(scenario, seed, max_turns, True), play(scenario, seed, max_turns, False)
+        if incremental != full:
+            print(f"  result differs, incremental: {incremental}, full: {full}")
+        failed = failed or len(gl.mismatches) > 0 or incremental != full
+    print("FAILED" if failed else "OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Regression check: a ChunkedSpriteList (see src/misc/sprite_chunks.py) must draw its sprites in the global depth order
+(center_y, descending), as a z level sorted as a whole would. Fills a map of hexagons, moves sprites within and across
+chunks, removes some, and compares the iteration order and the draw order of the visible chunks with the order of
+all sprites sorted by center_y.
+
+usage (from the repository root):
+    python -m src.benchmarks.check_sprite_chunks [map_size] [num_moves]
+"""
+import random
+import sys
+from os import path
+
+import pyglet
+pyglet.options['shadow_window'] = False
+
+sys.path.append(path.join(path.dirname(path.dirname(path.abspath(__file__)))))
+
+import arcade
+
+from src.hex_map import HexMap, TILE_HIGHT, TILE_WIDTH
+from src.misc.sprite_chunks import ChunkedSpriteList
+
+SCREEN_WIDTH = 1280
+SCREEN_HEIGHT = 720
+
+
+def is_in_depth_order(sprites) -> bool:
+    ys = [s.center_y for s in sprites]
+    return all(a >= b for a, b in zip(ys, ys[1:]))
+
+
+def check(sl: ChunkedSpriteList, sprites, what: str) -> bool:
+    sl.update()                     # as before each draw
+    ok = True
+    if set(sl) != set(sprites) or len(sl) != len(sprites):
+        print(f"  {what}: the list does not contain the expected sprites")
+        ok = False
+    if not is_in_depth_order(sl):
+        print(f"  {what}: the iteration order differs from the center_y order")
+        ok = False
+    for bottom in range(-SCREEN_HEIGHT, int(max(s.center_y for s in sprites)), SCREEN_HEIGHT // 3):
+        drawn = [s for c in sl.get_visible_chunks((0, SCREEN_WIDTH, bottom, bottom + SCREEN_HEIGHT)) for s in c]
+        if not is_in_depth_order(drawn):
+            print(f"  {what}: the draw order of the viewport at y={bottom} differs from the center_y order")
+            ok = False
+            break
+    return ok
+
+
+def main():
+    map_size = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    num_moves = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    rng = random.Random(0)
+    sl = ChunkedSpriteList()
+    sprites = []
+    for y in range(map_size):
+        for x in range(map_size):
+            s = arcade.Sprite()
+            s.position = HexMap.offset_to_pixel_coords((x, y))
+            sl.append(s)
+            sprites.append(s)
+    ok = check(sl, sprites, "map")
+
+    for _ in range(num_moves):
+        s = rng.choice(sprites)
+        s.center_x += rng.uniform(-2, 2) * TILE_WIDTH
+        s.center_y += rng.choice((0, rng.uniform(-3, 3) * TILE_HIGHT))     # horizontal moves keep the depth
+    ok = check(sl, sprites, "moved") and ok
+
+    for s in rng.sample(sprites, len(sprites) // 10):
+        sl.remove(s)
+        sprites.remove(s)
+    ok = check(sl, sprites, "removed") and ok
+
+    print(f"{len(sprites)} sprites in {len(sl.get_visible_chunks((0, 0, -1e9, 1e9)))} chunks")
+    print("OK" if ok else "FAILED")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
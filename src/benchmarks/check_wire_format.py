@@ -0,0 +1,158 @@
+"""
+Regression check and benchmark of the wire format (src/ai/wire_format.py): plays headless games and round-trips
+every game status and every move. The decoded objects must equal the original ones and re-encoding them must give
+the same bytes. Size and time are compared against pickle.
+
+usage (from the repository root):
+    python -m src.benchmarks.check_wire_format [scenario] [num_games] [max_turns]
+"""
+import contextlib
+import io
+import pickle
+import sys
+import timeit
+from os import path
+from typing import List, Tuple, Any
+
+import pyglet
+pyglet.options['shadow_window'] = False
+
+sys.path.append(path.join(path.dirname(path.dirname(path.abspath(__file__)))))     # npc scripts: 'ai.scripts.*'
+
+from src.ai.AI_GameStatus import AI_GameStatus, AI_Move
+from src.ai.AI_MapRepresentation import Map, Tile, NEIGHBOUR_ATTRIBUTES
+from src.ai.wire_format import encode_status, decode_status, encode_move, decode_move
+from src.game_logic import GameLogic
+from src.misc.game_constants import Definitions
+from src.player import Player
+
+TILE_ATTRIBUTES = ('offset_coordinates', 'ground_type', 'is_scoutable', 'is_walkable', 'is_buildable',
+                   'is_discovered', 'cube_coordinates')
+MAP_LISTS = ('scoutable_tiles', 'buildable_tiles', 'walkable_tiles', 'own_farm_field_tiles', 'discovered_tiles')
+OBJECT_LISTS = ('resource_list', 'army_list', 'opp_army_list', 'building_list', 'opp_building_list')
+
+
+def _coords(t: Tile) -> Any:
+    return t.offset_coordinates if t is not None else None
+
+
+def _element(e) -> Tuple:
+    """comparable representation of an AI_Resource, AI_Army or AI_Building"""
+    d = {k: v for k, v in vars(e).items() if k not in ('base_tile', 'associated_tiles')}
+    return (_coords(e.base_tile), tuple(_coords(t) for t in getattr(e, 'associated_tiles', [])),
+            tuple(sorted(d.items(), key=lambda kv: kv[0])))
+
+
+def compare_maps(a: Map, b: Map, tile_order: bool = True) -> List[str]:
+    """tile_order: the tiles have to be in the same order in Map.map (the lists are always compared in order)"""
+    diffs = []
+    if (list(a.map.keys()) if tile_order else sorted(a.map.keys())) != \
+            (list(b.map.keys()) if tile_order else sorted(b.map.keys())):
+        return ["tiles"]
+    for oc, t in a.map.items():
+        u = b.map[oc]
+        for attr in TILE_ATTRIBUTES:
+            if getattr(t, attr) != getattr(u, attr):
+                diffs.append(f"tile {oc}: {attr}")
+        for attr in NEIGHBOUR_ATTRIBUTES:
+            if _coords(getattr(t, attr)) != _coords(getattr(u, attr)):
+                diffs.append(f"tile {oc}: {attr}")
+        for attr in ('resource', 'army', 'building'):
+            x, y = getattr(t, attr), getattr(u, attr)
+            if (x is None) != (y is None) or (x is not None and _element(x) != _element(y)):
+                diffs.append(f"tile {oc}: {attr}")
+    for name in MAP_LISTS:
+        if [_coords(t) for t in getattr(a, name)] != [_coords(t) for t in getattr(b, name)]:
+            diffs.append(name)
+        if any(b.map[t.offset_coordinates] is not t for t in getattr(b, name)):
+            diffs.append(f"{name}: not linked to the map")
+    for name in OBJECT_LISTS:
+        if [_element(e) for e in getattr(a, name)] != [_element(e) for e in getattr(b, name)]:
+            diffs.append(name)
+        if any(e.base_tile is not b.map[e.base_tile.offset_coordinates] for e in getattr(b, name)):
+            diffs.append(f"{name}: not linked to the map")
+    return diffs
+
+
+def compare_status(a: AI_GameStatus, b: AI_GameStatus, tile_order: bool = True) -> List[str]:
+    diffs = []
+    for attr in ('turn_nr', 'costScout', 'me', 'opponents', 'trades', 'cost_building_construction',
+                 'cost_unit_recruitment'):
+        if getattr(a, attr) != getattr(b, attr):
+            diffs.append(attr)
+    return diffs + compare_maps(a.map, b.map, tile_order)
+
+
+class CheckedGameLogic(GameLogic):
+    def __init__(self, game_xml_file: str, seed: int):
+        super().__init__(game_xml_file, None, headless=True, seed=seed)
+        self.num_status = 0
+        self.num_moves = 0
+        self.mismatches = []
+        self.size_wire = 0
+        self.size_pickle = 0
+        self.time_wire = 0.0
+        self.time_pickle = 0.0
+
+    def construct_game_status(self, player: Player, ai_game_status: AI_GameStatus):
+        super().construct_game_status(player, ai_game_status)
+        t1 = timeit.default_timer()
+        data = encode_status(ai_game_status)
+        decoded = decode_status(data)
+        _ = decoded.map
+        t2 = timeit.default_timer()
+        p = pickle.dumps(ai_game_status, protocol=pickle.HIGHEST_PROTOCOL)
+        pickle.loads(p)
+        t3 = timeit.default_timer()
+        self.time_wire += t2 - t1
+        self.time_pickle += t3 - t2
+        self.size_wire += len(data)
+        self.size_pickle += len(p)
+        self.num_status = self.num_status + 1
+        for d in compare_status(ai_game_status, decoded):
+            self.mismatches.append((self.turn_nr, player.name, d))
+        if encode_status(decoded) != data:
+            self.mismatches.append((self.turn_nr, player.name, "status: re-encoding differs"))
+
+    def exec_ai_move(self, ai_move: AI_Move, player: Player):
+        data = encode_move(ai_move)
+        decoded = decode_move(data)
+        for attr, v in vars(ai_move).items():
+            w = getattr(decoded, attr)
+            if attr in ('info', 'move_army_to', 'loc'):       # tuples on the receiving side
+                v, w = [tuple(x) if isinstance(x, (list, tuple)) else x for x in v] \
+                    if attr == 'info' else tuple(v), w
+            if v != w:
+                self.mismatches.append((self.turn_nr, player.name, f"move: {attr}"))
+        if encode_move(decoded) != data:
+            self.mismatches.append((self.turn_nr, player.name, "move: re-encoding differs"))
+        self.num_moves = self.num_moves + 1
+        super().exec_ai_move(ai_move, player)
+
+
+def main():
+    scenario = sys.argv[1] if len(sys.argv) > 1 else "resources/game_ai_vs_npc.xml"
+    num_games = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    max_turns = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+    Definitions.SHOW_AI_CTRL = False
+    Definitions.DEBUG_MODE = False
+    failed = False
+    for seed in range(num_games):
+        gl = CheckedGameLogic(scenario, seed)
+        with contextlib.redirect_stdout(io.StringIO()):
+            gl.setup()
+            gl.play_headless(max_turns)
+        n = max(gl.num_status, 1)
+        print(f"game {seed}: {gl.num_status} game states and {gl.num_moves} moves checked, "
+              f"{len(gl.mismatches)} mismatches")
+        print(f"  per game status, wire: {gl.size_wire / n:.0f} bytes, {gl.time_wire / n * 1000:.2f} ms, "
+              f"pickle: {gl.size_pickle / n:.0f} bytes, {gl.time_pickle / n * 1000:.2f} ms (encode + decode)")
+        for m in gl.mismatches[:10]:
+            print(f"  turn {m[0]}, player {m[1]}: {m[2]} differs")
+        failed = failed or len(gl.mismatches) > 0
+    print("FAILED" if failed else "OK")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,10 @@ class Console:
         self.list_of_commands.append(ConsoleCommand("clear_aux", 0, "[no args] clears all auxiliary sprites"))
         self.list_of_commands.append(ConsoleCommand("hl_walkable", 0, "[no args] highlights all walkable tiles"))
         self.list_of_commands.append(ConsoleCommand("switch_ka", 0, "[no args] sets ENABLE_KEYFRAME_ANIMATIONS to true or false"))
+        self.list_of_commands.append(ConsoleCommand("export_prof", 1, "[args: file] Writes the timings of the game loop phases to a .csv or .json file"))
+        self.list_of_commands.append(ConsoleCommand("save", 1, "[args: file] Saves the game (in between two turns)"))
+        self.list_of_commands.append(ConsoleCommand("load", 1, "[args: file] Loads a game of the same scenario"))
+        self.list_of_commands.append(ConsoleCommand("record", 1, "[args: file] Records a replay (at the start of the game)"))
 
         self.input_queue = queue.Queue()
         input_thread = threading.Thread(target=self.add_input)
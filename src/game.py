@@ -1,5 +1,5 @@
 import time
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Tuple
 
 import os
 from os import sys, path
@@ -7,6 +7,9 @@ import timeit
 
 from src.sound_engine import SoundEngine
 from src.misc.camera import Camera
+from src.misc.profiler import PHASE_RENDER, NO_PLAYER
+from src.misc.replay import Replay
+from src.misc.sprite_chunks import ChunkedSpriteList
 
 sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
 # print(os.getcwd())
@@ -27,67 +30,34 @@ SETUP_COMMANDS = "../resources/initial_commands.txt"
 
 
 class ZlvlRenderer:
-    def __init__(self, num_levels):
-        self.camera_x = 0
-        self.camera_y = 0
-        self.rel_x = 0
-        self.rel_y = 0
-        self.camera_has_moved = False
+    def __init__(self, num_levels, camera: Camera):
+        self.camera: Camera = camera
         self.z_levels: [arcade.SpriteList] = []
         for i in range(num_levels):
-            self.z_levels.append(arcade.SpriteList())
+            # the map and the objects on it are culled against the viewport and kept in depth order
+            self.z_levels.append(ChunkedSpriteList() if i in (Z_MAP, Z_AUX, Z_GAME_OBJ) else arcade.SpriteList())
         self.ui = None
         self.gl = None
-        self.up_key = False
-        self.down_key = False
-        self.left_key = False
-        self.right_key = False
-        self.camera_event_listener: List[Any] = []
 
     def render(self):
-
+        self.camera.apply()             # the z levels are in world coordinates
+        visible_area = self.camera.get_visible_area()
         for z in self.z_levels:
-            z.draw()
+            if isinstance(z, ChunkedSpriteList):
+                z.draw(visible_area)
+            else:
+                z.draw()
 
+        self.camera.apply_screen()
         self.ui.draw()
 
     def update(self, delta_t: float):
-        rel = int(float(CAMERA_SENSITIVITY) * delta_t)
-        if self.up_key:
-            self.camera_has_moved = True
-            self.rel_y = - rel
-            self.camera_y = self.camera_y + self.rel_y
-        elif self.down_key:
-            self.camera_has_moved = True
-            self.rel_y = rel
-            self.camera_y = self.camera_y + self.rel_y
-        if self.left_key:
-            self.camera_has_moved = True
-            self.rel_x = rel
-            self.camera_x = self.camera_x + self.rel_x
-        elif self.right_key:
-            self.camera_has_moved = True
-            self.rel_x = - rel
-            self.camera_x = self.camera_x + self.rel_x
-
-        if self.camera_has_moved:
-            for s_list in self.z_levels:
-                for sp in s_list:
-                    sp.center_x = sp.center_x + self.rel_x
-                    sp.center_y = sp.center_y + self.rel_y
-            self.gl.set_camera_pos(self.camera_x, self.camera_y)
-            self.gl.animator.update_camera_pos((self.camera_x, self.camera_y))
-            #self.gl.animator.camera_pos = (self.camera_x, self.camera_y)
-            self.ui.camera_pos = (self.camera_x, self.camera_y)
-            for listener in self.camera_event_listener:
-                listener.camera_pos = (self.camera_x, self.camera_y)
-            self.camera_has_moved = False
-            self.rel_x = 0
-            self.rel_y = 0
+        self.camera.update(delta_t)
 
 
 class Game(arcade.Window):
-    def __init__(self, width, height, title, game_xml_file):
+    def __init__(self, width, height, title, game_xml_file, replay: Optional[Replay] = None, start_turn: int = 0):
+        """replay: the recorded moves are played instead of the agents, fast forwarded to start_turn (see replay.py)"""
         super().__init__(width, height, title)
 
         file_path = os.path.dirname(os.path.abspath(__file__))
@@ -95,16 +65,19 @@ class Game(arcade.Window):
         sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
         print('working dir: ' + str(os.getcwd()))
 
-        self.z_level_renderer: ZlvlRenderer = ZlvlRenderer(NUM_Z_LEVELS)
-        self.game_logic: GameLogic = GameLogic(game_xml_file, self.z_level_renderer.z_levels)
+        self.camera: Camera = Camera(SCREEN_WIDTH, SCREEN_HEIGHT)
+        self.z_level_renderer: ZlvlRenderer = ZlvlRenderer(NUM_Z_LEVELS, self.camera)
+        self.game_logic: GameLogic = GameLogic(game_xml_file, self.z_level_renderer.z_levels,
+                                               seed=replay.seed if replay else None)
+        self.game_logic.replay = replay
+        self.start_turn: int = start_turn
         self.hi = HumanInteraction(self.game_logic, self.z_level_renderer.z_levels[2],
                                    self.z_level_renderer.z_levels[4])
         self.console: Console = Console()
         self.ui = UI(self.game_logic, self.hi, SCREEN_WIDTH, SCREEN_HEIGHT)
         self.z_level_renderer.ui = self.ui
         self.z_level_renderer.gl = self.game_logic
-        self.z_level_renderer.camera_event_listener.append(self.hi)
-        self.camera: Optional[Camera] = None
+        self.camera.register(self.ui, self.on_camera_move)
 
         self.commands: [(str, str)] = []
 
@@ -123,9 +96,10 @@ class Game(arcade.Window):
 
     def setup(self):
         arcade.set_background_color(arcade.color.BLACK)
-        self.camera = Camera(SCREEN_WIDTH, SCREEN_HEIGHT)
         self.commands.extend(self.console.initial_commands(SETUP_COMMANDS))
         self.game_logic.setup()
+        if self.game_logic.replay is not None:
+            self.game_logic.fast_forward(self.start_turn)
         self.ui.setup()
         self.game_logic.human_interface = self.hi
         if Definitions.SHOW_AI_CTRL:
@@ -141,6 +115,8 @@ class Game(arcade.Window):
     def on_close(self):
         if Definitions.SHOW_AI_CTRL:
             self.ai_ctrl.close()
+        self.game_logic.ai_interface.shutdown()
+        self.game_logic.stop_recording()
 
         if Definitions.SHOW_STATS_ON_EXIT:
             from src.ai.performance import PerformanceLogger
@@ -193,14 +169,16 @@ class Game(arcade.Window):
 
         output = f"Drawing time: {self.draw_time:.3f} #sprites: {self.num_of_sprites}"
         output_update = f"Update time: {self.max_update_time:.3f}"
-        # other_times = f"A: {self.game_logic.animator_time:.3f}  T: {self.game_logic.total_time:.3f}"
         arcade.draw_text(output, 20, SCREEN_HEIGHT - 40, self.draw_time_colour, 16)
         arcade.draw_text(output_update, 20, SCREEN_HEIGHT - 60, arcade.color.WHITE, 16)
-#        arcade.draw_text(other_times, 20, SCREEN_HEIGHT - 100, arcade.color.WHITE, 16)
         if self.fps is not None:
             output = f"FPS: {self.fps:.0f}"
             arcade.draw_text(output, 20, SCREEN_HEIGHT - 80, self.fps_colour, 16)
+        if Definitions.SHOW_PROFILER:
+            output = f"Logic: {self.game_logic.total_time * 1000:.1f}  [ms] " + self.game_logic.profiler.get_overlay_text()
+            arcade.draw_text(output, 20, SCREEN_HEIGHT - 100, arcade.color.WHITE, 12)
         self.draw_time = timeit.default_timer() - timestamp_start
+        self.game_logic.profiler.add(PHASE_RENDER, self.game_logic.turn_nr, NO_PLAYER, self.draw_time)
 
     def on_mouse_press(self, x, y, button, key_modifiers):
         if button == 1 or button == 4:          # only accepts left and right clicks
@@ -216,45 +194,34 @@ class Game(arcade.Window):
 
     def on_key_press(self, key: int, modifiers: int):
         if key == arcade.key.UP:
-            self.z_level_renderer.up_key = True
+            self.camera.up_key = True
         if key == arcade.key.DOWN:
-            self.z_level_renderer.down_key = True
+            self.camera.down_key = True
         if key == arcade.key.LEFT:
-            self.z_level_renderer.left_key = True
+            self.camera.left_key = True
         if key == arcade.key.RIGHT:
-            self.z_level_renderer.right_key = True
-        # if key == arcade.key.UP:
-        #     self.z_level_renderer.up_key = True
-        # if key == arcade.key.DOWN:
-        #     self.z_level_renderer.down_key = True
-        # if key == arcade.key.LEFT:
-        #     self.z_level_renderer.left_key = True
-        # if key == arcade.key.RIGHT:
-        #     self.z_level_renderer.right_key = True
+            self.camera.right_key = True
         self.ui.handle_key_input(key)
 
 
 
     def on_key_release(self, key: int, modifiers: int):
         if key == arcade.key.UP:
-            self.z_level_renderer.up_key = False
+            self.camera.up_key = False
         if key == arcade.key.DOWN:
-            self.z_level_renderer.down_key = False
+            self.camera.down_key = False
         if key == arcade.key.LEFT:
-            self.z_level_renderer.left_key = False
+            self.camera.left_key = False
         if key == arcade.key.RIGHT:
-            self.z_level_renderer.right_key = False
-        # if key == arcade.key.UP:
-        #     self.camera.up_key = False
-        # if key == arcade.key.DOWN:
-        #     self.camera.down_key = False
-        # if key == arcade.key.LEFT:
-        #     self.camera.left_key = False
-        # if key == arcade.key.RIGHT:
-        #     self.camera.right_key = False
+            self.camera.right_key = False
         if key == arcade.key.SPACE:
             self.ui.next_turn_button.on_release()
 
+    def on_camera_move(self, rel: Tuple[int, int], pos: Tuple[int, int]):
+        """the UI and the human interaction translate mouse positions (screen) to the map (world)"""
+        self.ui.camera_pos = pos
+        self.hi.camera_pos = pos
+
     def on_mouse_motion(self, x: float, y: float, dx: float, dy: float):
         # pass
         self.ui.handle_mouse_motion(x, y)
@@ -1,5 +1,5 @@
 from __future__ import annotations
-from typing import List, Tuple, Dict, Any
+from typing import List, Tuple, Dict, Any, Optional
 
 import arcade
 from arcade import AnimationKeyframe
@@ -10,7 +10,7 @@ from src.misc.game_constants import ResourceType, error, GroundType, PlayerColou
 
 class Drawable:
     def __init__(self):
-        self.sprite: arcade.Sprite = arcade.Sprite()
+        self.__sprite: Optional[arcade.Sprite] = None     # created on first access, never in headless mode
         self.tex_counter = -1  # this variable is supposed to count the number of textures
         self.__active_tex = -1
         self.tex_code = ""
@@ -18,9 +18,20 @@ class Drawable:
         self.update_interval = 0.2
         self.__time = .0
 
-    def set_sprite_pos(self, pos_pixel: (int, int), camera_pos):
-        self.sprite.center_x = pos_pixel[0] + self.offset[0] + camera_pos[0]
-        self.sprite.center_y = pos_pixel[1] + self.offset[1] + camera_pos[1]
+    @property
+    def sprite(self) -> arcade.Sprite:
+        if self.__sprite is None:
+            self.__sprite = arcade.Sprite()
+        return self.__sprite
+
+    def has_sprite(self) -> bool:
+        """False as long as nothing has requested the sprite, i.e. the drawable has never been rendered"""
+        return self.__sprite is not None
+
+    def set_sprite_pos(self, pos_pixel: (int, int)):
+        """sprites are positioned in world coordinates, the camera is applied by the projection (see Camera)"""
+        self.sprite.center_x = pos_pixel[0] + self.offset[0]
+        self.sprite.center_y = pos_pixel[1] + self.offset[1]
 
     def add_texture(self, tex: arcade.Texture):
         if self.__active_tex == -1:
@@ -41,6 +52,8 @@ class Drawable:
         if self.tex_counter >= idx:
             self.sprite.set_texture(idx)
             self.__active_tex = idx
+        elif not self.has_sprite():
+            self.__active_tex = idx                         # headless: only keep track of the index
         else:
             error("Drawable: No texture at index: " + str(idx))
 
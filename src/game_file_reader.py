@@ -1,4 +1,4 @@
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 from src.misc.game_constants import UnitType, BuildingType, ResourceType
 
 import untangle
@@ -6,8 +6,14 @@ import untangle
 
 class GameFileReader:
     def __init__(self, xml_game_data: str):
+        self.file: str = xml_game_data
         self.xml_parser = untangle.parse(xml_game_data)
 
+    def read_seed(self) -> Optional[int]:
+        """the optional seed of the scenario, e.g. <game seed="42">"""
+        seed = self.xml_parser.game.get_attribute('seed')
+        return int(seed) if seed is not None else None
+
     def read_textures_to_dict(self, tex_dict: {}):
         for elem in self.xml_parser.game.textures.children:
             tex_dict[elem.get_attribute('code')] = (elem.cdata,
@@ -1,41 +1,72 @@
+from __future__ import annotations
+
+import random
 import threading
 import timeit
-from typing import Optional, List, Set, Dict
+import traceback
+from typing import Optional, List, Set, Dict, Iterable, Union, TYPE_CHECKING
 
 from src.ai.AI_GameStatus import AI_GameStatus, AI_Move, AI_GameInterface
 from src.game_accessoires import Scenario, Ground, Resource, Drawable, Flag
 from src.game_file_reader import GameFileReader
 from src.hex_map import HexMap, MapStyle
 from src.misc.animation import Animator
+from src.misc.fog_of_war import FogOfWar
 from src.misc.game_constants import *
 from src.misc.game_logic_misc import *
+from src.misc.profiler import Profiler, PHASE_UPDATE_MAP, PHASE_PLAYER_PROPERTIES, PHASE_GAME_STATUS, PHASE_AI_MOVE, \
+    PHASE_EXEC_MOVE, PHASE_FOG_OF_WAR, PHASE_ANIMATOR, NO_PLAYER
+from src.misc.replay import Replay, ReplayRecorder
 from src.misc.trade_hub import TradeHub
 from src.texture_store import TextureStore
-from src.ui.extern.extern_ai_display import AIControl
+
+if TYPE_CHECKING:
+    from src.ui.extern.extern_ai_display import AIControl         # wx is not needed in headless mode
+    from src.ui.human import HumanInteraction
 
 
 # from threading import Thread
 
+SEED_MASK = 0xFFFFFFFF          # the seed of a match is an unsigned 32 bit integer, as stored in replays (see replay.py)
+
 
 class GameLogic:
-    def __init__(self, game_xml_file: str, z_levels: [arcade.SpriteList]):
+    def __init__(self, game_xml_file: str, z_levels: Optional[List[arcade.SpriteList]], headless: bool = False,
+                 seed: Optional[int] = None):
+        """in headless mode, no textures, sprites or animations are created and the game waits for the AI's move.
+        This allows to simulate games without a window (z_levels may be None)
+        seed: of the match, overrides the seed of the scenario. If neither is given, the seed is chosen at random"""
+        self.headless: bool = headless
         self.texture_store: TextureStore = TextureStore.instance()
         self.game_file_reader: GameFileReader = GameFileReader(game_xml_file)
+        if seed is None:
+            seed = self.game_file_reader.read_seed()
+        if seed is not None and seed != seed & SEED_MASK:
+            hint(f"seed {seed} is not an unsigned 32 bit integer, the match is played with seed {seed & SEED_MASK}")
+            seed = seed & SEED_MASK
+        # all randomness of a match is drawn from this generator (and from the generators of the AIs, which are
+        # seeded from it), such that a match can be reproduced from its seed
+        self.seed: int = seed if seed is not None else random.SystemRandom().getrandbits(32)
+        self.rng: random.Random = random.Random(self.seed)
+        debug(f"seed of the match: {self.seed}")
         self.z_levels: [arcade.SpriteList] = z_levels               # reference to the sprite lists
         self.hex_map: Optional[HexMap] = None
-        from src.ui.human import HumanInteraction
         self.human_interface: Optional[HumanInteraction] = None
-        self.ai_interface: AI_GameInterface = AI_GameInterface()
+        # the AIs run in worker processes to keep the UI responsive. Headless games are typically played in parallel
+        # processes themselves (see sim.py), thus their AIs stay in the game process
+        self.ai_interface: AI_GameInterface = AI_GameInterface(use_processes=AI_PROCESS_BACKEND and not headless)
         self.scenario: Scenario = Scenario()
-        self.income_calc: IncomeCalculator = IncomeCalculator(self.hex_map, self.scenario)
+        self.occupancy: OccupancyIndex = OccupancyIndex()       # what is on which tile
+        self.fog_of_war: Optional[FogOfWar] = None              # which tiles are discovered / revealed
+        self.income_calc: IncomeCalculator = IncomeCalculator(self.hex_map, self.scenario, self.occupancy)
         self.animator: Animator = Animator()
         self.trade_hub: TradeHub = TradeHub()
 
-        tex_dict = {}
-        self.game_file_reader.read_textures_to_dict(tex_dict)
-        self.texture_store.load_textures(tex_dict)
+        if not self.headless:
+            tex_dict = {}
+            self.game_file_reader.read_textures_to_dict(tex_dict)
+            self.texture_store.load_textures(tex_dict)
 
-        self.__camera_pos: (int, int) = (0, 0)
 
         self.player_list: [Player] = []
         self.map_view: [bool] = []              # true if we show the players view, otherwise false
@@ -67,7 +98,9 @@ class GameLogic:
             pid = pid + 1
 
         # load textures which depend on player
-        for p in self.player_list:
+        self.texture_store.decode(["../resources/objects/animated/flag_100_sprite_{}.png".format(p.colour_code)
+                                   for p in self.player_list if not self.headless])
+        for p in self.player_list if not self.headless else []:
             c = p.colour_code
             self.texture_store.load_animated_texture("{}_flag".format(c), 10, lambda i: (0, 100 * i), 108, 100,
                                                      "../resources/objects/animated/flag_100_sprite_{}.png".format(c))
@@ -81,12 +114,18 @@ class GameLogic:
 
         # self.test = None
         self.total_time: float = 0
-        # self.animator_time = 0
+        self.profiler: Profiler = Profiler()        # wall time per phase, player and turn
         # self.wait_for_human = False
         self.has_human_player: bool = False
+        self.incremental_ai_status: bool = INCREMENTAL_AI_STATUS
+        from src.ai.AI_MapRepresentation import Map
+        self.ai_maps: Dict[int, Map] = {}        # per player, kept alive across turns (incremental ai status)
+        self.recorder: Optional[ReplayRecorder] = None      # records the applied moves, see start_recording
+        # replay mode (set before setup): the recorded moves are applied instead of asking the agents
+        self.replay: Optional[Replay] = None
 
         self.ai_ctrl_frame: Optional[AIControl] = None
-        self.show_key_frame_animation: bool = ENABLE_KEYFRAME_ANIMATIONS
+        self.show_key_frame_animation: bool = ENABLE_KEYFRAME_ANIMATIONS and not self.headless
         self.logic_state: GameLogicState = GameLogicState.NOT_READY
         self.nextPlayerButtonPressed: bool = False
         self.elapsed: float = float(0)
@@ -101,6 +140,7 @@ class GameLogic:
         # setup hex map
         self.hex_map = HexMap((len(map_data[0]), len(map_data)), MapStyle.S_V_C)
         self.income_calc.hex_map = self.hex_map         # TODO make sure to set the hex_map everywhere. Ugly!
+        self.fog_of_war = FogOfWar(len(self.hex_map.map))
 
         #TODO do this somewhere else
 
@@ -110,7 +150,7 @@ class GameLogic:
         # for x in range(6):
         #     for y in range(5):
         #         d = Drawable()
-        #         d.set_sprite_pos((x_off * x + 100, y_off * y), self.__camera_pos)
+        #         d.set_sprite_pos((x_off * x + 100, y_off * y))
         #         self.__set_sprite(d, "ocean")
         #         self.z_levels[0].append(d.sprite)
 
@@ -120,9 +160,11 @@ class GameLogic:
                 hex: Hexagon = self.hex_map.get_hex_by_offset((x, y))
                 ground: Ground = Ground(map_data[y][x])
                 hex.ground = ground
-                ground.set_sprite_pos(HexMap.offset_to_pixel_coords((x, y)), self.__camera_pos)
-                ground.add_texture(self.texture_store.get_texture("fw"))
                 ground.tex_code = map_data[y][x]
+                if self.headless:
+                    continue
+                ground.set_sprite_pos(HexMap.offset_to_pixel_coords((x, y)))
+                ground.add_texture(self.texture_store.get_texture("fw"))
                 self.z_levels[Z_MAP].append(ground.sprite)
 
         from src.misc.smooth_map import SmoothMap
@@ -130,15 +172,18 @@ class GameLogic:
         #SmoothMap.adjust_elevation(self.hex_map)
 
         # assign textures
-        for hexagon in self.hex_map.map:
+        for hexagon in self.hex_map.map if not self.headless else []:
             self.__set_sprite(hexagon.ground, hexagon.ground.tex_code)
+        if not self.headless:
+            # the ground sprites switch between the fog of war and their texture, all of them go into one atlas
+            ground_tex_codes = sorted(set(h.ground.tex_code for h in self.hex_map.map)) + ["fw"]
+            self.z_levels[Z_MAP].preload_textures(self.texture_store.get_textures(ground_tex_codes))
 
         for map_obj in map_obj_data:
             hex: Hexagon = self.hex_map.get_hex_by_offset((map_obj[1], map_obj[2]))
             if map_obj[0] == "f2":
                 # get str_code with variance
-                import random
-                var = random.randint(0, 6)
+                var = self.rng.randint(0, 6)
                 r: Resource = Resource(hex, ResourceType.FOREST)
                 r.tex_code = "forest_3_var{}".format(var)
                 self.add_resource(r)
@@ -153,7 +198,9 @@ class GameLogic:
             for p in self.player_list:
                 if p != player:
                     other_players_ids.append(p.id)
-            self.ai_interface.launch_AI(player.id, player.ai_str, "AI_" + player.name, other_players_ids)
+            ai_seed = self.rng.getrandbits(32)
+            if self.replay is None:
+                self.ai_interface.launch_AI(player.id, player.ai_str, "AI_" + player.name, other_players_ids, ai_seed)
             base_hex: Hexagon = self.hex_map.get_hex_by_offset(player.spaw_loc)
             InitialCondition.set_init_values(player, base_hex, self)
             # b_type = player.get_initial_building_type()
@@ -172,8 +219,7 @@ class GameLogic:
             #     self.add_army(army, player)
             player_ids.append((player.id, player.colour_code))
 
-        self.__reorder_spritelist(self.z_levels[Z_GAME_OBJ])
-        self.toggle_fog_of_war_lw(self.hex_map.map)
+        self.update_fog_of_war()
 
         from src.ai.performance import PerformanceLogger
         PerformanceLogger.setup(player_ids)
@@ -188,18 +234,15 @@ class GameLogic:
         self.ai_ctrl_frame = ai_ctrl_frame
 
     def update(self, delta_time: float, commands :[], wall_clock_time: float):
-        # t97 = timeit.default_timer()
         timestamp_start = timeit.default_timer()
         self.__exec_command(commands)
         self.elapsed = self.elapsed + delta_time
         if self.show_key_frame_animation:
             for k_f in self.animator.key_frame_animations:
                 k_f.next_frame(delta_time)
-        # self.animator_time = timestamp_start - timeit.default_timer()
         if self.elapsed > float(GAME_LOGIC_CLK_SPEED if self.turn_nr < 80 else 1) and self.automatic:
             self.playNextTurn = True
             self.elapsed = float(0)
-        # t98 = timeit.default_timer()
         # ----------------- CORE ----------------------
         if self.playNextTurn:
             #orig_state = str(self.logic_state)
@@ -208,23 +251,15 @@ class GameLogic:
             #t2 = timeit.default_timer()
             #debug(f"update loop took: {(t2 - t1):.6} s [{orig_state}]")
         # ----------------------------------------
-        # t99 = timeit.default_timer()
         if self.show_key_frame_animation:
             for s in self.z_levels[Z_FLYING]:
                 s.update_animation()
-        # t100 = timeit.default_timer()
         if self.change_in_map_view:
-            t1 = timeit.default_timer()
-            self.toggle_fog_of_war_lw(self.hex_map.map, show_update_bar=True)
+            self.update_fog_of_war()
             self.change_in_map_view = False
-            t2 = timeit.default_timer()
-            debug(f"change map view routine took: {(t2 - t1) :.6} s")
-        # t101 = timeit.default_timer()
-        self.animator.update(wall_clock_time)
-        self.total_time = timestamp_start - timeit.default_timer()
-        # t102 = timeit.default_timer()
-        # if t102 - t97 > 0.1:
-        #     print(f"1:{t98 - t97}, 2:{t99 - t98}, 3:{t100 - t99}, 4:{t101 - t100}, 5:{t102- t101}")
+        with self.profiler.measure(PHASE_ANIMATOR, self.turn_nr):
+            self.animator.update(wall_clock_time)
+        self.total_time = timeit.default_timer() - timestamp_start
 
     def handle_turn(self):
         """handles the turn for a player (human, ai or npc), extends the main update loop"""
@@ -240,7 +275,10 @@ class GameLogic:
 
         player = self.player_list[self.current_player]
 
-        if player.player_type is PlayerType.HUMAN:
+        if self.replay is not None:
+            self.__replay_turn(player)
+
+        elif player.player_type is PlayerType.HUMAN:
 
             if self.logic_state is GameLogicState.READY_FOR_TURN:
                 self.play_players_turn(player)
@@ -250,9 +288,11 @@ class GameLogic:
             elif self.logic_state is GameLogicState.WAITING_FOR_AGENT:
                 h_move = self.human_interface.get_partial_move()
                 if h_move is not None:
-                    self.exec_ai_move(h_move, player)
+                    with self.profiler.measure(PHASE_EXEC_MOVE, self.turn_nr, player.id):
+                        self.exec_ai_move(h_move, player)
                     new_ai_stat = AI_GameStatus()
-                    self.construct_game_status(player, new_ai_stat)
+                    with self.profiler.measure(PHASE_GAME_STATUS, self.turn_nr, player.id):
+                        self.construct_game_status(player, new_ai_stat)
                     self.human_interface.update_game_status(new_ai_stat)
 
                 if self.human_interface.is_move_complete() or self.nextPlayerButtonPressed:
@@ -263,13 +303,18 @@ class GameLogic:
                 self.logic_state = GameLogicState.WAITING_FOR_AGENT
 
             elif self.logic_state is GameLogicState.WAITING_FOR_AGENT:
+                if self.headless:
+                    self.ai_interface.wait_for_move()
                 if self.ai_interface.has_finished():
 
                     ai_move = self.ai_interface.ref_to_move
-
-                    # debug("AI took {} ms".format(self.ai_interface.get_ai_execution_time()))
+                    self.profiler.add(PHASE_AI_MOVE, self.turn_nr, player.id,
+                                      self.ai_interface.get_ai_execution_time())
+                    if self.ai_interface.failure is not None:
+                        self.__handle_ai_failure(player, self.ai_interface.failure)
                     if ai_move:  # player might have lost
-                        self.exec_ai_move(ai_move, player)
+                        with self.profiler.measure(PHASE_EXEC_MOVE, self.turn_nr, player.id):
+                            self.exec_ai_move(ai_move, player)
 
                     if Definitions.SHOW_AI_CTRL:
 
@@ -277,6 +322,10 @@ class GameLogic:
 
                     self.logic_state = GameLogicState.TURN_COMPLETE
 
+                elif self.ai_interface.is_overdue():
+                    self.__handle_ai_overrun(player)
+                    self.logic_state = GameLogicState.TURN_COMPLETE
+
         if self.logic_state is GameLogicState.TURN_COMPLETE:
             self.nextPlayerButtonPressed = False
             if self.current_player == 0:  # next time player 0 plays -> new turn
@@ -290,31 +339,77 @@ class GameLogic:
             # hint("                              SUCCESSFULLY PLAYED TURN")
             self.logic_state = GameLogicState.READY_FOR_TURN
 
-    def spawn_ai_thread(self, player):
+    def __replay_turn(self, player: Player):
+        """replay mode: the recorded moves of the player are applied instead of the moves of the agent"""
+        if self.logic_state is GameLogicState.READY_FOR_TURN:
+            self.play_players_turn(player)
+            self.logic_state = GameLogicState.WAITING_FOR_AGENT
+        elif self.logic_state is GameLogicState.WAITING_FOR_AGENT:
+            for ai_move in self.replay.get_moves(self.turn_nr, player.id):
+                with self.profiler.measure(PHASE_EXEC_MOVE, self.turn_nr, player.id):
+                    self.exec_ai_move(ai_move, player)
+            self.logic_state = GameLogicState.TURN_COMPLETE
+
+    def __handle_ai_overrun(self, player: Player):
+        """the AI has exceeded its hard time budget: its move is discarded and a default move is played instead"""
+        duration = self.ai_interface.abandon_move()
+        error(f"AI of player {player.name} exceeded its time budget ({duration:.2f} s > "
+              f"{self.ai_interface.hard_time_budget:.2f} s), playing the default move")
+        from src.ai.performance import PerformanceLogger
+        PerformanceLogger.log_overrun(self.turn_nr, player.id, duration)
+        self.profiler.add(PHASE_AI_MOVE, self.turn_nr, player.id, duration)
+        default_move = AI_Move()
+        default_move.move_type = MoveType.DO_NOTHING
+        default_move.str_rep_of_action = "time budget exceeded"
+        with self.profiler.measure(PHASE_EXEC_MOVE, self.turn_nr, player.id):
+            self.exec_ai_move(default_move, player)
+
+    def __handle_ai_failure(self, player: Player, failure: Exception):
+        """the AI raised an exception during its move. A headless game fails, otherwise the player skips its turn"""
+        if self.headless:
+            raise failure
+        error(f"AI of player {player.name} failed: {failure!r}")
+        traceback.print_exception(type(failure), failure, failure.__traceback__)
+
+    def spawn_ai_thread(self, player, request_id: int):
         ai_game_status = AI_GameStatus()
         ai_move = AI_Move()
-        self.construct_game_status(player, ai_game_status)
-        self.ai_interface.do_a_move(ai_game_status, ai_move, player.id)
+        try:
+            with self.profiler.measure(PHASE_GAME_STATUS, self.turn_nr, player.id):
+                self.construct_game_status(player, ai_game_status)
+        except Exception as e:
+            self.ai_interface.fail_move(e, request_id)      # otherwise, the game loop waits for the move forever
+            return
+        self.ai_interface.do_a_move(ai_game_status, ai_move, player.id, request_id)
 
     def play_players_turn(self, player: Player):
         """wrapper function, extends the main update loop"""
         # debug(f"Play move of player {player.name} [pid: {player.id}]")
-        self.updata_map()
+        with self.profiler.measure(PHASE_UPDATE_MAP, self.turn_nr, player.id):
+            self.updata_map()
         if self.check_win_condition(player):
             self.winner = player
-        self.update_player_properties(player)
+        with self.profiler.measure(PHASE_PLAYER_PROPERTIES, self.turn_nr, player.id):
+            self.update_player_properties(player)
         player.has_lost = self.check_lose_condition(player)
         if player.has_lost:
             self.destroy_player(player)
             return
+        if self.replay is not None:
+            player.attacked_set.clear()         # as if the game status was constructed (the agent has seen it)
+            return                              # the move is read from the replay
         if player.player_type == PlayerType.HUMAN:
             ai_game_status = AI_GameStatus()
-            self.construct_game_status(player, ai_game_status)
+            with self.profiler.measure(PHASE_GAME_STATUS, self.turn_nr, player.id):
+                self.construct_game_status(player, ai_game_status)
             ai_move = AI_Move()
             self.human_interface.request_move(ai_game_status, ai_move, player.id)
         else:
-            ai_worker = threading.Thread(target=self.spawn_ai_thread, args=(player, ))
-            ai_worker.start()
+            request_id = self.ai_interface.request_move(player.id)
+            if not self.ai_interface.is_overdue():      # otherwise, the AI is still busy with an abandoned move
+                # daemon: an AI which exceeds its time budget must not keep the game process alive
+                ai_worker = threading.Thread(target=self.spawn_ai_thread, args=(player, request_id), daemon=True)
+                ai_worker.start()
 
         # ai_game_status = AI_GameStatus()
         # self.construct_game_status(player, ai_game_status)
@@ -325,6 +420,45 @@ class GameLogic:
         # else:
         #     self.ai_interface.do_a_move(ai_game_status, ai_move, player.id)
 
+    def play_headless(self, max_turns: int) -> Optional[Player]:
+        """plays the game without rendering until a player has won or max_turns is reached.
+        Returns the winner, or None if the game ended in a draw (turn limit)"""
+        if not self.headless:
+            error("GameLogic: play_headless requires the game logic to be created in headless mode")
+            return None
+        if self.has_human_player and self.replay is None:
+            error("GameLogic: a headless game cannot have a human player")
+            return None
+        return self.fast_forward(max_turns)
+
+    def fast_forward(self, turn_nr: int) -> Optional[Player]:
+        """plays turns without waiting for the game clock, until turn_nr is reached or a player has won.
+        Requires the headless mode (waits for the AIs) or the replay mode (no agents involved)"""
+        if not self.headless and self.replay is None:
+            error("GameLogic: fast forward requires the headless or the replay mode")
+            return None
+        # a pending move is always completed, such that the result does not depend on the timing of the AI thread
+        while (self.winner is None and self.turn_nr < turn_nr) or \
+                self.logic_state is not GameLogicState.READY_FOR_TURN:
+            self.playNextTurn = True
+            self.handle_turn()
+        return self.winner
+
+    def start_recording(self, file: str) -> bool:
+        """records all moves applied from now on to a replay file (see replay.py). Only possible before the first
+        move, as a replay starts from a freshly set up game"""
+        if self.turn_nr != 0 or self.current_player != 0 or self.logic_state is not GameLogicState.READY_FOR_TURN:
+            error("GameLogic: a replay can only be recorded from the start of the game")
+            return False
+        self.stop_recording()
+        self.recorder = ReplayRecorder(file, self.game_file_reader.file, self.seed)
+        return True
+
+    def stop_recording(self):
+        if self.recorder is not None:
+            self.recorder.close()
+            self.recorder = None
+
     def update_player_properties(self, player):
         """calculate income, new culture level, food, etc."""
         # continue build buildings
@@ -350,32 +484,52 @@ class GameLogic:
         # buildable_tiles_1 = tiles[1]
         # walkable_tiles_1 = tiles[2]
 
-        scoutable_tiles = self.get_scoutable_tiles(player)
-        buildable_tiles = self.get_buildable_tiles(player)
-        walkable_tiles = self.get_walkable_tiles(player)
-        known_resources = self.get_known_resources(player)
-        enemy_buildings = self.get_enemy_buildings(player, scoutable_tiles)  # tuple set((bld, owner_id))
-        enemy_armies = self.get_enemy_armies(player)        # tuple set((army, owner_id))
+        scoutable_set = self.get_scoutable_tiles(player)
+        # the sets are ordered by the memory addresses of the game objects. The AI gets them sorted by location,
+        # otherwise its decisions (and thus the match) could not be reproduced from the seed
+        scoutable_tiles = sorted(scoutable_set, key=lambda h: h.offset_coordinates)
+        buildable_tiles = sorted(self.get_buildable_tiles(player), key=lambda h: h.offset_coordinates)
+        walkable_tiles = sorted(self.get_walkable_tiles(player), key=lambda h: h.offset_coordinates)
+        discovered_tiles = sorted(player.discovered_tiles, key=lambda h: h.offset_coordinates)
+        known_resources = sorted(self.get_known_resources(player), key=lambda r: r.tile.offset_coordinates)
+        # tuples (bld, owner_id) and (army, owner_id), several armies can be located on the same tile
+        enemy_buildings = sorted(self.get_enemy_buildings(player, scoutable_set),
+                                 key=lambda e: (e[0].tile.offset_coordinates, e[1]))
+        enemy_armies = sorted(self.get_enemy_armies(player), key=lambda e: (e[0].tile.offset_coordinates, e[1]))
 
         # build the map representation for the AI
         # all tiles is the union of scoutable and known tiles
         from src.ai.AI_MapRepresentation import Map
-        ai_map: Map = Map()
-        for s in scoutable_tiles:
-            ai_map.add_tile(s.offset_coordinates, s.ground.ground_type)
-        for s in player.discovered_tiles:
-            ai_map.add_tile(s.offset_coordinates, s.ground.ground_type)
-        ai_map.connect_graph()
-
-        # TODO speed up (iterate only once over the map) by doing the scoutables, one can get all others "for free"
-        for h in scoutable_tiles:
-            ai_map.set_scoutable_tile(h.offset_coordinates)
-        for h in walkable_tiles:
-            ai_map.set_walkable_tile(h.offset_coordinates)
-        for h in buildable_tiles:
-            ai_map.set_buildable_tile(h.offset_coordinates)
-        for h in player.discovered_tiles:
-            ai_map.set_discovered_tile(h.offset_coordinates)
+        if self.incremental_ai_status:
+            # keep the map of the player alive and apply only what has changed since the last snapshot
+            ai_map: Map = self.ai_maps.get(player.id)
+            if ai_map is None:
+                ai_map = Map()
+                self.ai_maps[player.id] = ai_map
+            tiles = {s.offset_coordinates: s.ground.ground_type for s in scoutable_tiles}
+            tiles.update({s.offset_coordinates: s.ground.ground_type for s in discovered_tiles})
+            ai_map.update_tiles(tiles)
+            ai_map.update_tile_flags([h.offset_coordinates for h in scoutable_tiles],
+                                     [h.offset_coordinates for h in walkable_tiles],
+                                     [h.offset_coordinates for h in buildable_tiles],
+                                     [h.offset_coordinates for h in discovered_tiles])
+            ai_map.clear_objects()
+        else:
+            ai_map: Map = Map()
+            for s in scoutable_tiles:
+                ai_map.add_tile(s.offset_coordinates, s.ground.ground_type)
+            for s in discovered_tiles:
+                ai_map.add_tile(s.offset_coordinates, s.ground.ground_type)
+            ai_map.connect_graph()
+
+            for h in scoutable_tiles:
+                ai_map.set_scoutable_tile(h.offset_coordinates)
+            for h in walkable_tiles:
+                ai_map.set_walkable_tile(h.offset_coordinates)
+            for h in buildable_tiles:
+                ai_map.set_buildable_tile(h.offset_coordinates)
+            for h in discovered_tiles:
+                ai_map.set_discovered_tile(h.offset_coordinates)
 
         for r in known_resources:
             ai_map.add_resource(r.tile.offset_coordinates, r)
@@ -461,17 +615,16 @@ class GameLogic:
             res.tile.ground.walkable = False
             res.tile.ground.buildable = False
 
+        if self.headless:
+            return
         for p in self.player_list:
             for a in p.armies:
                 pix_loc = HexMap.offset_to_pixel_coords(a.tile.offset_coordinates)
-                a.set_sprite_pos(pix_loc, self.__camera_pos)
-
-        # This is a bit of brute force approach and not really necessary. However, animations made it hard
-        # to track when updates are necessary, however the method is still very fast
-        self.__reorder_spritelist(self.z_levels[Z_GAME_OBJ])
+                a.set_sprite_pos(pix_loc)
 
     def exec_ai_move(self, ai_move: AI_Move, player: Player):
-
+        if self.recorder is not None:
+            self.recorder.record(self.turn_nr, player.id, ai_move)
         self.__check_validity(ai_move)
         for d in self.hex_map.map:
             d.debug_msg = ""
@@ -535,7 +688,7 @@ class GameLogic:
                         # b.associated_tiles.append(self.hex_map.get_hex_by_offset(ai_move.info[2]))
                 if not player.is_barbaric:
                     tmp = self.hex_map.get_neighbours_dist(base_hex, b.sight_range)
-                    player.discovered_tiles.update(tmp)
+                    self.discover_tiles(player, tmp)
                 self.add_building(b, player)
                 player.amount_of_resources = player.amount_of_resources - Building.get_construction_cost(b_type)
                 # The sight range is only extended with the player is not barbaric
@@ -545,14 +698,13 @@ class GameLogic:
         if ai_move.move_type == MoveType.DO_SCOUT:
             #FIXME cost of scouting is hardcoded
             if player.amount_of_resources >= 1:
-                player.discovered_tiles.add(self.hex_map.get_hex_by_offset(ai_move.loc))
+                self.discover_tiles(player, [self.hex_map.get_hex_by_offset(ai_move.loc)])
                 player.amount_of_resources = player.amount_of_resources - 1
-                self.toggle_fog_of_war_lw(player.discovered_tiles)
 
         elif ai_move.move_type == MoveType.DO_UPGRADE_BUILDING:
             b_old: Optional[Building] = None
-            for upgradable in player.buildings:
-                if upgradable.tile.offset_coordinates == ai_move.loc:
+            for upgradable in self.occupancy.buildings_at(self.hex_map.get_hex_by_offset(ai_move.loc)):
+                if upgradable.owner_id == player.id:
                     b_old = upgradable
             if not b_old:
                 print("Exec AI Move: No building found at location to upgrade!")
@@ -573,8 +725,8 @@ class GameLogic:
                 if self.hex_map.get_hex_by_offset(ai_move.move_army_to) is not None:
                     #if self.hex_map.get_hex_by_offset(ai_move.move_army_to).ground.walkable:
                     ok = True
-                    for b in player.buildings:
-                        if b.tile.offset_coordinates == ai_move.move_army_to:
+                    for b in self.occupancy.buildings_at(self.hex_map.get_hex_by_offset(ai_move.move_army_to)):
+                        if b.owner_id == player.id:
                             ok = False
                     if ok:
                         self.move_army(player.armies[0], player, ai_move.move_army_to)
@@ -688,13 +840,11 @@ class GameLogic:
 
     def get_enemy_buildings(self, player: Player, scoutable_tiles: Set[Hexagon]) -> set:
         e_set = set()
-        u = set().union(player.discovered_tiles, scoutable_tiles)
         for other_player in self.player_list:
             if other_player.id != player.id:
                 for o_b in other_player.buildings:
-                    for my_dis in u:
-                        if o_b.tile.offset_coordinates == my_dis.offset_coordinates:
-                            e_set.add((o_b, other_player.id))
+                    if o_b.tile in player.discovered_tiles or o_b.tile in scoutable_tiles:
+                        e_set.add((o_b, other_player.id))
         return e_set
 
     def get_enemy_armies(self, player:  Player) -> set:
@@ -706,69 +856,61 @@ class GameLogic:
                         e_set.add((army, other_player.id))
         return e_set
 
-    def update_fog_of_war(self, player):
-        if self.map_hack:
+    def discover_tiles(self, player: Player, tiles: Iterable[Hexagon]):
+        """extends the discovered tiles of the player (use this instead of changing player.discovered_tiles)"""
+        tiles = list(tiles)
+        player.discovered_tiles.update(tiles)
+        self.fog_of_war.discover(player.id, tiles)
+        self.update_fog_of_war()
+
+    def update_fog_of_war(self):
+        """reveals and covers the tiles whose visibility has changed since the last update (discovered tiles,
+        map view or map hack)"""
+        if self.headless:
             return
-        if self.map_view[player.id]:
-            for hex in player.discovered_tiles:
-                hex.ground.set_active_texture(1)
-                # hex.ground.sprite.alpha = 255
-            for res in self.scenario.resource_list:
-                if res.tile in player.discovered_tiles:
-                    res.sprite.alpha = 255
-            for p in self.player_list:
-                for a in p.armies:
-                    if a.tile in player.discovered_tiles:
-                        a.sprite.alpha = 255
-                for b in p.buildings:
-                    if b.tile in player.discovered_tiles:
-                        b.sprite.alpha = 255
-                        b.flag.alpha = 255
-                        for a in b.associated_drawables:
-                            a.sprite.alpha = 255
-        self.__reorder_spritelist(self.z_levels[Z_GAME_OBJ])
-
-    def toggle_fog_of_war_lw(self, tile_list: Set[Hexagon], show_update_bar=False):
         t1 = timeit.default_timer()
-        v = 255 if self.map_hack else 0
-        for res in self.scenario.resource_list:
-            res.sprite.alpha = v
-        tot = len(tile_list)
-        counter = 0
-        if show_update_bar:
-            start_progress("Updating map view")
-        if self.change_in_map_view:
-            for hex in tile_list:
-                if counter % 5 == 0 and show_update_bar:
-                    progress(counter)
-                counter = counter + 1
-                hex.ground.set_active_texture(1 if self.map_hack else 0)
-                # hex.ground.sprite.alpha = 255 if self.map_hack else 0
-        if show_update_bar:
-            end_progress()
-        for player in self.player_list:
-            for a in player.armies:
-                a.sprite.alpha = v
-            for b in player.buildings:
-                b.sprite.alpha = v
-                b.flag.alpha = v
-                for a in b.associated_drawables:
-                    a.sprite.alpha = v
+        view = self.fog_of_war.get_view(self.map_hack, [p.id for p in self.player_list if self.map_view[p.id]])
+        revealed, covered = self.fog_of_war.reveal(view)
+        for idx in FogOfWar.get_tile_ids(revealed):
+            self.__show_tile(self.hex_map.map[idx], True)
+        for idx in FogOfWar.get_tile_ids(covered):
+            self.__show_tile(self.hex_map.map[idx], False)
         t2 = timeit.default_timer()
-        for player in self.player_list:
-            self.update_fog_of_war(player)
-        t3 = timeit.default_timer()
-        # debug("Toggeling the map took: {} s (fog of war update: {})".format(t3 - t1, t3 - t2))
+        self.profiler.add(PHASE_FOG_OF_WAR, self.turn_nr, NO_PLAYER, t2 - t1)
+
+    def __show_tile(self, tile: Hexagon, show: bool):
+        tile.ground.set_active_texture(1 if show else 0)
+        for res in self.occupancy.resources_at(tile):
+            self.__show_object(res, show)
+        for b in self.occupancy.buildings_at(tile):
+            self.__show_object(b, show)
+        for a in self.occupancy.armies_at(tile):
+            self.__show_object(a, show)
+
+    @staticmethod
+    def __show_object(obj: Union[Resource, Building, Army], show: bool):
+        v = 255 if show else 0
+        obj.sprite.alpha = v
+        if isinstance(obj, Building):
+            obj.flag.alpha = v
+            for a in obj.associated_drawables:
+                a.sprite.alpha = v
 
     def add_resource(self, resource: Resource):
         self.scenario.resource_list.append(resource)
-        resource.set_sprite_pos(HexMap.offset_to_pixel_coords(resource.tile.offset_coordinates), self.__camera_pos)
+        self.occupancy.add_resource(resource)
+        if self.headless:
+            return
+        resource.set_sprite_pos(HexMap.offset_to_pixel_coords(resource.tile.offset_coordinates))
         self.__set_sprite(resource, resource.tex_code)
+        self.__show_object(resource, self.fog_of_war.is_revealed(resource.tile))
         self.z_levels[Z_GAME_OBJ].append(resource.sprite)
 
     def del_resource(self, resource: Resource):
         self.scenario.resource_list.remove(resource)
-        self.z_levels[Z_GAME_OBJ].remove(resource.sprite)
+        self.occupancy.remove_resource(resource)
+        if not self.headless:
+            self.z_levels[Z_GAME_OBJ].remove(resource.sprite)
 
     def add_animated_flag(self, colour_code: str, pos: Tuple[int, int]) -> Flag:
         a_tex = self.texture_store.get_animated_texture('{}_flag'.format(colour_code))
@@ -780,7 +922,7 @@ class GameLogic:
     #     a_tex = self.texture_store.get_animated_texture('{}_flag'.format(colour_code))
     #     for tex in a_tex:
     #         flag.add_texture(tex)
-    #     flag.set_sprite_pos(flag.position, self.__camera_pos)
+    #     flag.set_sprite_pos(flag.position)
     #     flag.set_tex_scale(0.20)
     #     flag.update_interval = 0.1
     #     flag.sprite.set_texture(0)
@@ -793,23 +935,12 @@ class GameLogic:
     def add_building(self, building: Building, player: Player):
         # hint("adding a building")
         player.buildings.append(building)
-        position = HexMap.offset_to_pixel_coords(building.tile.offset_coordinates)
-        building.set_sprite_pos(position, self.__camera_pos)
-        self.__set_sprite(building, building.tex_code)
+        self.occupancy.add_building(building)
+        if not self.headless:
+            self.__add_building_sprites(building, player)
         building.set_state_active()
         if building.construction_time > 0:
-            building.add_tex_construction(self.texture_store.get_texture("cs"))
             building.set_state_construction()
-        building.add_tex_destruction(self.texture_store.get_texture("ds"))
-        self.z_levels[Z_GAME_OBJ].append(building.sprite)
-        # add the flag:
-        # flag = Flag((position[0] + building.flag_offset[0], position[1] + building.flag_offset[1]),
-        #            player.colour)
-        #self.add_flag(flag, player.colour_code)
-        pos = (position[0] + building.flag_offset[0] + self.__camera_pos[0],
-               position[1] + building.flag_offset[1] + self.__camera_pos[1])
-        flag = self.add_animated_flag(player.colour_code, pos)
-        building.flag = flag
         if building.building_type == BuildingType.FARM:
             for a in building.associated_tiles:
                 self.extend_building(building, a, "cf")
@@ -820,32 +951,56 @@ class GameLogic:
                 building.associated_tiles.append(n)
         building.tile.ground.walkable = False
         building.tile.ground.buildable = False
-        self.toggle_fog_of_war_lw(player.discovered_tiles)
-        self.__reorder_spritelist(self.z_levels[Z_GAME_OBJ])
+        if not self.headless:
+            self.__show_object(building, self.fog_of_war.is_revealed(building.tile))
 
+    def __add_building_sprites(self, building: Building, player: Player):
+        """creates the sprite (including construction and destruction textures) and the flag of a building"""
+        position = HexMap.offset_to_pixel_coords(building.tile.offset_coordinates)
+        building.set_sprite_pos(position)
+        self.__set_sprite(building, building.tex_code)
+        if building.construction_time > 0:
+            building.add_tex_construction(self.texture_store.get_texture("cs"))
+        building.add_tex_destruction(self.texture_store.get_texture("ds"))
+        self.z_levels[Z_GAME_OBJ].append(building.sprite)
+        # add the flag:
+        # flag = Flag((position[0] + building.flag_offset[0], position[1] + building.flag_offset[1]),
+        #            player.colour)
+        #self.add_flag(flag, player.colour_code)
+        pos = (position[0] + building.flag_offset[0], position[1] + building.flag_offset[1])
+        flag = self.add_animated_flag(player.colour_code, pos)
+        building.flag = flag
 
     def extend_building(self, building: Building, tile: Hexagon, tex_code: str):
         # building.associated_tiles.append(tile)
+        if self.headless:
+            return
         drawable = Drawable()
-        drawable.set_sprite_pos(HexMap.offset_to_pixel_coords(tile.offset_coordinates), self.__camera_pos)
+        drawable.set_sprite_pos(HexMap.offset_to_pixel_coords(tile.offset_coordinates))
         building.associated_drawables.append(drawable)
         drawable.sprite.alpha = 100
         self.__set_sprite(drawable, tex_code)
         self.z_levels[Z_GAME_OBJ].append(drawable.sprite)
 
     def del_building(self, building: Building, player: Player):
+        player.buildings.remove(building)
+        self.occupancy.remove_building(building)
+        if self.headless:
+            return
         self.del_flag(building.flag)
         for drawable in building.associated_drawables:
             self.z_levels[Z_GAME_OBJ].remove(drawable.sprite)
-        player.buildings.remove(building)
         self.z_levels[Z_GAME_OBJ].remove(building.sprite)
 
     def add_army(self, army: Army, player: Player):
         player.armies.append(army)
-        army.set_sprite_pos(HexMap.offset_to_pixel_coords(army.tile.offset_coordinates), self.__camera_pos)
+        self.occupancy.add_army(army)
         army.is_barbaric = player.is_barbaric
+        if self.headless:
+            return
+        army.set_sprite_pos(HexMap.offset_to_pixel_coords(army.tile.offset_coordinates))
         self.__set_sprite(army, "f1_" + player.colour_code)
-        self.toggle_fog_of_war_lw(player.discovered_tiles)
+        self.__show_object(army, self.fog_of_war.is_revealed(army.tile))
         self.z_levels[Z_GAME_OBJ].append(army.sprite)
 
     def move_army(self, army: Army, player: Player, pos: (int, int)):
@@ -865,49 +1020,48 @@ class GameLogic:
             return
         for p in self.player_list:
             if p != player:
-                for hostile_army in p.armies:
-                    if hostile_army.tile.offset_coordinates == new_hex.offset_coordinates:
-                        if hostile_army.get_population() > 0:
-                            pre_att_u = army.get_units_as_tuple()
-                            pre_def_u = hostile_army.get_units_as_tuple()
-                            outcome: BattleAfterMath = FightCalculator.army_vs_army(army, hostile_army)
-                            post_att_u = army.get_units_as_tuple()
-                            post_def_u = hostile_army.get_units_as_tuple()
-                            Logger.log_battle_army_vs_army_log(pre_att_u, pre_def_u, post_att_u, post_def_u,
-                                                               outcome, player.name, p.name)
-                            p.attacked_set.add((player.id, hostile_army.tile.offset_coordinates))
-                            if hostile_army.get_population() == 0:
-                                self.del_army(hostile_army, p)
-                            if army.get_population() == 0:
-                                self.del_army(army, player)
-                            # does not execute moving the army
-                            is_moving = False
-                        else:
-                            self.del_army(hostile_army, p)
-                            is_moving = False
-                for b in p.buildings:
-                    if b.tile.offset_coordinates == new_hex.offset_coordinates:
+                for hostile_army in [a for a in self.occupancy.armies_at(new_hex) if a.owner_id == p.id]:
+                    if hostile_army.get_population() > 0:
                         pre_att_u = army.get_units_as_tuple()
-                        pre_b = b.defensive_value
-                        outcome: BattleAfterMath = FightCalculator.army_vs_building(army, b)
+                        pre_def_u = hostile_army.get_units_as_tuple()
+                        outcome: BattleAfterMath = FightCalculator.army_vs_army(army, hostile_army)
                         post_att_u = army.get_units_as_tuple()
-                        post_b = b.defensive_value
-                        Logger.log_battle_army_vs_building(pre_att_u, post_att_u, pre_b, post_b,
+                        post_def_u = hostile_army.get_units_as_tuple()
+                        Logger.log_battle_army_vs_army_log(pre_att_u, pre_def_u, post_att_u, post_def_u,
                                                            outcome, player.name, p.name)
-                        p.attacked_set.add((player.id, b.tile.offset_coordinates))
-                        if b.defensive_value == -1:
-                            b.set_state_destruction()
+                        p.attacked_set.add((player.id, hostile_army.tile.offset_coordinates))
+                        if hostile_army.get_population() == 0:
+                            self.del_army(hostile_army, p)
                         if army.get_population() == 0:
                             self.del_army(army, player)
-                            is_moving = False
+                        # does not execute moving the army
+                        is_moving = False
+                    else:
+                        self.del_army(hostile_army, p)
+                        is_moving = False
+                for b in [b for b in self.occupancy.buildings_at(new_hex) if b.owner_id == p.id]:
+                    pre_att_u = army.get_units_as_tuple()
+                    pre_b = b.defensive_value
+                    outcome: BattleAfterMath = FightCalculator.army_vs_building(army, b)
+                    post_att_u = army.get_units_as_tuple()
+                    post_b = b.defensive_value
+                    Logger.log_battle_army_vs_building(pre_att_u, post_att_u, pre_b, post_b,
+                                                       outcome, player.name, p.name)
+                    p.attacked_set.add((player.id, b.tile.offset_coordinates))
+                    if b.defensive_value == -1:
+                        b.set_state_destruction()
+                    if army.get_population() == 0:
+                        self.del_army(army, player)
+                        is_moving = False
         if is_moving:
             if self.hex_map.hex_distance(new_hex, army.tile) == 1:
-                self.animator.add_move_animation(army, new_hex.offset_coordinates, float(.4))
+                if not self.headless:
+                    self.animator.add_move_animation(army, new_hex.offset_coordinates, float(.4))
+                    self.__show_object(army, self.fog_of_war.is_revealed(new_hex))
+                self.occupancy.move_army(army, new_hex)
                 army.tile = new_hex
                 # hint('army is moving to ' + str(army.tile.offset_coordinates))
                 #army.set_sprite_pos(HexMap.offset_to_pixel_coords(new_hex.offset_coordinates))
-                self.__reorder_spritelist(self.z_levels[Z_GAME_OBJ])
-                self.toggle_fog_of_war_lw(player.discovered_tiles)
             else:
                 error(f"Army cannot move that far: {self.hex_map.hex_distance(new_hex, army.tile)}")
 
@@ -916,42 +1070,29 @@ class GameLogic:
 
     def del_army(self, army: Army, player: Player):
         hint("Game Logic: deleting army of player " + str(player.name))
+        player.armies.remove(army)
+        self.occupancy.remove_army(army)
+        if self.headless:
+            return
         self.animator.stop_animation(army)
         self.z_levels[Z_GAME_OBJ].remove(army.sprite)
-        player.armies.remove(army)
 
     def __set_sprite(self, drawable: Drawable, tex_code: str):
         drawable.add_texture(self.texture_store.get_texture(tex_code))
         drawable.set_tex_offset(self.texture_store.get_tex_offest(tex_code))
         drawable.set_tex_scale(self.texture_store.get_tex_scale(tex_code))
 
-    def __reorder_spritelist(self, sl: arcade.SpriteList):          #TODO ugly
-        li = []
-        for s in sl:
-            li.append(s)
-        for s in li:
-            sl.remove(s)
-        # TODO: BAD:to make the army appear on top of fields I substract by height. That must be a better solution
-        # li.sort(key=lambda x: x.center_y - (x._height - 30), reverse=True)
-        li.sort(key=lambda x: x.center_y, reverse=True)
-        for s in li:
-            sl.append(s)
-
-    def set_camera_pos(self, pos_x, pos_y):
-        self.__camera_pos = (pos_x, pos_y)
-
     def get_map_element(self, offset_coords):
         # do this in zlvl order
-        for res in self.scenario.resource_list:
-            if res.tile.offset_coordinates == offset_coords:
-                return res, Resource
-        for p in self.player_list:
-            for b in p.buildings:
-                if b.tile.offset_coordinates == offset_coords:
-                    return b, Building
-            for a in p.armies:
-                if a.tile.offset_coordinates == offset_coords:
-                    return a, Army
+        hex = self.hex_map.get_hex_by_offset(offset_coords)
+        if hex is None:
+            return None, None
+        for res in self.occupancy.resources_at(hex):
+            return res, Resource
+        for b in self.occupancy.buildings_at(hex):
+            return b, Building
+        for a in self.occupancy.armies_at(hex):
+            return a, Army
         return None, None
 
     def add_aux_sprite(self, hex, tex_code):              # TODO ugly method duplicated
@@ -960,10 +1101,9 @@ class GameLogic:
     def __add_aux_sprite(self, hex: Hexagon, tex_code: str):
         aux = Drawable()
         self.scenario.aux_sprites.append((hex, aux))
-        aux.set_sprite_pos(HexMap.offset_to_pixel_coords(hex.offset_coordinates), self.__camera_pos)
+        aux.set_sprite_pos(HexMap.offset_to_pixel_coords(hex.offset_coordinates))
         self.__set_sprite(aux, tex_code)
         self.z_levels[Z_AUX].append(aux.sprite)
-        self.__reorder_spritelist(self.z_levels[Z_AUX])
 
     def __clear_aux_sprites(self):
         to_be_del: List[(Hexagon, Drawable)] = []
@@ -1004,6 +1144,20 @@ class GameLogic:
                         self.__add_aux_sprite(hex, "ou")
             elif cmd == "clear_aux":
                 self.__clear_aux_sprites()
+            elif cmd == "export_prof":
+                self.profiler.export(c[1])
+                hint(f"profiler data written to {c[1]}")
+            elif cmd == "save":
+                from src.misc.savegame import SaveGame
+                if SaveGame.save(self, c[1]):
+                    hint(f"game saved to {c[1]} (turn {self.turn_nr})")
+            elif cmd == "record":
+                if self.start_recording(c[1]):
+                    hint(f"recording the game to {c[1]}")
+            elif cmd == "load":
+                from src.misc.savegame import SaveGame
+                if SaveGame.load(self, c[1]):
+                    hint(f"game loaded from {c[1]} (turn {self.turn_nr})")
             elif cmd == "switch_ka":
                 self.show_key_frame_animation = not self.show_key_frame_animation
                 debug(f"keyframes are {'enabled' if self.show_key_frame_animation else 'disabled'}")
@@ -1,6 +1,8 @@
 from enum import Enum
+from functools import lru_cache
 from typing import Optional, Tuple, List
 
+from src.misc import cube_coords
 from src.misc.game_constants import hint, error
 
 TILE_HIGHT = 52 * 1
@@ -9,10 +11,12 @@ TILEMAP_ORIGIN_X = 40
 TILEMAP_ORIGIN_Y = 0
 LEFT_MARGIN = 0
 BOTTOM_MARGIN = 130
+RANGE_CACHE_SIZE = 1024         # number of (tile, radius) range queries kept by get_neighbours_dist
 
 
 class Hexagon:
-    def __init__(self, grid_pos: (int, int)):
+    def __init__(self, grid_pos: (int, int), idx: int = -1):
+        self.idx: int = idx                                 # position in the linear storage of the HexMap
         self.offset_coordinates: (int, int) = grid_pos
         self.cube_coordinates: (int, int, int) = HexMap.offset_to_cube_coords(grid_pos)
         self.ground = None
@@ -32,12 +36,23 @@ class HexMap:
         self.map: [Hexagon] = []       # linear storage of all hexagons in the map
         for y in range(map_dim[1]):
             for x in range(map_dim[0]):
-                self.map.append(Hexagon((x, y)))
+                self.map.append(Hexagon((x, y), len(self.map)))
+        # adjacent tiles of each tile (by tile id) in the order NE, E, SE, SW, W, NW, see get_neighbours
+        self.__neighbours: List[List[Hexagon]] = []
+        self.__neighbours_dist2: List[Optional[List[Hexagon]]] = [None] * len(self.map)
+        self.__build_neighbour_lists()
+        self.__range_cache = lru_cache(maxsize=RANGE_CACHE_SIZE)(self.__compute_range)
+
+    def __build_neighbour_lists(self):
+        for h in self.map:
+            x, y, z = h.cube_coordinates
+            nei = [self.get_hex_by_cube((x + dx, y + dy, z + dz)) for dx, dy, dz in cube_coords.CUBE_DIRECTIONS]
+            self.__neighbours.append([n for n in nei if n])
 
     def get_hex_by_cube(self, cube_c: (int, int, int)) -> Optional[Hexagon]:
-        x, y = HexMap.cube_to_offset_coords(cube_c)
+        x, y = cube_coords.cube_to_offset(cube_c)
         if (0 <= x < self.map_dim[0]) and (0 <= y < self.map_dim[1]):
-            return self.map[self.offset_to_linear_mapping(HexMap.cube_to_offset_coords(cube_c))]
+            return self.map[x + y * self.map_dim[0]]
         return None
 
     def get_hex_by_offset(self, offset_c: (int, int)) -> Optional[Hexagon]:
@@ -127,15 +142,18 @@ class HexMap:
         return self.get_hex_by_cube((x, y, z))
 
     def get_neighbours(self, h: Hexagon) -> List[Hexagon]:
-        nei = [self.get_hex_northeast(h),
-                self.get_hex_east(h),
-                self.get_hex_southeast(h),
-                self.get_hex_southwest(h),
-                self.get_hex_west(h),
-                self.get_hex_northwest(h)]
-        return list(filter(None, nei))
-
-    def get_neighbours_dist2(self, h:Hexagon) -> List[Hexagon]:
+        """returns the adjacent tiles (precomputed, the list is shared and must not be modified)"""
+        return self.__neighbours[h.idx]
+
+    def get_neighbours_dist2(self, h: Hexagon) -> List[Hexagon]:
+        """returns all tiles within distance 2 (cached, the list is shared and must not be modified)"""
+        nei = self.__neighbours_dist2[h.idx]
+        if nei is None:
+            nei = self.__compute_neighbours_dist2(h)
+            self.__neighbours_dist2[h.idx] = nei
+        return nei
+
+    def __compute_neighbours_dist2(self, h: Hexagon) -> List[Hexagon]:
         x, y ,z = h.cube_coordinates
         dist_2 = [(x, y+2, z-2), (x+1, y+1, z-2), (x+2, y, z-2),
          (x+2, y-1, z-1), (x+2, y-2, z), (x+1, y-2, z+1),
@@ -158,11 +176,20 @@ class HexMap:
         elif dist == 2:
             return self.get_neighbours_dist2(h)
         else:
-            nei = []
-            for hex in self.map:
-                if HexMap.hex_distance(h, hex) <= dist:
-                    nei.append(hex)
-            return list(filter(None, nei))
+            return self.__range_cache(h.idx, dist)
+
+    def __compute_range(self, idx: int, dist: int) -> List[Hexagon]:
+        """enumerates all tiles within dist in cube coordinates, O(dist^2) instead of a scan over the map.
+        The result is sorted by tile id, i.e. in the same order as the map"""
+        x, y, z = self.map[idx].cube_coordinates
+        nei = []
+        for dx in range(-dist, dist + 1):
+            for dy in range(max(-dist, -dx - dist), min(dist, -dx + dist) + 1):
+                h = self.get_hex_by_cube((x + dx, y + dy, z - dx - dy))
+                if h:
+                    nei.append(h)
+        nei.sort(key=lambda n: n.idx)
+        return nei
 
     def get_hex_by_pixel(self, pix_on_screen: Tuple[int, int], camera_pos: Tuple[int, int]):
         # idx_x = 0
@@ -183,20 +210,15 @@ class HexMap:
 
     @staticmethod
     def cube_distance(a: (int, int, int), b: (int, int, int)) -> int:
-        return (abs(a[0] - b[0]) + abs(a[1] - b[1]) + abs(a[2] - b[2])) / 2
+        return cube_coords.cube_distance(a, b)
 
     @staticmethod
     def offset_to_cube_coords(offset_c: (int, int)) -> (int, int, int):
-        x = offset_c[0] - (offset_c[1] - (offset_c[1] & 1)) / 2
-        z = offset_c[1]
-        y = -x - z
-        return x, y, z
+        return cube_coords.offset_to_cube(offset_c[0], offset_c[1])
 
     @staticmethod
     def cube_to_offset_coords(cube_c: (int, int, int)) -> (int, int):
-        x = cube_c[0] + (cube_c[2] - (cube_c[2] & 1)) / 2
-        y = cube_c[2]
-        return int(x), int(y)
+        return cube_coords.cube_to_offset(cube_c)
 
     @staticmethod
     def offset_to_pixel_coords(offset_c: (int, int)) -> (int, int):
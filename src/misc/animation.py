@@ -7,15 +7,13 @@ from src.misc.game_constants import error, hint, debug
 
 class Animator:
     class MoveAnimation:
-        def __init__(self, source: (int, int), destination: (int, int), time_ms, drawable: Drawable,
-                     camera_pos: (int, int)):
+        def __init__(self, source: (int, int), destination: (int, int), time_ms, drawable: Drawable):
             self.source = source
             self.destination = destination
             self.time_ms = time_ms
             self.start_time_ms = -1
             self.finished = False
             self.drawable = drawable
-            self.camera_pos = camera_pos
             self.valid = True               # try to fix the Animator problem
 
 
@@ -29,12 +27,11 @@ class Animator:
             # if not (type(tpl) == Tuple):
             #     error("Error in Animator -> bilinear interpolation output: " + str(type(tpl)))
             if self.valid:
-                self.drawable.set_sprite_pos(tpl, self.camera_pos)
+                self.drawable.set_sprite_pos(tpl)
 
     def __init__(self):
         self.move_animations: List[Animator.MoveAnimation] = []
         self.key_frame_animations: List = []
-        self.camera_pos = (0, 0)
 
     def is_active(self):
         return len(self.move_animations) > 0
@@ -51,15 +48,10 @@ class Animator:
             debug("removing drawable from animation")
             self.move_animations.remove(tbr)
 
-    def update_camera_pos(self, camera_pos):
-        self.camera_pos = camera_pos
-        for m_animation in self.move_animations:
-            m_animation.camera_pos = camera_pos
-
     def add_move_animation(self, obj: Union[Army], destination: (int, int), time_ms):
         start = HexMap.offset_to_pixel_coords(obj.tile.offset_coordinates)
         dest = HexMap.offset_to_pixel_coords(destination)
-        move = Animator.MoveAnimation(start, dest, time_ms, obj,  self.camera_pos)
+        move = Animator.MoveAnimation(start, dest, time_ms, obj)
         self.move_animations.append(move)
 
     def update(self, time):
@@ -70,8 +62,7 @@ class Animator:
             if move.start_time_ms == -1:
                 move.start_time_ms = time
             if time > move.start_time_ms + move.time_ms:    #simulation has ended
-                # FIXME this will probably fail if the camera is moving at the same time
-                move.drawable.set_sprite_pos(move.destination, move.camera_pos)
+                move.drawable.set_sprite_pos(move.destination)
                 move.finished = True
             else:
                 move.update(time)
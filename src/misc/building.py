@@ -54,7 +54,7 @@ class Building(Drawable):
         self.building_state = BuildingState.UNDER_CONSTRUCTION
         if self.has_texture_construction():
             super().set_active_texture(self.__idx_texture_construction)
-        else:
+        elif self.has_sprite():
             error("Building does not have a construction texture!")
 
     def set_state_destruction(self):
@@ -62,7 +62,7 @@ class Building(Drawable):
         self.building_state = BuildingState.DESTROYED
         if self.has_texture_destruction():
             super().set_active_texture(self.__idx_texture_destruction)
-        else:
+        elif self.has_sprite():
             error("Building does not have a destruction texture!")
 
     def set_state_active(self):
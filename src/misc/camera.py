@@ -1,10 +1,14 @@
 from typing import Tuple, List, Any, Callable
 
+import arcade
+
 from src.misc.game_constants import CAMERA_SENSITIVITY
 
 
 class Camera:
     """Simple class, which controls the viewport of the screen
+    The sprites of the map are kept in world coordinates, the camera only changes the projection (see apply), thus
+    scrolling does not touch a single sprite. A point in the world appears on the screen at world + position.
     This class is not threat safe"""
     def __init__(self, screen_width, screen_height):
         self.__position: Tuple[int, int] = (0, 0)
@@ -24,14 +28,31 @@ class Camera:
         """get the camera position: this is the lower left corner"""
         return self.__position
 
+    def to_world(self, pix_on_screen: Tuple[int, int]) -> Tuple[int, int]:
+        """translates a pixel on the screen (e.g. the mouse position) to world coordinates"""
+        return pix_on_screen[0] - self.__position[0], pix_on_screen[1] - self.__position[1]
+
+    def get_visible_area(self) -> Tuple[int, int, int, int]:
+        """:return: left, right, bottom and top of the screen in world coordinates"""
+        return -self.__position[0], self.screen_width - self.__position[0], \
+            -self.__position[1], self.screen_height - self.__position[1]
+
+    def apply(self):
+        """sets the projection such that everything drawn afterwards is in world coordinates"""
+        arcade.set_viewport(*self.get_visible_area())
+
+    def apply_screen(self):
+        """sets the projection such that everything drawn afterwards is in screen coordinates (UI)"""
+        arcade.set_viewport(0, self.screen_width, 0, self.screen_height)
+
     def set_position(self, pos: Tuple[int, int]):
         """set the offset of the lower left corner of the screen in pixels"""
         self.__position = pos
 
     def set_center(self, center: Tuple[int, int]):
         """set the focus point of the camera (center) on a specific pixel offset"""
-        tmp_x = center[0] - self.screen_width / 2
-        tmp_y = center[1] - self.screen_height / 2
+        tmp_x = self.screen_width / 2 - center[0]
+        tmp_y = self.screen_height / 2 - center[1]
         self.__position = (tmp_x, tmp_y)
 
     def register(self, obj: Any, callback: Callable[[Tuple[int, int], Tuple[int, int]], None]):
@@ -60,18 +81,7 @@ class Camera:
 
         if self.camera_has_moved:
             for obj, call in self._camera_event_listener:
-                obj.call((self.rel_x, self.rel_y), self.__position)
-
-            # for s_list in self.z_levels:
-            #     for sp in s_list:
-            #         sp.center_x = sp.center_x + self.rel_x
-            #         sp.center_y = sp.center_y + self.rel_y
-            # self.gl.set_camera_pos(self.camera_x, self.camera_y)
-            # self.gl.animator.update_camera_pos((self.camera_x, self.camera_y))
-            # #self.gl.animator.camera_pos = (self.camera_x, self.camera_y)
-            # self.ui.camera_pos = (self.camera_x, self.camera_y)
-            # for listener in self.camera_event_listener:
-            #     listener.camera_pos = (self.camera_x, self.camera_y)
+                call((self.rel_x, self.rel_y), self.__position)
             self.camera_has_moved = False
             self.rel_x = 0
             self.rel_y = 0
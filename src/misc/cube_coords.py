@@ -0,0 +1,34 @@
+"""
+Integer cube coordinate math for hexagonal maps in 'odd-r' offset layout (odd rows are shifted to the right).
+Shared by the HexMap of the game logic and the AI toolkit. All functions return exact integers (no float
+division), so coordinates can be hashed and compared cheaply and distances are ints.
+
+Cube coordinates are plain tuples (x, y, z) with x + y + z == 0, offset coordinates are tuples (col, row).
+"""
+from typing import Tuple
+
+# cube offsets of the 6 neighbours, in the order used throughout the game: NE, E, SE, SW, W, NW
+CUBE_DIRECTIONS: Tuple[Tuple[int, int, int], ...] = ((0, -1, 1), (1, -1, 0), (1, 0, -1),
+                                                     (0, 1, -1), (-1, 1, 0), (-1, 0, 1))
+
+
+def offset_to_cube(col: int, row: int) -> Tuple[int, int, int]:
+    x = col - ((row - (row & 1)) >> 1)
+    return x, -x - row, row
+
+
+def cube_to_offset(cube_c: Tuple[int, int, int]) -> Tuple[int, int]:
+    z = cube_c[2]
+    return cube_c[0] + ((z - (z & 1)) >> 1), z
+
+
+def cube_distance(a: Tuple[int, int, int], b: Tuple[int, int, int]) -> int:
+    dx = a[0] - b[0]
+    dy = a[1] - b[1]
+    dz = a[2] - b[2]
+    return max(dx if dx > 0 else -dx, dy if dy > 0 else -dy, dz if dz > 0 else -dz)
+
+
+def offset_distance(a: Tuple[int, int], b: Tuple[int, int]) -> int:
+    """distance in tiles between two offset coordinates"""
+    return cube_distance(offset_to_cube(a[0], a[1]), offset_to_cube(b[0], b[1]))
@@ -0,0 +1,54 @@
+from typing import Dict, Iterable, Iterator, Tuple
+
+from src.hex_map import Hexagon
+
+"""
+Fog of war as bitmaps over the tiles: bit i stands for the tile with Hexagon.idx == i. Python ints are used as bit
+arrays, thus combining the views of the players (|) and finding the tiles whose visibility flipped (^) are single
+operations over the whole map, and only the flipped tiles have to be repainted.
+"""
+
+
+class FogOfWar:
+    """the tiles discovered by each player and the tiles which are currently revealed on the screen.
+    It is maintained by GameLogic.discover_tiles and applied by GameLogic.update_fog_of_war"""
+    def __init__(self, num_tiles: int):
+        self.all_tiles: int = (1 << num_tiles) - 1
+        self.discovered: Dict[int, int] = {}            # player id -> bitmap
+        self.revealed: int = 0                          # initially, the map is covered (fog textures, alpha 0)
+
+    def discover(self, player_id: int, tiles: Iterable[Hexagon]):
+        bitmap = self.discovered.get(player_id, 0)
+        for t in tiles:
+            bitmap |= 1 << t.idx
+        self.discovered[player_id] = bitmap
+
+    def forget(self, player_id: int):
+        self.discovered[player_id] = 0
+
+    def get_view(self, map_hack: bool, viewed_players: Iterable[int]) -> int:
+        """:return: the bitmap of the tiles which should be revealed"""
+        if map_hack:
+            return self.all_tiles
+        view = 0
+        for pid in viewed_players:
+            view |= self.discovered.get(pid, 0)
+        return view
+
+    def reveal(self, view: int) -> Tuple[int, int]:
+        """sets the revealed tiles, :return: the bitmaps of the tiles to reveal and the tiles to cover"""
+        flipped = view ^ self.revealed
+        self.revealed = view
+        return flipped & view, flipped & ~view
+
+    def is_revealed(self, tile: Hexagon) -> bool:
+        return (self.revealed >> tile.idx) & 1 == 1
+
+    @staticmethod
+    def get_tile_ids(bitmap: int) -> Iterator[int]:
+        """the ids of the set bits, in ascending order"""
+        bits = bin(bitmap)[:1:-1]                       # least significant bit first, without '0b'
+        idx = bits.find('1')
+        while idx != -1:
+            yield idx
+            idx = bits.find('1', idx + 1)
@@ -29,7 +29,12 @@ DEBUG = True
 DETAILED_DEBUG_INFO = 1     # 0: no info, 1: includes calling class, 2: includes calling method
 ENABLE_KEYFRAME_ANIMATIONS = False
 MAP_HACK_ENABLE_AT_STARTUP = False
+INCREMENTAL_AI_STATUS = True        # keep the AI's map alive across turns and only apply changes
 GAME_LOGIC_CLK_SPEED = 0.75
+AI_SOFT_TIME_BUDGET = 1.0           # in s, the AI should wrap up its move after this time (see AI.time_left)
+AI_HARD_TIME_BUDGET = 5.0           # in s, the game does not wait any longer and applies a default move
+AI_PROCESS_BACKEND = True           # host each AI in a worker process (not in headless games, see GameLogic)
+AI_PROCESS_START_METHOD = None      # multiprocessing start method of the AI workers, None: platform default
 
 
 class Definitions:
@@ -40,6 +45,7 @@ class Definitions:
     SHOW_STATS_ON_EXIT = True
     DEBUG_MODE = True
     ALLOW_CONSOLE_CMDS = True
+    SHOW_PROFILER = True            # timings of the game loop phases next to the fps (see src/misc/profiler.py)
 
 
 class bcolors:
@@ -1,9 +1,9 @@
 import queue
 # from dataclasses import dataclass
 from math import ceil
-from typing import Tuple
+from typing import Tuple, Dict, List
 
-from src.game_accessoires import Army, Unit
+from src.game_accessoires import Army, Unit, Resource
 from src.hex_map import Hexagon
 
 from src.misc.building import Building
@@ -12,10 +12,65 @@ from src.misc.game_constants import BuildingType, BuildingState, LogType, DiploE
 from src.player import Player
 
 
+class OccupancyIndex:
+    """
+    tile -> object index, answers 'what is on this tile' without scanning the object lists.
+    It is maintained by the add_/del_ functions of the GameLogic and by move_army.
+    The returned lists are owned by the index, copy them before adding or removing objects while iterating
+    """
+    def __init__(self):
+        self.armies: Dict[Hexagon, List[Army]] = {}
+        self.buildings: Dict[Hexagon, List[Building]] = {}
+        self.resources: Dict[Hexagon, List[Resource]] = {}
+
+    def armies_at(self, tile: Hexagon) -> List[Army]:
+        return self.armies.get(tile, [])
+
+    def buildings_at(self, tile: Hexagon) -> List[Building]:
+        return self.buildings.get(tile, [])
+
+    def resources_at(self, tile: Hexagon) -> List[Resource]:
+        return self.resources.get(tile, [])
+
+    def add_army(self, army: Army):
+        self.armies.setdefault(army.tile, []).append(army)
+
+    def remove_army(self, army: Army):
+        OccupancyIndex.__remove(self.armies, army.tile, army)
+
+    def move_army(self, army: Army, new_tile: Hexagon):
+        """call this before the tile of the army is changed"""
+        OccupancyIndex.__remove(self.armies, army.tile, army)
+        self.armies.setdefault(new_tile, []).append(army)
+
+    def add_building(self, building: Building):
+        self.buildings.setdefault(building.tile, []).append(building)
+
+    def remove_building(self, building: Building):
+        OccupancyIndex.__remove(self.buildings, building.tile, building)
+
+    def add_resource(self, resource: Resource):
+        self.resources.setdefault(resource.tile, []).append(resource)
+
+    def remove_resource(self, resource: Resource):
+        OccupancyIndex.__remove(self.resources, resource.tile, resource)
+
+    @staticmethod
+    def __remove(index: Dict, tile: Hexagon, obj):
+        objs = index.get(tile)
+        if objs is None or obj not in objs:
+            error("OccupancyIndex: object is not indexed at its tile")
+            return
+        objs.remove(obj)
+        if len(objs) == 0:
+            del index[tile]
+
+
 class IncomeCalculator:
-    def __init__(self, hex_map, scenario):
+    def __init__(self, hex_map, scenario, occupancy: OccupancyIndex):
         self.scenario = scenario  # reference to scenario
         self.hex_map = hex_map  # reference to hex_map
+        self.occupancy: OccupancyIndex = occupancy
 
     def calculate_income(self, player: Player) -> int:
         if player.is_barbaric:
@@ -28,9 +83,8 @@ class IncomeCalculator:
                 continue
             income = income + building.resource_per_turn
             for tile in self.hex_map.get_neighbours(building.tile):
-                for res in self.scenario.resource_list:
-                    if res.tile.offset_coordinates == tile.offset_coordinates:
-                        income = income + res.demand_res(building.resource_per_field)
+                for res in self.occupancy.resources_at(tile):
+                    income = income + res.demand_res(building.resource_per_field)
 
         return income
 
@@ -92,14 +146,14 @@ class InitialCondition:
         elif player.player_type is PlayerType.BARBARIC:
             player.amount_of_resources = 5
             player.food = 10
-        player.discovered_tiles.add(base_hex)
+        gl.discover_tiles(player, [base_hex])
         b_type = player.get_initial_building_type()
         b: Building = Building(base_hex, b_type, player.id)
         gl.add_building(b, player)
         b.construction_time = 0
         b.set_state_active()
         tmp = gl.hex_map.get_neighbours_dist(base_hex, b.sight_range)
-        player.discovered_tiles.update(tmp)
+        gl.discover_tiles(player, tmp)
 
 
 class FightCalculator:
@@ -0,0 +1,117 @@
+import csv
+import json
+import threading
+import timeit
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Dict, Tuple, List, Optional, Iterator
+
+# phases of the game loop, in the order in which they occur
+PHASE_UPDATE_MAP = "updata_map"
+PHASE_PLAYER_PROPERTIES = "update_player_properties"
+PHASE_GAME_STATUS = "construct_game_status"
+PHASE_AI_MOVE = "do_move"
+PHASE_EXEC_MOVE = "exec_ai_move"
+PHASE_FOG_OF_WAR = "fog_of_war"
+PHASE_ANIMATOR = "animator"
+PHASE_RENDER = "render"
+PHASES = (PHASE_UPDATE_MAP, PHASE_PLAYER_PROPERTIES, PHASE_GAME_STATUS, PHASE_AI_MOVE, PHASE_EXEC_MOVE,
+          PHASE_FOG_OF_WAR, PHASE_ANIMATOR, PHASE_RENDER)
+# short names for the in-game overlay
+PHASE_LABELS = {PHASE_UPDATE_MAP: "map", PHASE_PLAYER_PROPERTIES: "props", PHASE_GAME_STATUS: "status",
+                PHASE_AI_MOVE: "ai", PHASE_EXEC_MOVE: "exec", PHASE_FOG_OF_WAR: "fow",
+                PHASE_ANIMATOR: "anim", PHASE_RENDER: "render"}
+
+NO_PLAYER = -1      # for phases which are not related to a player (animator, render)
+
+
+@dataclass
+class PhaseTiming:
+    """accumulated wall time of one phase, of one player in one turn"""
+    turn_nr: int
+    player_id: int
+    phase: str
+    calls: int = 0
+    total: float = .0
+    max: float = .0
+
+
+class Profiler:
+    """
+    Records the wall time per phase of the game loop (see PHASES), per player and turn.
+    Phases which run every frame (animator, render) are accumulated per turn, such that the memory footprint only
+    grows with the number of turns. Note that the fog of war is also updated while a move is executed, thus the
+    fog_of_war phase partially overlaps with exec_ai_move.
+    The data can be exported to csv or json, the latest measurements are shown as in-game overlay (Game.on_draw)
+    """
+    def __init__(self):
+        self.enabled: bool = True
+        self.timings: Dict[Tuple[int, int, str], PhaseTiming] = {}
+        self.last: Dict[str, float] = {}            # latest measurement of each phase, for the overlay
+        self.__lock = threading.Lock()              # the AI thread records as well
+
+    @contextmanager
+    def measure(self, phase: str, turn_nr: int, player_id: int = NO_PLAYER) -> Iterator[None]:
+        """with profiler.measure(PHASE_EXEC_MOVE, self.turn_nr, player.id): ..."""
+        if not self.enabled:
+            yield
+            return
+        t_start = timeit.default_timer()
+        try:
+            yield
+        finally:
+            self.add(phase, turn_nr, player_id, timeit.default_timer() - t_start)
+
+    def add(self, phase: str, turn_nr: int, player_id: int, duration: float):
+        if not self.enabled:
+            return
+        key = (turn_nr, player_id, phase)
+        with self.__lock:
+            t = self.timings.get(key)
+            if t is None:
+                t = PhaseTiming(turn_nr, player_id, phase)
+                self.timings[key] = t
+            t.calls = t.calls + 1
+            t.total = t.total + duration
+            t.max = max(t.max, duration)
+            self.last[phase] = duration
+
+    def clear(self):
+        with self.__lock:
+            self.timings.clear()
+            self.last.clear()
+
+    def get_rows(self) -> List[PhaseTiming]:
+        with self.__lock:
+            return sorted(self.timings.values(), key=lambda t: (t.turn_nr, t.player_id, PHASES.index(t.phase)
+                                                               if t.phase in PHASES else len(PHASES)))
+
+    def get_totals(self, player_id: Optional[int] = None) -> Dict[str, float]:
+        """:return: total wall time per phase over all turns (of one player, if player_id is given)"""
+        totals: Dict[str, float] = {}
+        for t in self.get_rows():
+            if player_id is None or t.player_id == player_id:
+                totals[t.phase] = totals.get(t.phase, .0) + t.total
+        return totals
+
+    def get_overlay_text(self) -> str:
+        """latest measurement of each phase in ms"""
+        return "  ".join(f"{PHASE_LABELS.get(p, p)}: {self.last[p] * 1000:.1f}" for p in PHASES if p in self.last)
+
+    def export(self, file: str):
+        """writes the timings to file, as json if the file ends with .json, otherwise as csv"""
+        if file.endswith(".json"):
+            self.export_json(file)
+        else:
+            self.export_csv(file)
+
+    def export_csv(self, file: str):
+        with open(file, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(["turn_nr", "player_id", "phase", "calls", "total", "max"])
+            for t in self.get_rows():
+                writer.writerow([t.turn_nr, t.player_id, t.phase, t.calls, f"{t.total:.6f}", f"{t.max:.6f}"])
+
+    def export_json(self, file: str):
+        with open(file, 'w') as f:
+            json.dump([asdict(t) for t in self.get_rows()], f, indent=1)
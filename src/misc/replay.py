@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+import struct
+from os import path
+from typing import Dict, List, Tuple, Optional, BinaryIO
+
+from src.ai.AI_GameStatus import AI_Move
+from src.ai.wire_format import encode_move, decode_move
+from src.misc.game_constants import error
+
+"""
+Replays: an append-only log of the moves the game has applied (GameLogic.exec_ai_move), with turn number and
+player id. The matches are deterministic, thus re-applying the moves to a freshly set up game of the same scenario
+and seed reproduces the match, without invoking any AI (see GameLogic.replay and src/replay.py).
+File layout: header (magic, version, seed, scenario), followed by one frame per move (turn, player id, length and
+the move in the wire format, see src/ai/wire_format.py)
+"""
+
+REPLAY_MAGIC = b"FAIREP"
+REPLAY_VERSION = 1
+_HEADER = struct.Struct("<6sHIH")           # magic, version, seed, length of the scenario name
+_FRAME = struct.Struct("<IBI")              # turn_nr, player_id, length of the move
+
+
+class ReplayRecorder:
+    """writes the moves of a match to a replay file, each move is flushed such that the log survives a crash"""
+    def __init__(self, file: str, scenario: str, seed: int):
+        self.file: str = file
+        self.__f: Optional[BinaryIO] = open(file, 'wb')
+        name = path.basename(scenario).encode()
+        self.__f.write(_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed, len(name)) + name)
+        self.num_moves: int = 0
+
+    def record(self, turn_nr: int, player_id: int, move: AI_Move):
+        data = encode_move(move)
+        self.__f.write(_FRAME.pack(turn_nr, player_id, len(data)) + data)
+        self.__f.flush()
+        self.num_moves = self.num_moves + 1
+
+    def close(self):
+        if self.__f is not None:
+            self.__f.close()
+            self.__f = None
+
+
+class Replay:
+    """the moves of a recorded match, per turn and player. A player can apply several moves per turn (human)"""
+    def __init__(self, scenario: str, seed: int):
+        self.scenario: str = scenario               # file name of the game xml file
+        self.seed: int = seed
+        self.moves: Dict[Tuple[int, int], List[bytes]] = {}
+        self.last_turn: int = 0
+
+    def get_moves(self, turn_nr: int, player_id: int) -> List[AI_Move]:
+        return [decode_move(data) for data in self.moves.get((turn_nr, player_id), [])]
+
+    @staticmethod
+    def read(file: str) -> Optional[Replay]:
+        with open(file, 'rb') as f:
+            data = f.read()
+        if len(data) < _HEADER.size or not data.startswith(REPLAY_MAGIC):
+            error(f"Replay: {file} is not a replay")
+            return None
+        _, version, seed, name_len = _HEADER.unpack_from(data)
+        if version != REPLAY_VERSION:
+            error(f"Replay: {file} has version {version}, expected {REPLAY_VERSION}")
+            return None
+        pos = _HEADER.size + name_len
+        replay = Replay(data[_HEADER.size:pos].decode(), seed)
+        while pos + _FRAME.size <= len(data):
+            turn_nr, player_id, length = _FRAME.unpack_from(data, pos)
+            pos = pos + _FRAME.size
+            if pos + length > len(data):
+                break                               # the last frame is incomplete (crash while recording)
+            replay.moves.setdefault((turn_nr, player_id), []).append(data[pos:pos + length])
+            replay.last_turn = max(replay.last_turn, turn_nr)
+            pos = pos + length
+        return replay
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import pickle
+import zlib
+from dataclasses import dataclass, field
+from os import path
+from typing import List, Tuple, Dict, Optional, Any, TYPE_CHECKING
+
+from src.game_accessoires import Resource, Army, Unit
+from src.misc.building import Building
+from src.misc.game_constants import BuildingType, BuildingState, ResourceType, UnitType, GameLogicState, error, debug
+from src.misc.trade_hub import Trade, TradeHub
+
+if TYPE_CHECKING:
+    from src.game_logic import GameLogic
+
+"""
+Save games: a snapshot of the logical state of a running match (players, buildings, armies, resources, trades,
+turn and the state of the AIs). Sprites are not saved, they are created again when the snapshot is restored.
+The snapshot is pickled and compressed. A game can only be saved in between two turns (READY_FOR_TURN)
+"""
+
+SAVEGAME_MAGIC = b"FAISAV"
+SAVEGAME_VERSION = 2
+
+
+@dataclass
+class ResourceRecord:
+    loc: Tuple[int, int]
+    resource_type: ResourceType
+    tex_code: str
+    remaining_amount: int
+
+
+@dataclass
+class BuildingRecord:
+    loc: Tuple[int, int]
+    building_type: BuildingType
+    building_state: BuildingState
+    construction_time: int
+    defensive_value: int
+    associated_tiles: List[Tuple[int, int]]
+
+
+@dataclass
+class ArmyRecord:
+    loc: Tuple[int, int]
+    units: List[UnitType]
+
+
+@dataclass
+class PlayerRecord:
+    id: int
+    amount_of_resources: int
+    food: int
+    income: int
+    culture: int
+    has_lost: bool
+    discovered_tiles: List[Tuple[int, int]]
+    attacked_set: List[Tuple[int, Tuple[int, int]]]
+    buildings: List[BuildingRecord] = field(default_factory=list)
+    armies: List[ArmyRecord] = field(default_factory=list)
+
+
+@dataclass
+class GameSnapshot:
+    scenario: str                       # file name of the game xml file
+    map_size: Tuple[int, int]
+    turn_nr: int
+    current_player: int
+    winner: Optional[int]
+    players: List[PlayerRecord]
+    resources: List[ResourceRecord]
+    trades: Dict[int, Trade]
+    last_trade_id: int
+    ai_states: Dict[int, bytes]         # pickled AIs (including their random generators)
+    seed: int
+    rng_state: Any                      # state of GameLogic.rng
+
+
+class SaveGame:
+    """takes and restores snapshots of a GameLogic"""
+
+    @staticmethod
+    def capture(gl: GameLogic) -> Optional[GameSnapshot]:
+        """:return: the snapshot, None if the game cannot be saved at the moment"""
+        if gl.logic_state is not GameLogicState.READY_FOR_TURN:
+            error(f"SaveGame: the game can only be saved in between two turns (logic state: {gl.logic_state})")
+            return None
+        if gl.ai_interface.is_busy():
+            error("SaveGame: an AI is still busy with an abandoned move, try again later")
+            return None
+        players = []
+        for p in gl.player_list:
+            pr = PlayerRecord(p.id, p.amount_of_resources, p.food, p.income, p.culture, p.has_lost,
+                              [h.offset_coordinates for h in p.discovered_tiles], list(p.attacked_set))
+            for b in p.buildings:
+                pr.buildings.append(BuildingRecord(b.tile.offset_coordinates, b.building_type, b.building_state,
+                                                   b.construction_time, b.defensive_value,
+                                                   [h.offset_coordinates for h in b.associated_tiles]))
+            for a in p.armies:
+                pr.armies.append(ArmyRecord(a.tile.offset_coordinates, [u.unit_type for u in a.get_units()]))
+            players.append(pr)
+        resources = [ResourceRecord(r.tile.offset_coordinates, r.resource_type, r.tex_code, r.remaining_amount)
+                     for r in gl.scenario.resource_list]
+        return GameSnapshot(path.basename(gl.game_file_reader.file), gl.hex_map.map_dim, gl.turn_nr,
+                            gl.current_player, gl.winner.id if gl.winner else None, players, resources,
+                            dict(gl.trade_hub.trades), TradeHub.get_last_id(), gl.ai_interface.get_ai_states(),
+                            gl.seed, gl.rng.getstate())
+
+    @staticmethod
+    def restore(gl: GameLogic, snapshot: GameSnapshot) -> bool:
+        """the game logic has to be set up (GameLogic.setup) with the same scenario"""
+        if snapshot.scenario != path.basename(gl.game_file_reader.file) or \
+                tuple(snapshot.map_size) != tuple(gl.hex_map.map_dim):
+            error(f"SaveGame: the snapshot belongs to scenario {snapshot.scenario} {snapshot.map_size}")
+            return False
+        if len(snapshot.players) != len(gl.player_list):
+            error("SaveGame: the number of players does not match")
+            return False
+        if gl.ai_interface.is_busy():
+            error("SaveGame: an AI is still busy, try again later")
+            return False
+        if gl.recorder is not None:
+            error("SaveGame: the replay does not start from the loaded game, the recording is stopped")
+            gl.stop_recording()
+        # clear the board
+        for r in list(gl.scenario.resource_list):
+            gl.del_resource(r)
+        for p in gl.player_list:
+            for a in list(p.armies):
+                gl.del_army(a, p)
+            for b in list(p.buildings):
+                gl.del_building(b, p)
+        # restore it from the snapshot
+        get_hex = gl.hex_map.get_hex_by_offset
+        for rr in snapshot.resources:
+            r = Resource(get_hex(rr.loc), rr.resource_type)
+            r.tex_code = rr.tex_code
+            r.remaining_amount = rr.remaining_amount
+            gl.add_resource(r)
+        for pr, p in zip(snapshot.players, gl.player_list):
+            p.amount_of_resources = pr.amount_of_resources
+            p.food = pr.food
+            p.income = pr.income
+            p.culture = pr.culture
+            p.has_lost = pr.has_lost
+            p.discovered_tiles = set()
+            gl.fog_of_war.forget(p.id)
+            gl.discover_tiles(p, [get_hex(oc) for oc in pr.discovered_tiles])
+            p.attacked_set = set(pr.attacked_set)
+            for br in pr.buildings:
+                SaveGame.__restore_building(gl, p, br)
+            for ar in pr.armies:
+                a = Army(get_hex(ar.loc), p.id)
+                for ut in ar.units:
+                    a.add_unit(Unit(ut))
+                gl.add_army(a, p)
+        gl.trade_hub.trades = dict(snapshot.trades)
+        TradeHub.set_last_id(snapshot.last_trade_id)
+        gl.ai_interface.set_ai_states(snapshot.ai_states)
+        gl.seed = snapshot.seed
+        gl.rng.setstate(snapshot.rng_state)
+        gl.turn_nr = snapshot.turn_nr
+        gl.current_player = snapshot.current_player
+        gl.winner = gl.player_list[snapshot.winner] if snapshot.winner is not None else None
+        gl.ai_maps.clear()                          # the AI status is constructed from scratch
+        gl.logic_state = GameLogicState.READY_FOR_TURN
+        gl.updata_map()
+        return True
+
+    @staticmethod
+    def __restore_building(gl: GameLogic, player, br: BuildingRecord):
+        b = Building(gl.hex_map.get_hex_by_offset(br.loc), br.building_type, player.id)
+        associated_tiles = [gl.hex_map.get_hex_by_offset(oc) for oc in br.associated_tiles]
+        b.associated_tiles = list(associated_tiles)         # farms: fields are created by add_building
+        # a building under construction gets its construction texture only if it has construction time left
+        b.construction_time = max(br.construction_time, 1) \
+            if br.building_state is BuildingState.UNDER_CONSTRUCTION else 0
+        gl.add_building(b, player)
+        b.associated_tiles = associated_tiles               # add_building adds the tiles of villages again
+        b.construction_time = br.construction_time
+        b.defensive_value = br.defensive_value
+        if br.building_state is BuildingState.UNDER_CONSTRUCTION:
+            b.set_state_construction()
+        elif br.building_state is BuildingState.DESTROYED:
+            b.set_state_destruction()
+        else:
+            b.set_state_active()
+
+    @staticmethod
+    def save(gl: GameLogic, file: str) -> bool:
+        snapshot = SaveGame.capture(gl)
+        if snapshot is None:
+            return False
+        data = zlib.compress(pickle.dumps(snapshot, protocol=pickle.HIGHEST_PROTOCOL))
+        with open(file, 'wb') as f:
+            f.write(SAVEGAME_MAGIC)
+            f.write(SAVEGAME_VERSION.to_bytes(2, 'little'))
+            f.write(data)
+        debug(f"game saved to {file} (turn {gl.turn_nr}, {len(data) / 1024:.1f} kB)")
+        return True
+
+    @staticmethod
+    def read(file: str) -> Optional[GameSnapshot]:
+        with open(file, 'rb') as f:
+            data = f.read()
+        if not data.startswith(SAVEGAME_MAGIC):
+            error(f"SaveGame: {file} is not a save game")
+            return None
+        version = int.from_bytes(data[len(SAVEGAME_MAGIC):len(SAVEGAME_MAGIC) + 2], 'little')
+        if version != SAVEGAME_VERSION:
+            error(f"SaveGame: {file} has version {version}, expected {SAVEGAME_VERSION}")
+            return None
+        return pickle.loads(zlib.decompress(data[len(SAVEGAME_MAGIC) + 2:]))
+
+    @staticmethod
+    def load(gl: GameLogic, file: str) -> bool:
+        snapshot = SaveGame.read(file)
+        if snapshot is None or not SaveGame.restore(gl, snapshot):
+            return False
+        debug(f"game loaded from {file} (turn {gl.turn_nr})")
+        return True
@@ -0,0 +1,135 @@
+from bisect import bisect_right
+from typing import Dict, List, Tuple, Iterator, Optional, Set
+
+import arcade
+
+from src.hex_map import TILE_HIGHT, TILEMAP_ORIGIN_Y, BOTTOM_MARGIN
+
+"""
+Chunked sprite lists: the map is partitioned into horizontal bands of CHUNK_SIZE hex rows, which span the whole
+width of the map, each with its own SpriteList. Only the chunks which intersect the viewport vertically are drawn,
+such that the draw time depends on the height of the screen rather than on the height of the map.
+The chunks do not split the map vertically: the textures overlap their neighbours in the row above and below
+(painter's algorithm), which requires all sprites to be drawn strictly by center_y. Side-by-side chunks
+would draw a whole chunk before the lower rows of its neighbour.
+Within a chunk, the sprites are kept in depth order (center_y, descending): sprites are inserted at their position
+and a sprite which moves is re-inserted on its own, before the next draw.
+"""
+
+CHUNK_SIZE = 16                             # in hex rows (offset coordinates)
+CHUNK_HEIGHT = CHUNK_SIZE * TILE_HIGHT / 2  # in pixels, the rows of the hex grid overlap by half a tile
+CHUNK_MARGIN = 2 * TILE_HIGHT               # textures reach beyond their tile (mountains, buildings, moving armies)
+
+
+class _Chunk(arcade.SpriteList):
+    """the sprites of one chunk in depth order, reports the sprites which move to the ChunkedSpriteList"""
+    def __init__(self, owner: 'ChunkedSpriteList'):
+        super().__init__(use_spatial_hash=False)
+        self.owner: ChunkedSpriteList = owner
+        self.depths: List[float] = []               # -center_y of the sprites at the time they were inserted
+
+    def update_location(self, sprite: arcade.Sprite):
+        super().update_location(sprite)
+        self.owner.mark_dirty(sprite)
+
+
+class ChunkedSpriteList:
+    """
+    Drop-in for the arcade.SpriteList of a z level (append, remove, iteration, len, draw), which keeps the sprites
+    in chunks. The chunks are disjoint ranges of rows and are drawn top to bottom, thus the depth order within the
+    chunks is the depth order of the whole list.
+    The position of a sprite is tracked by arcade (Sprite.center_x/y notify the sprite lists of the sprite). A sprite
+    which has moved is marked dirty and is moved to its new position (and chunk) by update, nothing is done as long as
+    no sprite has moved.
+    """
+    def __init__(self):
+        self.__chunks: Dict[int, _Chunk] = {}
+        self.__order: List[int] = []                        # draw order of the chunks (top to bottom)
+        self.__chunk_of: Dict[arcade.Sprite, int] = {}
+        self.__dirty: Set[arcade.Sprite] = set()
+        self.__preloaded: List[arcade.Texture] = []
+
+    @staticmethod
+    def get_chunk(pos_pixel: Tuple[float, float]) -> int:
+        """the row is monotonic in center_y, thus a chunk with a higher index lies entirely above"""
+        idx_y = round((pos_pixel[1] - BOTTOM_MARGIN - TILEMAP_ORIGIN_Y) / (TILE_HIGHT / 2))
+        return idx_y // CHUNK_SIZE
+
+    @staticmethod
+    def get_chunk_area(chunk: int) -> Tuple[float, float]:
+        """:return: bottom and top in world coordinates, including the margin"""
+        bottom = chunk * CHUNK_HEIGHT + BOTTOM_MARGIN + TILEMAP_ORIGIN_Y - TILE_HIGHT / 4
+        return bottom - CHUNK_MARGIN, bottom + CHUNK_HEIGHT + CHUNK_MARGIN
+
+    def append(self, sprite: arcade.Sprite):
+        chunk = ChunkedSpriteList.get_chunk(sprite.position)
+        if chunk not in self.__chunks:
+            self.__chunks[chunk] = _Chunk(self)
+            self.__chunks[chunk].preload_textures(self.__preloaded)
+            self.__order.append(chunk)
+            self.__order.sort(reverse=True)
+        c = self.__chunks[chunk]
+        depth = -sprite.center_y
+        idx = bisect_right(c.depths, depth)             # after the sprites of the same depth, as SpriteList.append
+        c.depths.insert(idx, depth)
+        c.insert(idx, sprite)
+        self.__chunk_of[sprite] = chunk
+
+    def remove(self, sprite: arcade.Sprite):
+        self.__dirty.discard(sprite)
+        chunk = self.__chunk_of.pop(sprite)
+        c = self.__chunks[chunk]
+        del c.depths[c.sprite_idx[sprite]]
+        c.remove(sprite)
+        if len(c) == 0:
+            del self.__chunks[chunk]
+            self.__order.remove(chunk)
+
+    def preload_textures(self, textures: List[arcade.Texture]):
+        """packs the textures into the texture atlas of every chunk (as SpriteList.preload_textures), such that the
+        atlas is built once and not again when a sprite switches to a texture which is new to its chunk"""
+        self.__preloaded.extend(textures)
+        for c in self.__chunks.values():
+            c.preload_textures(textures)
+
+    def mark_dirty(self, sprite: arcade.Sprite):
+        self.__dirty.add(sprite)
+
+    def update(self):
+        """re-inserts the sprites which have moved since the last update"""
+        if not self.__dirty:
+            return
+        for sprite in list(self.__dirty):
+            chunk = self.__chunk_of.get(sprite)
+            if chunk is None:
+                continue
+            c = self.__chunks[chunk]
+            if c.depths[c.sprite_idx[sprite]] == -sprite.center_y and \
+                    chunk == ChunkedSpriteList.get_chunk(sprite.position):
+                continue                                # moved horizontally within the chunk
+            self.remove(sprite)
+            self.append(sprite)
+        self.__dirty.clear()
+
+    def get_visible_chunks(self, visible_area: Tuple[float, float, float, float]) -> List[arcade.SpriteList]:
+        """the chunks span the whole width of the map, thus they are culled on y only"""
+        _, _, bottom, top = visible_area
+        visible = []
+        for chunk in self.__order:
+            c_bottom, c_top = ChunkedSpriteList.get_chunk_area(chunk)
+            if c_top >= bottom and c_bottom <= top:
+                visible.append(self.__chunks[chunk])
+        return visible
+
+    def draw(self, visible_area: Optional[Tuple[float, float, float, float]] = None):
+        """draws the chunks which intersect the visible area (left, right, bottom, top), all if it is None"""
+        self.update()
+        for sl in self.get_visible_chunks(visible_area) if visible_area else [self.__chunks[c] for c in self.__order]:
+            sl.draw()
+
+    def __iter__(self) -> Iterator[arcade.Sprite]:
+        for chunk in self.__order:
+            yield from self.__chunks[chunk]
+
+    def __len__(self) -> int:
+        return len(self.__chunk_of)
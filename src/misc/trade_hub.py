@@ -21,6 +21,7 @@ class TradeHub:
 
     def __init__(self):
         self.trades: Dict[int, Trade] = {}
+        TradeHub.__id = 0                   # one hub per game, the ids of a match do not depend on previous matches
 
     def handle_ai_output(self, output: List[AI_Trade], player: Player, player_list):
         """handles the output of the AI"""
@@ -95,13 +96,14 @@ class TradeHub:
                 TradeHub.balance(trade_cat, player, amount)
         return True
 
-    def __get_trade(self, ai_trade: AI_Trade) -> Optional[Tuple[int, Trade]]:
+    def __get_trade(self, ai_trade: AI_Trade) -> Tuple[int, Optional[Trade]]:
+        """returns the id and the trade, or (-1, None) if the trade does not exist (anymore)"""
         for tid, trade in self.trades.items():
             if trade.owner == ai_trade.owner_id:
                 if trade.offer == ai_trade.offer and trade.demand == ai_trade.demand:
                     if trade.type == ai_trade.type:
                         return tid, trade
-        return None
+        return -1, None
 
     @staticmethod
     def balance(tc: TradeCategory, p: Player, diff: int):
@@ -127,6 +129,15 @@ class TradeHub:
         TradeHub.__id += 1
         return TradeHub.__id
 
+    @staticmethod
+    def get_last_id() -> int:
+        return TradeHub.__id
+
+    @staticmethod
+    def set_last_id(tid: int):
+        """see save games"""
+        TradeHub.__id = tid
+
     def print_active_trades(self):
         debug("Current Trades:")
         for tid, trade in self.trades.items():
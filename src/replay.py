@@ -0,0 +1,96 @@
+"""
+Plays a recorded match (see src/misc/replay.py) without invoking any AI. The replay is fast forwarded headlessly to
+the given turn (default: the end of the recording) and the slowest turns are reported, e.g. to reproduce late-game
+slowdowns in seconds. With --render, the game window opens at that turn and the remaining moves are replayed from
+there (next turn button or automatic mode).
+
+usage (from the repository root):
+    python -m src.sim resources/game_ai_vs_npc.xml --matches 8 --record replays
+    python -m src.replay resources/game_ai_vs_npc.xml replays/replay_3.rep --turn 150 [--render]
+"""
+import argparse
+import contextlib
+import io
+import sys
+import timeit
+from os import path
+from typing import List, Optional
+
+import pyglet
+
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+sys.path.append(path.dirname(path.abspath(__file__)))          # npc scripts are imported as 'ai.scripts.*'
+
+NUM_SLOWEST_TURNS = 5
+
+
+def fast_forward(scenario: str, replay, turn_nr: int, verbose: bool = False, profile_file: Optional[str] = None):
+    """replays the match headlessly up to turn_nr and prints the timings"""
+    from src.game_logic import GameLogic
+    from src.misc.game_constants import Definitions
+    Definitions.SHOW_AI_CTRL = False
+    Definitions.DEBUG_MODE = verbose
+    t_start = timeit.default_timer()
+    with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+        gl = GameLogic(scenario, None, headless=True, seed=replay.seed)
+        gl.replay = replay
+        gl.setup()
+        winner = gl.fast_forward(turn_nr)
+    duration = timeit.default_timer() - t_start
+    print(f"fast forwarded to turn {gl.turn_nr} in {duration:.2f} s{f', winner: {winner.name}' if winner else ''} "
+          f"(the recording ends with turn {replay.last_turn})")
+    per_turn = {}
+    for t in gl.profiler.get_rows():
+        per_turn[t.turn_nr] = per_turn.get(t.turn_nr, .0) + t.total
+    slowest = sorted(per_turn.items(), key=lambda kv: kv[1], reverse=True)[:NUM_SLOWEST_TURNS]
+    print("slowest turns: " + ", ".join(f"{turn} ({t * 1000:.1f} ms)" for turn, t in slowest))
+    for phase, t in gl.profiler.get_totals().items():
+        print(f"  {phase:<28} {t:.3f} s")
+    if profile_file:
+        gl.profiler.export(profile_file)
+
+
+def render(scenario: str, replay, turn_nr: int):
+    """opens the game window at turn_nr"""
+    import arcade
+    from src.game import Game, SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE
+    window = Game(SCREEN_WIDTH, SCREEN_HEIGHT, SCREEN_TITLE, scenario, replay, turn_nr)
+    window.setup()
+    window.set_update_rate(1/60)
+    arcade.run()
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Fast forward and play a recorded match")
+    parser.add_argument('scenario', help="game xml file the match was recorded with")
+    parser.add_argument('replay', help="replay file, see sim.py --record and the console command 'record'")
+    parser.add_argument('-t', '--turn', type=int, default=None, help="fast forward to this turn (default: end)")
+    parser.add_argument('-r', '--render', action='store_true', help="open the game window at this turn")
+    parser.add_argument('-p', '--profile', default=None, metavar='FILE',
+                        help="write the timings of the game loop phases to a .csv or .json file")
+    parser.add_argument('-v', '--verbose', action='store_true', help="show the game log")
+    args = parser.parse_args(argv)
+
+    if not args.render:
+        pyglet.options['shadow_window'] = False     # no GL context needed
+    from src.misc.game_constants import error
+    from src.misc.replay import Replay
+    if not path.isfile(args.scenario) or not path.isfile(args.replay):
+        error(f"file not found: {args.scenario if not path.isfile(args.scenario) else args.replay}")
+        return
+    replay = Replay.read(args.replay)
+    if replay is None:
+        return
+    if replay.scenario != path.basename(args.scenario):
+        error(f"the replay was recorded with the scenario {replay.scenario}")
+        return
+    turn_nr = args.turn if args.turn is not None else replay.last_turn + 1
+    scenario = path.abspath(args.scenario)                  # the game window changes the working directory
+    if args.render:
+        render(scenario, replay, turn_nr)
+    else:
+        fast_forward(scenario, replay, turn_nr, args.verbose, args.profile)
+
+
+if __name__ == "__main__":
+    main()
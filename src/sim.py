@@ -0,0 +1,161 @@
+"""
+Batch match runner. Plays many headless matches of a scenario in parallel and writes one csv row per match.
+
+usage (from the repository root):
+    python -m src.sim resources/game_ai_vs_npc.xml --matches 32 --seed 0 --workers 8 --out results.csv
+
+The seed of a match seeds all its randomness (see GameLogic.rng), thus the same seed plays the same match.
+The matches wait for every move of the AIs. With --hard-deadline, a move which exceeds AI_HARD_TIME_BUDGET is replaced
+by a default move (see AI_GameInterface), as in the game. This is measured in wall time: the result then depends on
+the speed of the machine and on the load of the workers, and the same seed may play a different match.
+Besides the result, each row contains the total wall time of the turn phases (see src/misc/profiler.py).
+With --profile DIR, the detailed timings (per turn and player) of each match are written to DIR/profile_<seed>.csv
+With --checkpoint DIR, each match is saved to DIR/match_<seed>.sav every CHECKPOINT_INTERVAL turns. A match whose
+save game exists is resumed from there, e.g. after the batch has been interrupted
+With --record DIR, the moves of each match are recorded to DIR/replay_<seed>.rep (a resumed match is not recorded).
+Replay them with src/replay.py
+"""
+import argparse
+import contextlib
+import csv
+import io
+import multiprocessing
+import os
+import sys
+import timeit
+from os import path
+from typing import Dict, Any, List, Optional
+
+import pyglet
+pyglet.options['shadow_window'] = False             # arcade must not open a GL context in the workers
+
+sys.path.append(path.dirname(path.dirname(path.abspath(__file__))))
+sys.path.append(path.dirname(path.abspath(__file__)))          # npc scripts are imported as 'ai.scripts.*'
+
+from src.misc.game_constants import Definitions, error
+from src.misc.profiler import PHASE_UPDATE_MAP, PHASE_PLAYER_PROPERTIES, PHASE_GAME_STATUS, PHASE_AI_MOVE, \
+    PHASE_EXEC_MOVE
+
+DEFAULT_MAX_TURNS = 200
+CHECKPOINT_INTERVAL = 25            # in turns
+# phases of a headless game (no fog of war, animator and rendering)
+PROFILED_PHASES = (PHASE_UPDATE_MAP, PHASE_PLAYER_PROPERTIES, PHASE_GAME_STATUS, PHASE_AI_MOVE, PHASE_EXEC_MOVE)
+
+
+def run_match(scenario: str, seed: int, max_turns: int, verbose: bool = False,
+              profile_dir: Optional[str] = None, checkpoint_dir: Optional[str] = None,
+              record_dir: Optional[str] = None, hard_deadline: bool = False) -> Dict[str, Any]:
+    """plays a single headless match and returns its result row.
+    hard_deadline: moves over AI_HARD_TIME_BUDGET are replaced, not reproducible (see module doc)"""
+    Definitions.SHOW_AI_CTRL = False
+    Definitions.DEBUG_MODE = verbose
+    Definitions.ALLOW_CONSOLE_CMDS = False
+    from src.game_logic import GameLogic
+    from src.ai.performance import PerformanceLogger
+    from src.misc.savegame import SaveGame
+    PerformanceLogger.data.clear()                  # static logger, workers play several matches in a row
+    PerformanceLogger.pid_c.clear()
+    PerformanceLogger.overruns.clear()
+
+    checkpoint = path.join(checkpoint_dir, f"match_{seed}.sav") if checkpoint_dir else None
+    t_start = timeit.default_timer()
+    with contextlib.redirect_stdout(sys.stdout if verbose else io.StringIO()):
+        gl = GameLogic(scenario, None, headless=True, seed=seed)
+        if not hard_deadline:
+            gl.ai_interface.hard_time_budget = None
+        gl.setup()
+        if checkpoint and path.isfile(checkpoint):
+            SaveGame.load(gl, checkpoint)
+        elif record_dir:
+            gl.start_recording(path.join(record_dir, f"replay_{seed}.rep"))
+        while gl.winner is None and gl.turn_nr < max_turns:
+            gl.play_headless(min(gl.turn_nr + CHECKPOINT_INTERVAL, max_turns) if checkpoint else max_turns)
+            if checkpoint:
+                SaveGame.save(gl, checkpoint)
+        gl.stop_recording()
+        winner = gl.winner
+    row: Dict[str, Any] = {'seed': seed,
+                           'winner': winner.name if winner else "",
+                           'turns': gl.turn_nr,
+                           'time': round(timeit.default_timer() - t_start, 3)}
+    for p in gl.player_list:
+        logs = PerformanceLogger.data.get(p.id, [])
+        row[f"score_{p.name}"] = logs[-1].score if len(logs) > 0 else 0
+    row['overruns'] = sum(len(o) for o in PerformanceLogger.overruns.values())    # moves over the time budget
+    totals = gl.profiler.get_totals()
+    for phase in PROFILED_PHASES:
+        row[f"t_{phase}"] = round(totals.get(phase, .0), 3)
+    if profile_dir:
+        gl.profiler.export_csv(path.join(profile_dir, f"profile_{seed}.csv"))
+    return row
+
+
+def _run_match_star(args) -> Dict[str, Any]:
+    return run_match(*args)
+
+
+def run_batch(scenario: str, seeds: List[int], workers: int, max_turns: int,
+              out_file: Optional[str], verbose: bool = False, profile_dir: Optional[str] = None,
+              checkpoint_dir: Optional[str] = None, record_dir: Optional[str] = None, hard_deadline: bool = False):
+    """runs one match per seed in a process pool, rows are written as soon as a match finishes"""
+    scenario = path.abspath(scenario)
+    if profile_dir:
+        profile_dir = path.abspath(profile_dir)
+        os.makedirs(profile_dir, exist_ok=True)
+    if checkpoint_dir:
+        checkpoint_dir = path.abspath(checkpoint_dir)
+        os.makedirs(checkpoint_dir, exist_ok=True)
+    if record_dir:
+        record_dir = path.abspath(record_dir)
+        os.makedirs(record_dir, exist_ok=True)
+    jobs = [(scenario, seed, max_turns, verbose, profile_dir, checkpoint_dir, record_dir, hard_deadline)
+            for seed in seeds]
+    out = open(out_file, 'w', newline='') if out_file else sys.stdout
+    writer: Optional[csv.DictWriter] = None
+    t_start = timeit.default_timer()
+    try:
+        with multiprocessing.Pool(processes=workers) as pool:
+            for row in pool.imap_unordered(_run_match_star, jobs):
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=list(row.keys()))
+                    writer.writeheader()
+                writer.writerow(row)
+                out.flush()
+    finally:
+        if out_file:
+            out.close()
+    print(f"played {len(seeds)} matches on {workers} workers in {timeit.default_timer() - t_start:.2f} s",
+          file=sys.stderr)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Play headless matches of a scenario in parallel")
+    parser.add_argument('scenario', help="game xml file, e.g. resources/game_ai_vs_npc.xml")
+    parser.add_argument('-n', '--matches', type=int, default=1, help="number of matches")
+    parser.add_argument('-s', '--seed', type=int, default=0, help="seed of the first match, then seed+1, ...")
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help="number of worker processes")
+    parser.add_argument('-t', '--max-turns', type=int, default=DEFAULT_MAX_TURNS,
+                        help="a match without winner ends in a draw after this many turns")
+    parser.add_argument('-o', '--out', default=None, help="csv file, default is stdout")
+    parser.add_argument('-v', '--verbose', action='store_true', help="show the game log of the matches")
+    parser.add_argument('-p', '--profile', default=None, metavar='DIR',
+                        help="write the timings of each match per turn and player to this directory")
+    parser.add_argument('-c', '--checkpoint', default=None, metavar='DIR',
+                        help="save the matches regularly to this directory and resume them from there")
+    parser.add_argument('-r', '--record', default=None, metavar='DIR',
+                        help="record the moves of each match to a replay file in this directory")
+    parser.add_argument('-d', '--hard-deadline', action='store_true',
+                        help="replace AI moves over the hard time budget by a default move, as in the game. "
+                             "Measured in wall time, thus the matches are no longer reproducible by their seed")
+    args = parser.parse_args(argv)
+
+    if not path.isfile(args.scenario):
+        error(f"scenario file not found: {args.scenario}")
+        return
+    seeds = list(range(args.seed, args.seed + args.matches))
+    run_batch(args.scenario, seeds, max(1, args.workers), args.max_turns, args.out, args.verbose, args.profile,
+              args.checkpoint, args.record, args.hard_deadline)
+
+
+if __name__ == "__main__":
+    main()
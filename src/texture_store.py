@@ -1,10 +1,14 @@
-from typing import Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterable, List
 
+import PIL.Image
 import arcade
 
 from src.misc.game_constants import start_progress, progress, end_progress, Definitions
 from src.misc.singleton import Singleton
 
+TEXTURE_DECODE_THREADS = 8      # PIL releases the GIL while decoding, thus the png files are decoded in parallel
+
 
 @Singleton
 class TextureStore:
@@ -14,24 +18,44 @@ class TextureStore:
         # key is a str_code
         self.textures = {}
         self.animated_textures = {}
+        self.__images: Dict[str, PIL.Image.Image] = {}         # decoded files, key is the path
         from src.ui.ui_accessoires import UI_Texture
         self.ui_textures: Dict[UI_Texture, arcade.Texture] = {}
 
     def load_textures(self, dict_requested):
         start_progress("loading textures")
-        total = float(len(dict_requested))
-        prog = 0
+        self.decode([dict_requested[elem][0] for elem in dict_requested if elem not in self.textures],
+                    show_progress=True)
         for elem in dict_requested:
             if elem not in self.textures:
-                self.textures[elem] = (arcade.load_texture(dict_requested[elem][0]),
+                path = dict_requested[elem][0]
+                self.textures[elem] = (arcade.Texture(path, self.__images[path]),
                                        dict_requested[elem][1],  # offsetX
                                        dict_requested[elem][2],  # offsetY
                                        dict_requested[elem][3])  # scale
                 # print("tex loaded for : " + elem)
-            prog = prog + 1
-            progress(float(prog)/total)
         end_progress()
 
+    def decode(self, paths: Iterable[str], show_progress=False):
+        """decodes the image files (in parallel) which have not been decoded yet. Each file is decoded only once,
+        also if several textures or the frames of an animation use it"""
+        paths = list(dict.fromkeys(p for p in paths if p not in self.__images))
+        if len(paths) == 0:
+            return
+        with ThreadPoolExecutor(max_workers=TEXTURE_DECODE_THREADS) as pool:
+            futures = {pool.submit(self.__decode_file, p): p for p in paths}
+            for i, f in enumerate(as_completed(futures)):
+                self.__images[futures[f]] = f.result()
+                if show_progress:
+                    progress(100 * (i + 1) / len(paths))
+
+    @staticmethod
+    def __decode_file(path: str) -> PIL.Image.Image:
+        return PIL.Image.open(path).convert('RGBA')
+
+    def get_textures(self, keys: Iterable[str]) -> List[arcade.Texture]:
+        return [self.textures[key][0] for key in keys if key in self.textures]
+
     def get_texture(self, key):
         if key in self.textures:
             return self.textures[key][0]
@@ -51,11 +75,13 @@ class TextureStore:
 
     def load_animated_texture(self, name: str, amount: int, index_function,
                               width, height, path: str):
+        """slices the frames out of the sprite sheet, which is decoded once"""
+        self.decode([path])
+        sheet = self.__images[path]
         self.animated_textures[name] = []
         for i in range(amount):
-            pixel_pos: (int, int) = index_function(i)
-            tex: arcade.Texture = arcade.load_texture(path, x=pixel_pos[0], y=pixel_pos[1],
-                                                      width=width, height=height)
+            x, y = index_function(i)
+            tex = arcade.Texture(f"{path}-{x}-{y}-{width}-{height}", sheet.crop((x, y, x + width, y + height)))
             self.animated_textures[name].append(tex)
 
     def get_animated_texture(self, name: str):
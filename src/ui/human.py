@@ -191,8 +191,9 @@ class HumanInteraction:
         #     idx_aligned_x = idx_x
         # xx = idx_aligned_x * TILE_WIDTH + TILEMAP_ORIGIN_X + self.camera_pos[0]
         # yy = idx_y * (TILE_HIGHT/2) + BOTTOM_MARGIN + self.camera_pos[1] - 4  # -4 is due to the texture offset
+        mouse_x, mouse_y = mouse_x - self.camera_pos[0], mouse_y - self.camera_pos[1]      # to world coordinates
         if self.state == HI_State.GRIDMODE:
-            h = self.gl.hex_map.get_hex_by_pixel((mouse_x, mouse_y), self.camera_pos)
+            h = self.gl.hex_map.get_hex_by_pixel((mouse_x, mouse_y), (0, 0))
             xx = h.ground.sprite.center_x
             yy = h.ground.sprite.center_y - 4
 
@@ -244,6 +245,7 @@ class HumanInteraction:
         if button == 4:     # Right click on mouse
             self.set_state(HI_State.GRIDMODE)
             return
+        mouse_x, mouse_y = mouse_x - self.camera_pos[0], mouse_y - self.camera_pos[1]      # to world coordinates
         if self.gl.player_list[self.gl.current_player].player_type is PlayerType.HUMAN:
             if self.state == HI_State.SPECIFY_FIELDS:
                 self.__handle_state_specify_fields(mouse_x, mouse_y)
@@ -330,11 +332,11 @@ class HumanInteraction:
 
     def __handle_state_gridmode(self, mouse_x: int, mouse_y: int):
         """If in gridmode and the player clicks on a tile, this function decides what options are available"""
-        h = self.gl.hex_map.get_hex_by_pixel((mouse_x, mouse_y), self.camera_pos)
+        h = self.gl.hex_map.get_hex_by_pixel((mouse_x, mouse_y), (0, 0))
         obj, obj_class = self.gl.get_map_element(h.offset_coordinates)
 
         # tiles is scoutable
-        if essentials.is_obj_in_list(h, self.game_status.map.scoutable_tiles):
+        if essentials.is_obj_in_list(h, self.game_status.map.scoutable_domain):
             has_res_for_scouting = self.game_status.me.resources >= 1
             pos_list = self.get_icon_coordinates((mouse_x, mouse_y), 1)
             self.active_selection.append(SelectionIcon(pos_list[0][0], pos_list[0][1],
@@ -342,7 +344,7 @@ class HumanInteraction:
                                                        Action.SCOUT, h, is_active=has_res_for_scouting))
         # tile is buildable
         elif obj is None and h is not None:
-            if essentials.is_obj_in_list(h, self.game_status.map.buildable_tiles):
+            if essentials.is_obj_in_list(h, self.game_status.map.buildable_domain):
                 has_res_for_hut = Building.building_info[BuildingType.HUT][
                                       'construction_cost'] <= self.game_status.me.resources
                 has_res_for_farm = Building.building_info[BuildingType.FARM][
@@ -422,7 +424,7 @@ class HumanInteraction:
                     self.move.doMoveArmy = True
                     self.active_hexagon = active_icon.hex
                     candidates = [x for x in self.gl.hex_map.get_neighbours(self.active_hexagon) if
-                                  essentials.is_obj_in_list(x, self.game_status.map.walkable_tiles)]
+                                  essentials.is_obj_in_list(x, self.game_status.map.walkable_domain)]
                     self.set_state(HI_State.SPECIFY_MOVEMENT)
                 else:
                     Logger.log_notification("you already moved the army.")
@@ -435,7 +437,7 @@ class HumanInteraction:
                         self.move.loc = active_icon.hex.offset_coordinates
                         self.active_hexagon = active_icon.hex
                         candidates = [x for x in self.gl.hex_map.get_neighbours(self.active_hexagon) if
-                                      essentials.is_obj_in_list(x, self.game_status.map.buildable_tiles)]
+                                      essentials.is_obj_in_list(x, self.game_status.map.buildable_domain)]
                         self.set_state(HI_State.SPECIFY_FIELDS)
                     elif action == Action.BUILD_HUT:
                         self.move.type = BuildingType.HUT
@@ -476,7 +478,7 @@ class HumanInteraction:
             ######
             for c in candidates:
                 pix_c = HexMap.offset_to_pixel_coords(c.offset_coordinates)
-                si = SelectionIcon(pix_c[0] + self.camera_pos[0], pix_c[1] + self.camera_pos[1],
+                si = SelectionIcon(pix_c[0], pix_c[1],
                                    self.textures['hi_specify'], Action.NONE, c, scale=0.9)
                 self.zlvl_icons.append(si)
                 self.candidates.append(si)
@@ -561,12 +563,12 @@ class HumanInteraction:
 
         c = arcade.color.WHITE if icon.is_active else arcade.color.RED
 
-        self.cost_panel = CostPanel(x + 100, y + 60, txt, c)
-        self.zlvl_icons.append(self.cost_panel.sprite)
+        # the cost panel is part of the UI (screen coordinates), the icon is on the map (world coordinates)
+        self.cost_panel = CostPanel(x + self.camera_pos[0] + 100, y + self.camera_pos[1] + 60, txt, c)
         self.set_cost_panel(self.cost_panel)
         self.cost_panel.show = True
 
     def hide_cost_panel(self):
-        self.zlvl_icons.remove(self.cost_panel.sprite)
         self.cost_panel.show = False
+        self.set_cost_panel(None)
 
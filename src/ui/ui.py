@@ -336,7 +336,11 @@ class UI:
         self.gl.change_in_map_view = True
 
     def cost_panel_callback(self, cost_panel):
+        if self.cost_panel:
+            self.sprite_list.remove(self.cost_panel.sprite)
         self.cost_panel = cost_panel
+        if self.cost_panel:
+            self.sprite_list.append(self.cost_panel.sprite)
 
     def check_mouse_press_for_buttons(self, x, y) -> bool:
         """ Given an x, y, see if we need to register any button clicks. """